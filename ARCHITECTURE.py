@@ -110,6 +110,7 @@ def show_application_flow():
        User → Click Status Button → Confirm
        → ComplaintService.update_status()
        → DatabaseManager.update_status()
+       → EventBus.publish(StatusChanged) → email digest / webhooks (background)
        → Page Refresh
     
     4. VIEW STATISTICS
@@ -4,20 +4,22 @@ A modern web application for reporting potholes with photo upload and location t
 """
 import streamlit as st
 from pathlib import Path
-from datetime import datetime
 import sys
 
 # Add project root to path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from config.settings import APP_TITLE, APP_ICON, PAGE_LAYOUT, init_directories
-from services import ComplaintService
+from config.settings import (
+    APP_TITLE, APP_ICON, PAGE_LAYOUT, VIEW_PAGE_SIZES, VIEW_DEFAULT_PAGE_SIZE, init_directories
+)
+from services import get_complaint_service
 from ui.styles import apply_theme
 from ui.components import (
     render_header, 
     render_complaint_form, 
     render_complaint_card,
+    render_photo_strip,
     render_statistics,
     render_theme_toggle,
     render_search_and_filters,
@@ -27,12 +29,9 @@ from ui.auth_components import (
     render_login_page,
     render_signup_page,
     render_user_profile,
+    restore_session,
     check_permission
 )
-from ui.admin_components import (
-    render_admin_dashboard,
-    render_moderator_panel
-)
 from utils.pwa_utils import (
     inject_pwa_code,
     add_manifest_link,
@@ -81,11 +80,17 @@ def init_app():
     
     if 'show_signup' not in st.session_state:
         st.session_state.show_signup = False
+    
+    if 'view_page' not in st.session_state:
+        st.session_state.view_page = 1
+    
+    if 'duplicate_check' not in st.session_state:
+        st.session_state.duplicate_check = None
 
 
 def handle_complaint_submission(uploaded_files, location, latitude, longitude, tags, description):
     """Handle complaint form submission"""
-    service = ComplaintService()
+    service = get_complaint_service()
     
     # Get current user ID
     user_id = st.session_state.user.id if st.session_state.user else None
@@ -103,6 +108,11 @@ def handle_complaint_submission(uploaded_files, location, latitude, longitude, t
     
     if complaint_id:
         st.success(f"✅ Complaint submitted successfully! ID: #{complaint_id}")
+        st.info("📸 Your photos are being processed and will appear on the complaint shortly.")
+        
+        # Checked against earlier reports by the photo job; shown above the form once it is done
+        st.session_state.duplicate_check = complaint_id
+        
         st.balloons()
     else:
         st.error("❌ Failed to submit complaint. Please try again.")
@@ -189,94 +199,143 @@ def render_sidebar():
         return page
 
 
+def render_duplicate_hint():
+    """Point out earlier reports of the same pothole once the last submission's photos are processed"""
+    complaint_id = st.session_state.duplicate_check
+    if not complaint_id:
+        return
+    
+    service = get_complaint_service()
+    complaint = service.get_complaint(complaint_id)
+    if complaint and complaint.is_processing():
+        st.caption(f"⏳ Complaint #{complaint_id} is checked against earlier reports once its photos are processed.")
+        st.button("🔄 Check again", key="duplicate_check_refresh")
+        return
+    
+    # Shown once
+    st.session_state.duplicate_check = None
+    similar = service.get_similar_complaints(complaint) if complaint else []
+    if similar:
+        st.warning(f"🔁 The pothole in complaint #{complaint_id} may already have been reported:")
+        for other, distance in similar:
+            st.write(f"- #{other.id}: {other.location} "
+                     f"({other.status.replace('_', ' ')}, {64 - distance}/64 hash bits match)")
+
+
 def render_submit_page():
     """Render the submit complaint page"""
+    render_duplicate_hint()
     render_complaint_form(handle_complaint_submission)
 
 
 def render_view_page():
-    """Render the view complaints page"""
+    """Render the view complaints page, one page of results at a time"""
     st.subheader("📋 All Complaints")
     
-    service = ComplaintService()
-    
-    # Export button
-    render_export_button(service)
+    service = get_complaint_service()
     
     # Search and filters
     search_term = render_search_and_filters()
     
-    # Get complaints based on filters
-    complaints = []
-    
-    # Filter by user if citizen viewing only own complaints
-    if hasattr(st.session_state, 'show_only_own') and st.session_state.show_only_own:
-        complaints = service.get_complaints_by_user(st.session_state.user.id)
-    elif search_term:
-        complaints = service.search_complaints(search_term)
-    elif st.session_state.date_range:
+    # All filters are combined and applied in SQL
+    filters = {
+        'search_term': search_term or None,
+        'tag': st.session_state.filter_tag,
+        'status': st.session_state.get('status_filter'),
+        'user_id': st.session_state.user.id if st.session_state.get('show_only_own') else None,
+        'start_date': None,
+        'end_date': None
+    }
+    if st.session_state.date_range:
         start_date, end_date = st.session_state.date_range
-        complaints = service.filter_by_date_range(
-            start_date.strftime('%Y-%m-%d'),
-            end_date.strftime('%Y-%m-%d')
-        )
-    elif st.session_state.filter_tag:
-        complaints = service.filter_by_tag(st.session_state.filter_tag)
-    else:
-        complaints = service.get_all_complaints(limit=50)
+        filters['start_date'] = start_date.strftime('%Y-%m-%d')
+        filters['end_date'] = end_date.strftime('%Y-%m-%d')
     
-    # Apply status filter if set
-    if hasattr(st.session_state, 'status_filter') and st.session_state.status_filter:
-        complaints = [c for c in complaints if c.status == st.session_state.status_filter]
+    # Export what the filters select, built in the background
+    render_export_button(filters)
     
-    # Sort complaints
-    if st.session_state.sort_by == "Newest First":
-        complaints.sort(key=lambda x: x.created_at if x.created_at else datetime.min, reverse=True)
-    elif st.session_state.sort_by == "Oldest First":
-        complaints.sort(key=lambda x: x.created_at if x.created_at else datetime.min)
-    elif st.session_state.sort_by == "Status":
-        complaints.sort(key=lambda x: x.status)
+    # Go back to the first page whenever the filters or sort order change
+    filter_key = (tuple(sorted(filters.items())), st.session_state.sort_by)
+    if st.session_state.get('view_filter_key') != filter_key:
+        st.session_state.view_filter_key = filter_key
+        st.session_state.view_page = 1
+    
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page_size = st.selectbox(
+            "Per page",
+            options=VIEW_PAGE_SIZES,
+            index=VIEW_PAGE_SIZES.index(VIEW_DEFAULT_PAGE_SIZE),
+            key="view_page_size"
+        )
+    
+    complaints, total = service.get_complaints_page(
+        page=st.session_state.view_page,
+        page_size=page_size,
+        sort=st.session_state.sort_by,
+        **filters
+    )
     
     if not complaints:
         st.info("No complaints found. Be the first to report a pothole!")
-    else:
-        st.write(f"Showing {len(complaints)} complaint(s)")
+        return
+    
+    last_page = max(1, -(-total // page_size))
+    page = min(st.session_state.view_page, last_page)
+    first_shown = (page - 1) * page_size + 1
+    
+    with col2:
+        st.write(f"Showing {first_shown}–{first_shown + len(complaints) - 1} of {total} complaint(s) "
+                 f"· Page {page} of {last_page}")
+    
+    current_user = st.session_state.user
+    for complaint in complaints:
+        # Text first; photos load as thumbnails only when the card is expanded
+        render_complaint_card(complaint, show_image=False)
+        render_photo_strip(complaint)
         
-        # Display complaints in a grid
-        for complaint in complaints:
-            render_complaint_card(complaint, show_image=True)
-            
-            # Action buttons (with permission checks)
-            current_user = st.session_state.user
-            can_update = check_permission(current_user, "update_status", complaint.user_id)
-            can_delete = check_permission(current_user, "delete", complaint.user_id)
-            is_own = complaint.user_id == current_user.id
-            
-            col1, col2, col3 = st.columns([1, 1, 4])
-            
-            with col1:
-                if complaint.status != 'resolved' and can_update:
-                    new_status = 'in_progress' if complaint.status == 'pending' else 'resolved'
-                    if st.button(f"Mark as {new_status.replace('_', ' ').title()}", key=f"status_{complaint.id}"):
-                        if service.update_status(complaint.id, new_status):
-                            st.success(f"Status updated to {new_status.replace('_', ' ')}")
-                            st.rerun()
-            
-            with col2:
-                if can_delete:
-                    if st.button("🗑️ Delete", key=f"delete_{complaint.id}"):
-                        if service.delete_complaint(complaint.id):
-                            st.success("Complaint deleted")
-                            st.rerun()
-                        else:
-                            st.error("Failed to delete complaint")
-            
-            st.divider()
+        # Action buttons (with permission checks)
+        can_update = check_permission(current_user, "update_status", complaint.user_id)
+        can_delete = check_permission(current_user, "delete", complaint.user_id)
+        
+        col1, col2, col3 = st.columns([1, 1, 4])
+        
+        with col1:
+            if complaint.status != 'resolved' and can_update:
+                new_status = 'in_progress' if complaint.status == 'pending' else 'resolved'
+                if st.button(f"Mark as {new_status.replace('_', ' ').title()}", key=f"status_{complaint.id}"):
+                    if service.update_status(complaint.id, new_status, updated_by_id=current_user.id):
+                        st.success(f"Status updated to {new_status.replace('_', ' ')}")
+                        st.rerun()
+        
+        with col2:
+            if can_delete:
+                if st.button("🗑️ Delete", key=f"delete_{complaint.id}"):
+                    if service.delete_complaint(complaint.id):
+                        st.success("Complaint deleted")
+                        st.rerun()
+                    else:
+                        st.error("Failed to delete complaint")
+        
+        st.divider()
+    
+    # Pager
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ Previous", disabled=page <= 1, use_container_width=True):
+            st.session_state.view_page = page - 1
+            st.rerun()
+    with col2:
+        st.markdown(f"<p style='text-align: center;'>Page {page} of {last_page}</p>", unsafe_allow_html=True)
+    with col3:
+        if st.button("Next ➡️", disabled=page >= last_page, use_container_width=True):
+            st.session_state.view_page = page + 1
+            st.rerun()
 
 
 def render_stats_page():
     """Render the statistics page"""
-    service = ComplaintService()
+    service = get_complaint_service()
     stats = service.get_statistics()
     
     render_statistics(stats)
@@ -301,7 +360,7 @@ def render_map_page():
     
     st.subheader("🗺️ Complaint Map")
     
-    service = ComplaintService()
+    service = get_complaint_service()
     
     # Get all complaints
     all_complaints = service.get_all_complaints(limit=1000)
@@ -378,6 +437,9 @@ def main():
     # Apply theme
     apply_theme(st.session_state.theme)
     
+    # Log in from the session cookie, or out if the session was revoked
+    restore_session()
+    
     # Check if user is authenticated
     if not st.session_state.authenticated:
         # Show login or signup page
@@ -408,12 +470,14 @@ def main():
     elif page == "Admin Dashboard":
         # Only accessible to admins
         if st.session_state.user.is_admin():
+            from ui.admin_components import render_admin_dashboard
             render_admin_dashboard()
         else:
             st.error("⛔ Access Denied: Admin privileges required")
     elif page == "Moderator Panel":
         # Accessible to moderators and admins
         if st.session_state.user.can_access_admin_panel():
+            from ui.admin_components import render_moderator_panel
             render_moderator_panel()
         else:
             st.error("⛔ Access Denied: Moderator privileges required")
@@ -0,0 +1,60 @@
+"""
+Generate missing image size variants and perceptual hashes for existing uploads
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from database import DatabaseManager
+from services import StorageService
+
+
+def backfill_variants():
+    """Create thumbnail/medium variants for photos uploaded before they existed"""
+    print("=" * 60)
+    print("PathPatrol Image Variant Backfill")
+    print("=" * 60)
+    
+    db = DatabaseManager()
+    storage = StorageService()
+    
+    processed = 0
+    skipped = 0
+    created = 0
+    missing = 0
+    failed = 0
+    
+    for photo_path in db.iter_photo_paths():
+        processed += 1
+        
+        # Already registered (and hashed) by an upload or a previous run
+        if storage.image_db.get_variants(photo_path) and storage.get_image_hashes([photo_path]):
+            skipped += 1
+            continue
+        
+        if not storage.get_image_path(photo_path).exists():
+            print(f"  ⚠️ Missing file: {photo_path}")
+            missing += 1
+            continue
+        
+        try:
+            created += storage.generate_variants(photo_path)
+        except Exception as e:
+            print(f"  ❌ {photo_path}: {e}")
+            failed += 1
+        
+        if processed % 100 == 0:
+            print(f"  ... {processed} photos checked")
+    
+    print(f"\n📊 Photos checked: {processed}")
+    print(f"⏭️ Already done: {skipped}")
+    print(f"✅ Variants written: {created}")
+    print(f"⚠️ Missing files: {missing}")
+    print(f"❌ Failed: {failed}")
+
+
+if __name__ == "__main__":
+    backfill_variants()
@@ -0,0 +1,85 @@
+"""
+Benchmark password checks: logins per second per core at each bcrypt cost,
+and the throughput of the password hashing pool under concurrent logins
+Use it to pick BCRYPT_ROUNDS and PASSWORD_HASH_WORKERS for a server
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from config.settings import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS
+from utils.password_utils import PasswordHasher
+
+PASSWORD = "correct horse battery staple"
+
+
+def benchmark_costs(costs: list, seconds: float):
+    """Time single-threaded password checks at each cost factor"""
+    print("\n🔐 Single core")
+    print(f"{'Cost':>6} {'ms/login':>10} {'logins/s/core':>15}")
+    for rounds in costs:
+        password_hash = PasswordHasher._hash(PASSWORD, rounds)
+        checks = 0
+        start = time.perf_counter()
+        # At least two checks, so very high costs still give a number
+        while checks < 2 or time.perf_counter() - start < seconds:
+            PasswordHasher._verify(PASSWORD, password_hash)
+            checks += 1
+        elapsed = time.perf_counter() - start
+        marker = "  ← BCRYPT_ROUNDS" if rounds == BCRYPT_ROUNDS else ""
+        print(f"{rounds:>6} {elapsed / checks * 1000:>10.1f} {checks / elapsed:>15.1f}{marker}")
+
+
+def benchmark_pool(rounds: int, workers: int, clients: int, logins: int):
+    """Run concurrent logins through the hashing pool, like a login burst"""
+    hasher = PasswordHasher(rounds=rounds, workers=workers)
+    password_hash = hasher.hash(PASSWORD)
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as sessions:
+        results = list(sessions.map(lambda _: hasher.verify(PASSWORD, password_hash), range(logins)))
+    elapsed = time.perf_counter() - start
+    
+    assert all(results)
+    cores_used = min(workers, os.cpu_count() or 1)
+    print(f"\n⚡ Pool: cost {rounds}, {workers} workers, {clients} concurrent sessions")
+    print(f"   {logins} logins in {elapsed:.2f}s")
+    print(f"   {logins / elapsed:.1f} logins/s total, {logins / elapsed / cores_used:.1f} logins/s per core")
+    print(f"   Typical wait per login: {elapsed / logins * clients * 1000:.0f} ms")
+
+
+def main():
+    """Parse arguments and run the benchmarks"""
+    parser = argparse.ArgumentParser(description="Benchmark bcrypt password checks")
+    parser.add_argument("--costs", type=int, nargs="+",
+                        default=[BCRYPT_ROUNDS - 2, BCRYPT_ROUNDS - 1, BCRYPT_ROUNDS, BCRYPT_ROUNDS + 1],
+                        help="bcrypt cost factors to time on one core")
+    parser.add_argument("--seconds", type=float, default=2.0,
+                        help="How long to time each cost")
+    parser.add_argument("--workers", type=int, default=PASSWORD_HASH_WORKERS,
+                        help="Pool size (PASSWORD_HASH_WORKERS)")
+    parser.add_argument("--clients", type=int, default=32,
+                        help="Concurrent sessions logging in")
+    parser.add_argument("--logins", type=int, default=64,
+                        help="Logins in the burst")
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("PathPatrol bcrypt Benchmark")
+    print("=" * 60)
+    print(f"CPU cores: {os.cpu_count()}")
+    print(f"BCRYPT_ROUNDS={BCRYPT_ROUNDS}, PASSWORD_HASH_WORKERS={PASSWORD_HASH_WORKERS}")
+    
+    benchmark_costs([rounds for rounds in args.costs if 4 <= rounds <= 31], args.seconds)
+    benchmark_pool(BCRYPT_ROUNDS, args.workers, args.clients, args.logins)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,13 +9,141 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 # Database settings
 DATABASE_DIR = BASE_DIR / "data"
-DATABASE_PATH = DATABASE_DIR / "complaints.db"
+# Tests point this at a scratch file (see conftest.py)
+DATABASE_PATH = Path(os.getenv("DATABASE_PATH", str(DATABASE_DIR / "complaints.db")))
 
 # Upload settings
 UPLOAD_DIR = DATABASE_DIR / "uploads"
 ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
 MAX_FILE_SIZE_MB = 10
 
+# Uploads are spread over nested shard directories (two hex characters per
+# level) so no single directory grows to hundreds of thousands of files
+UPLOAD_SHARD_LEVELS = 2
+
+# Image size variants generated at upload time (name -> max width, height).
+# The 'full' variant is the stored upload itself, capped at IMAGE_MAX_SIZE.
+IMAGE_MAX_SIZE = (1920, 1080)
+IMAGE_VARIANTS = {
+    'thumb': (160, 160),
+    'medium': (640, 640),
+}
+
+# Output encoding policy. AVIF is only used when the installed Pillow build
+# can write it; otherwise the first available fallback format is used.
+IMAGE_OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "WEBP").upper()
+IMAGE_FORMAT_FALLBACKS = ["WEBP", "JPEG"]
+IMAGE_QUALITY = {
+    'full': 82,
+    'medium': 75,
+    'thumb': 65,
+}
+# Keep the untouched upload next to the re-encoded copies
+KEEP_ORIGINAL_UPLOADS = os.getenv("KEEP_ORIGINAL_UPLOADS", "false").lower() == "true"
+
+# Decoder limits: reject decompression bombs and bound concurrent full decodes
+MAX_IMAGE_PIXELS = 64_000_000
+MAX_CONCURRENT_DECODES = 2
+
+# Display widths used to pick the smallest variant that still fills the slot
+CARD_IMAGE_WIDTH = 640
+CARD_GRID_IMAGE_WIDTH = 400
+CARD_THUMB_WIDTH = 160  # Photo strip in the paginated complaint list
+
+# View Complaints pagination
+VIEW_PAGE_SIZES = [10, 20, 50, 100]
+VIEW_DEFAULT_PAGE_SIZE = 20
+
+# Image server: photos are served over HTTP with cacheable URLs instead of
+# being streamed through the Streamlit websocket on every rerun
+IMAGE_SERVER_ENABLED = os.getenv("IMAGE_SERVER_ENABLED", "true").lower() == "true"
+IMAGE_SERVER_HOST = os.getenv("IMAGE_SERVER_HOST", "127.0.0.1")  # 0.0.0.0 to serve other machines directly
+IMAGE_SERVER_PORT = int(os.getenv("IMAGE_SERVER_PORT", "8502"))
+IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL", f"http://localhost:{IMAGE_SERVER_PORT}").rstrip("/")
+
+# Background jobs: photo processing runs in worker threads off the request path
+STAGING_DIR = DATABASE_DIR / "staging"  # Raw uploads waiting to be processed
+JOB_WORKERS = 2
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_SECONDS = 5  # Doubled after every failed attempt
+JOB_LEASE_SECONDS = 300  # A running job not finished by then is picked up again
+JOB_POLL_INTERVAL = 2.0
+
+# Orphaned upload cleanup (gc_uploads.py)
+QUARANTINE_DIR = DATABASE_DIR / "quarantine"  # Orphans are moved here instead of deleted with --quarantine
+GC_GRACE_HOURS = 24  # Files younger than this are never touched (uploads still in flight)
+
+# Query result cache: entries are dropped as soon as any write bumps the
+# data version; the TTL only bounds staleness from writers that bypass it
+QUERY_CACHE_MAX_ROWS = 20000  # Total complaints held across all cached results
+QUERY_CACHE_TTL = 300  # Seconds
+QUERY_CACHE_VERSION_MAX_AGE = 1.0  # Seconds a data version read is reused across lookups
+QUERY_CACHE_TTLS = {
+    'search_complaints': 60,  # Many distinct keys, rarely repeated
+}
+
+# Exports are written to a spooled temp file: in memory up to this size, then on disk
+EXPORT_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+EXPORT_BATCH_SIZE = 1000  # Rows fetched from SQLite per round trip
+PARQUET_ROW_GROUP_SIZE = 50000  # Rows per Parquet row group (and per partition buffer)
+PARQUET_MAX_BUFFERED_ROWS = 200000  # Across all partitions; the largest are written early past this
+PARQUET_MAX_OPEN_WRITERS = 32  # Partition files open at once; more start a new part file
+PARQUET_COMPRESSION = 'zstd'  # zstd, snappy, gzip or none
+
+# Export Data button: exports run as background jobs and the finished files
+# are reused until the data changes
+EXPORT_DIR = DATABASE_DIR / "exports"
+EXPORT_ARTIFACT_MAX_AGE_HOURS = 24  # Files older than this are deleted, current or not
+
+# Outbound email: messages go to the email_outbox table and a background
+# sender delivers them over persistent SMTP connections
+EMAIL_SENDER_WORKERS = 1  # Sender threads, each with its own SMTP connection
+EMAIL_BATCH_SIZE = 50  # Messages claimed per round
+EMAIL_MAX_ATTEMPTS = 6  # Then the message is dead-lettered
+EMAIL_RETRY_BASE_SECONDS = 30  # Doubled after every failed attempt
+EMAIL_RETRY_MAX_SECONDS = 3600
+EMAIL_LEASE_SECONDS = 300  # A claimed message not delivered by then is picked up again
+EMAIL_POLL_INTERVAL = 5.0
+EMAIL_SMTP_TIMEOUT = 30
+EMAIL_SMTP_IDLE_SECONDS = 60  # Close a connection nobody used for this long
+EMAIL_MESSAGES_PER_CONNECTION = 100  # Reconnect after this many (server limits)
+
+# Notification digests: events are buffered per recipient and sent as one
+# summary email once the oldest has waited this long (0 sends every event
+# on its own)
+NOTIFICATION_DIGEST_WINDOW_SECONDS = int(os.getenv("NOTIFICATION_DIGEST_WINDOW_SECONDS", "900"))
+# Events sent right away instead of waiting for the digest: "assignment" or
+# "status:<new status>", comma separated
+NOTIFICATION_IMMEDIATE_EVENTS = frozenset(
+    event.strip() for event in os.getenv("NOTIFICATION_IMMEDIATE_EVENTS", "").split(",") if event.strip()
+)
+NOTIFICATION_POLL_INTERVAL = 30.0
+NOTIFICATION_LEASE_SECONDS = 300  # Claimed events not sent by then are picked up again
+NOTIFICATION_MAX_ATTEMPTS = 5  # Then the recipient's events are dropped
+
+# Domain events: side effects of complaint writes (email, webhooks) run on
+# background threads; events of one complaint always share a thread
+EVENT_BUS_WORKERS = 2
+# Comma-separated URLs that receive every complaint event as a JSON POST
+WEBHOOK_URLS = [url.strip() for url in os.getenv("WEBHOOK_URLS", "").split(",") if url.strip()]
+WEBHOOK_TIMEOUT = 5
+
+# Login sessions: a signed token in a browser cookie points at a row in the
+# sessions table, so a refresh or new tab doesn't need the password again
+SESSION_COOKIE_NAME = "pathpatrol_session"
+SESSION_TTL_HOURS = int(os.getenv("SESSION_TTL_HOURS", "168"))
+SESSION_SECRET = os.getenv("SESSION_SECRET", "")  # Generated into SESSION_SECRET_FILE if empty
+SESSION_SECRET_FILE = DATABASE_DIR / ".session_secret"
+
+# Password hashing: bcrypt cost factor (each +1 doubles the work; stored
+# hashes are upgraded on the next login when this changes) and the number
+# of hashes that may run at once
+BCRYPT_ROUNDS = min(max(int(os.getenv("BCRYPT_ROUNDS", "12")), 4), 31)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS") or max(1, (os.cpu_count() or 2) // 2))
+
+# Near-duplicate photo detection: max differing bits between 64-bit dHashes
+DUPLICATE_MAX_DISTANCE = 10
+
 # Application settings
 APP_TITLE = "Pothole Complaint Portal"
 APP_ICON = "🚧"
@@ -47,3 +175,5 @@ def init_directories():
     """Create required directories if they don't exist"""
     DATABASE_DIR.mkdir(parents=True, exist_ok=True)
     UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,15 @@
+"""
+Shared test setup
+Points DATABASE_PATH at a scratch directory before any test imports the
+settings, so the suite never writes to data/complaints.db
+"""
+import os
+import shutil
+import tempfile
+
+_database_dir = tempfile.mkdtemp(prefix="pathpatrol-tests-")
+os.environ["DATABASE_PATH"] = os.path.join(_database_dir, "complaints.db")
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_database_dir, ignore_errors=True)
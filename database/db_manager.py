@@ -1,13 +1,22 @@
 """
 Database manager for SQLite operations
 """
+import time
 import sqlite3
+import threading
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 from pathlib import Path
 from .models import Complaint
 from config.settings import DATABASE_PATH
 
+# ORDER BY clause for each sort option offered on the View Complaints page
+SORT_ORDERS = {
+    'Newest First': 'created_at DESC, id DESC',
+    'Oldest First': 'created_at ASC, id ASC',
+    'Status': 'status ASC, created_at DESC, id DESC'
+}
+
 
 class DatabaseManager:
     """Handles all database operations"""
@@ -15,6 +24,9 @@ class DatabaseManager:
     def __init__(self, db_path: Path = DATABASE_PATH):
         """Initialize database manager"""
         self.db_path = db_path
+        self._data_version_read = None  # (version, monotonic time read)
+        self._data_version_generation = 0  # Advanced by every write through this manager
+        self._data_version_lock = threading.Lock()
         self.init_database()
     
     def get_connection(self) -> sqlite3.Connection:
@@ -26,6 +38,11 @@ class DatabaseManager:
     def init_database(self):
         """Create tables if they don't exist"""
         with self.get_connection() as conn:
+            # Write-ahead logging lets writes commit while a long read (an
+            # export streaming the table) is in progress; the mode is stored
+            # in the database file, so this affects every connection
+            conn.execute("PRAGMA journal_mode=WAL")
+            
             cursor = conn.cursor()
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS complaints (
@@ -42,7 +59,11 @@ class DatabaseManager:
                     resolution_time_hours REAL,
                     user_id INTEGER,
                     assigned_to INTEGER,
-                    updated_by INTEGER
+                    updated_by INTEGER,
+                    processing_status TEXT DEFAULT 'ready',
+                    similar_complaints TEXT DEFAULT '',
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    change_seq INTEGER NOT NULL DEFAULT 0
                 )
             """)
             
@@ -52,7 +73,12 @@ class DatabaseManager:
                 "ALTER TABLE complaints ADD COLUMN resolution_time_hours REAL",
                 "ALTER TABLE complaints ADD COLUMN user_id INTEGER",
                 "ALTER TABLE complaints ADD COLUMN assigned_to INTEGER",
-                "ALTER TABLE complaints ADD COLUMN updated_by INTEGER"
+                "ALTER TABLE complaints ADD COLUMN updated_by INTEGER",
+                "ALTER TABLE complaints ADD COLUMN processing_status TEXT DEFAULT 'ready'",
+                "ALTER TABLE complaints ADD COLUMN similar_complaints TEXT DEFAULT ''",
+                # SQLite can't add a column with a CURRENT_TIMESTAMP default; backfilled below
+                "ALTER TABLE complaints ADD COLUMN updated_at TIMESTAMP",
+                "ALTER TABLE complaints ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0"
             ]
             
             for migration in migrations:
@@ -62,16 +88,103 @@ class DatabaseManager:
                     # Column already exists
                     pass
             
+            # Indexes for the filtered, paginated list queries
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_complaints_created_at ON complaints (created_at)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_complaints_status ON complaints (status, created_at)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_complaints_user_id ON complaints (user_id, created_at)")
+            
+            cursor.execute("""
+                UPDATE complaints SET updated_at = COALESCE(resolved_at, created_at)
+                WHERE updated_at IS NULL
+            """)
+            
+            # Change feed for incremental exports: every write stamps the rows
+            # it touches with the data version it committed, and deletes leave
+            # a tombstone, so "changed since version N" is one indexed range scan
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_complaints_change_seq ON complaints (change_seq)")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS complaint_tombstones (
+                    complaint_id INTEGER PRIMARY KEY,
+                    deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    change_seq INTEGER NOT NULL
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_tombstones_change_seq ON complaint_tombstones (change_seq)")
+            
+            # Last data version each incremental export consumer has received
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS export_watermarks (
+                    consumer TEXT PRIMARY KEY,
+                    watermark INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Counter bumped by every write; read caches compare against it
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS app_meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            cursor.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('data_version', 0)")
+            
             conn.commit()
     
+    def get_data_version(self, max_age: float = 0) -> int:
+        """
+        Get the counter that changes whenever complaint data is written
+        
+        Args:
+            max_age: Reuse a value read up to this many seconds ago instead
+                of querying again. Writes through this manager forget the
+                value; other processes' writes (or one still committing)
+                may be seen up to max_age late.
+        """
+        with self._data_version_lock:
+            last_read = self._data_version_read
+            generation = self._data_version_generation
+        if last_read and time.monotonic() - last_read[1] < max_age:
+            return last_read[0]
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT value FROM app_meta WHERE key = 'data_version'")
+            row = cursor.fetchone()
+            version = row['value'] if row else 0
+        
+        with self._data_version_lock:
+            # A write since the query started may already have made this stale
+            if self._data_version_generation == generation:
+                self._data_version_read = (version, time.monotonic())
+        return version
+    
+    def _bump_data_version(self, cursor: sqlite3.Cursor) -> int:
+        """
+        Advance the data version inside the caller's write transaction
+        
+        Returns:
+            The new version, used as the change_seq of the rows written.
+            The UPDATE takes SQLite's write lock, so versions are handed out
+            in commit order.
+        """
+        with self._data_version_lock:
+            self._data_version_generation += 1
+            self._data_version_read = None
+        cursor.execute("UPDATE app_meta SET value = value + 1 WHERE key = 'data_version'")
+        cursor.execute("SELECT value FROM app_meta WHERE key = 'data_version'")
+        return cursor.fetchone()[0]
+    
     def create_complaint(self, complaint: Complaint) -> int:
         """Insert a new complaint"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            version = self._bump_data_version(cursor)
             cursor.execute("""
                 INSERT INTO complaints 
-                (photo_path, location, latitude, longitude, tags, description, status, user_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                (photo_path, location, latitude, longitude, tags, description, status, user_id,
+                 processing_status, change_seq)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 complaint.photo_path,
                 complaint.location,
@@ -80,10 +193,13 @@ class DatabaseManager:
                 complaint.tags,
                 complaint.description,
                 complaint.status,
-                complaint.user_id
+                complaint.user_id,
+                complaint.processing_status,
+                version
             ))
+            complaint_id = cursor.lastrowid
             conn.commit()
-            return cursor.lastrowid
+            return complaint_id
     
     def get_complaint(self, complaint_id: int) -> Optional[Complaint]:
         """Get a single complaint by ID"""
@@ -109,6 +225,83 @@ class DatabaseManager:
             rows = cursor.fetchall()
             return [self._row_to_complaint(row) for row in rows]
     
+    def count_complaints(self, user_id: Optional[int] = None, search_term: Optional[str] = None,
+                         tag: Optional[str] = None, status: Optional[str] = None,
+                         start_date: Optional[str] = None, end_date: Optional[str] = None,
+                         bbox: Optional[Tuple[float, float, float, float]] = None) -> int:
+        """Count complaints matching all of the given filters"""
+        where, params = self._filter_clause(user_id, search_term, tag, status, start_date, end_date, bbox)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) as count FROM complaints {where}", params)
+            return cursor.fetchone()['count']
+    
+    def query_complaints(self, user_id: Optional[int] = None, search_term: Optional[str] = None,
+                         tag: Optional[str] = None, status: Optional[str] = None,
+                         start_date: Optional[str] = None, end_date: Optional[str] = None,
+                         sort: str = 'Newest First', limit: int = 20, offset: int = 0) -> List[Complaint]:
+        """
+        Get one page of complaints matching all of the given filters
+        
+        Args:
+            user_id: Only complaints filed by this user
+            search_term: Text to find in location or description
+            tag: Tag the complaint must carry
+            status: Exact status
+            start_date: First creation date (YYYY-MM-DD), inclusive
+            end_date: Last creation date (YYYY-MM-DD), inclusive
+            sort: One of SORT_ORDERS
+            limit: Page size
+            offset: Number of matching complaints to skip
+        """
+        where, params = self._filter_clause(user_id, search_term, tag, status, start_date, end_date)
+        order_by = SORT_ORDERS.get(sort, SORT_ORDERS['Newest First'])
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT * FROM complaints
+                {where}
+                ORDER BY {order_by}
+                LIMIT ? OFFSET ?
+            """, params + [limit, offset])
+            
+            rows = cursor.fetchall()
+            return [self._row_to_complaint(row) for row in rows]
+    
+    def _filter_clause(self, user_id, search_term, tag, status,
+                       start_date, end_date, bbox=None) -> Tuple[str, list]:
+        """
+        Build the WHERE clause and parameters shared by count and page queries
+        
+        bbox is (min longitude, min latitude, max longitude, max latitude);
+        complaints without coordinates never fall inside one.
+        """
+        conditions = []
+        params = []
+        
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+        if search_term:
+            conditions.append("(location LIKE ? OR description LIKE ?)")
+            params.extend([f'%{search_term}%', f'%{search_term}%'])
+        if tag:
+            conditions.append("tags LIKE ?")
+            params.append(f'%{tag}%')
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if start_date and end_date:
+            conditions.append("DATE(created_at) BETWEEN ? AND ?")
+            params.extend([start_date, end_date])
+        if bbox:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            conditions.append("longitude BETWEEN ? AND ? AND latitude BETWEEN ? AND ?")
+            params.extend([min_lon, max_lon, min_lat, max_lat])
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+    
     def get_complaints_by_tag(self, tag: str) -> List[Complaint]:
         """Get complaints by tag"""
         with self.get_connection() as conn:
@@ -122,10 +315,29 @@ class DatabaseManager:
             rows = cursor.fetchall()
             return [self._row_to_complaint(row) for row in rows]
     
+    def get_complaints_by_photo_paths(self, photo_paths: List[str]) -> List[Complaint]:
+        """Get the complaints that include any of the given photo paths"""
+        if not photo_paths:
+            return []
+        
+        # photo_path holds a semicolon-joined list; pad it so every entry is delimited
+        conditions = ' OR '.join("(';' || photo_path || ';') LIKE ?" for _ in photo_paths)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT * FROM complaints
+                WHERE {conditions}
+                ORDER BY created_at DESC
+            """, [f'%;{path};%' for path in photo_paths])
+            
+            rows = cursor.fetchall()
+            return [self._row_to_complaint(row) for row in rows]
+    
     def update_status(self, complaint_id: int, status: str) -> bool:
         """Update complaint status"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            version = self._bump_data_version(cursor)
             
             # If marking as resolved, update resolved_at and calculate resolution time
             if status == 'resolved':
@@ -135,26 +347,175 @@ class DatabaseManager:
                         resolved_at = CURRENT_TIMESTAMP,
                         resolution_time_hours = (
                             (julianday(CURRENT_TIMESTAMP) - julianday(created_at)) * 24
-                        )
+                        ),
+                        updated_at = CURRENT_TIMESTAMP,
+                        change_seq = ?
                     WHERE id = ?
-                """, (status, complaint_id))
+                """, (status, version, complaint_id))
             else:
                 cursor.execute("""
                     UPDATE complaints 
-                    SET status = ?
+                    SET status = ?, updated_at = CURRENT_TIMESTAMP, change_seq = ?
                     WHERE id = ?
-                """, (status, complaint_id))
+                """, (status, version, complaint_id))
             
+            updated = cursor.rowcount > 0
+            conn.commit()
+            return updated
+    
+    def append_photo_path(self, complaint_id: int, photo_path: str) -> bool:
+        """
+        Add one processed photo to a complaint's semicolon-separated paths
+        
+        Returns:
+            False if the complaint is gone or already has this photo
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            version = self._bump_data_version(cursor)
+            cursor.execute("""
+                UPDATE complaints
+                SET photo_path = CASE WHEN photo_path = '' THEN ? ELSE photo_path || ';' || ? END,
+                    updated_at = CURRENT_TIMESTAMP,
+                    change_seq = ?
+                WHERE id = ?
+                  AND instr(';' || photo_path || ';', ';' || ? || ';') = 0
+            """, (photo_path, photo_path, version, complaint_id, photo_path))
+            updated = cursor.rowcount > 0
             conn.commit()
-            return cursor.rowcount > 0
+            return updated
+    
+    def finish_processing(self, complaint_id: int, status: str,
+                          latitude: Optional[float] = None, longitude: Optional[float] = None,
+                          similar_complaints: Optional[str] = None) -> bool:
+        """Set the processing status, filling in coordinates and the duplicate hint found during processing"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            version = self._bump_data_version(cursor)
+            cursor.execute("""
+                UPDATE complaints
+                SET processing_status = ?,
+                    latitude = COALESCE(latitude, ?),
+                    longitude = COALESCE(longitude, ?),
+                    similar_complaints = COALESCE(?, similar_complaints),
+                    updated_at = CURRENT_TIMESTAMP,
+                    change_seq = ?
+                WHERE id = ?
+            """, (status, latitude, longitude, similar_complaints, version, complaint_id))
+            updated = cursor.rowcount > 0
+            conn.commit()
+            return updated
     
     def delete_complaint(self, complaint_id: int) -> bool:
         """Delete a complaint"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            version = self._bump_data_version(cursor)
             cursor.execute("DELETE FROM complaints WHERE id = ?", (complaint_id,))
+            deleted = cursor.rowcount > 0
+            if deleted:
+                # Lets incremental exports tell consumers to drop the row
+                cursor.execute("""
+                    INSERT OR REPLACE INTO complaint_tombstones (complaint_id, change_seq)
+                    VALUES (?, ?)
+                """, (complaint_id, version))
+            conn.commit()
+            return deleted
+    
+    def iter_photo_paths(self, batch_size: int = 500) -> Iterator[str]:
+        """Yield every stored photo path without loading the whole table"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT photo_path FROM complaints WHERE photo_path != ''")
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    for path in row['photo_path'].split(';'):
+                        if path.strip():
+                            yield path.strip()
+    
+    def iter_export_rows(self, batch_size: int = 1000, user_id: Optional[int] = None,
+                         search_term: Optional[str] = None, tag: Optional[str] = None,
+                         status: Optional[str] = None, start_date: Optional[str] = None,
+                         end_date: Optional[str] = None,
+                         bbox: Optional[Tuple[float, float, float, float]] = None) -> Iterator[sqlite3.Row]:
+        """
+        Yield complaint rows matching the filters in ID order, batch_size rows at a time
+        
+        The cursor stays open while the caller consumes rows, so only one
+        batch is ever held in memory. Filters are those of query_complaints
+        plus a (min lon, min lat, max lon, max lat) bbox.
+        """
+        where, params = self._filter_clause(user_id, search_term, tag, status, start_date, end_date, bbox)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT * FROM complaints {where} ORDER BY id", params)
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+    
+    def iter_changed_rows(self, since: int, until: int, batch_size: int = 1000) -> Iterator[sqlite3.Row]:
+        """
+        Yield complaints created or changed after version since, up to until
+        
+        Capping at until (the version read when the export started) means a
+        row changed mid-export is left for the next run instead of skipped.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT * FROM complaints
+                WHERE change_seq > ? AND change_seq <= ?
+                ORDER BY change_seq, id
+            """, (since, until))
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+    
+    def iter_tombstones(self, since: int, until: int, batch_size: int = 1000) -> Iterator[sqlite3.Row]:
+        """Yield (complaint_id, deleted_at, change_seq) of complaints deleted in the version range"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT complaint_id, deleted_at, change_seq FROM complaint_tombstones
+                WHERE change_seq > ? AND change_seq <= ?
+                ORDER BY change_seq
+            """, (since, until))
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+    
+    def get_export_watermark(self, consumer: str) -> Optional[int]:
+        """Get the last data version exported to a consumer (None if it never ran)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT watermark FROM export_watermarks WHERE consumer = ?", (consumer,))
+            row = cursor.fetchone()
+            return row['watermark'] if row else None
+    
+    def set_export_watermark(self, consumer: str, watermark: int):
+        """Record the data version a consumer has received everything up to"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO export_watermarks (consumer, watermark) VALUES (?, ?)
+                ON CONFLICT(consumer) DO UPDATE SET
+                    watermark = excluded.watermark,
+                    updated_at = CURRENT_TIMESTAMP
+            """, (consumer, watermark))
             conn.commit()
-            return cursor.rowcount > 0
     
     def get_complaints_by_status(self, status: str) -> List[Complaint]:
         """Get complaints by status"""
@@ -269,7 +630,9 @@ class DatabaseManager:
             resolution_time_hours=get_col('resolution_time_hours'),
             user_id=get_col('user_id'),
             assigned_to=get_col('assigned_to'),
-            updated_by=get_col('updated_by')
+            updated_by=get_col('updated_by'),
+            processing_status=get_col('processing_status') or 'ready',
+            similar_complaints=get_col('similar_complaints') or ''
         )
     
     def get_complaints_by_user(self, user_id: int) -> List[Complaint]:
@@ -290,11 +653,12 @@ class DatabaseManager:
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                version = self._bump_data_version(cursor)
                 cursor.execute("""
                     UPDATE complaints 
-                    SET assigned_to = ?, updated_by = ?
+                    SET assigned_to = ?, updated_by = ?, updated_at = CURRENT_TIMESTAMP, change_seq = ?
                     WHERE id = ?
-                """, (assigned_to_id, updated_by_id, complaint_id))
+                """, (assigned_to_id, updated_by_id, version, complaint_id))
                 conn.commit()
                 return True
         except Exception as e:
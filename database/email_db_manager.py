@@ -0,0 +1,248 @@
+"""
+Email outbox database operations
+"""
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from database.email_models import OutboxMessage
+from config.settings import DATABASE_PATH
+
+
+class EmailOutboxDatabaseManager:
+    """Persists outbound email so it survives restarts and SMTP outages"""
+    
+    def __init__(self, db_path: Path = DATABASE_PATH):
+        """Initialize email outbox database manager"""
+        self.db_path = db_path
+        self.init_database()
+    
+    def get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def init_database(self):
+        """Create email_outbox table if it doesn't exist"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS email_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    to_email TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    html_body TEXT NOT NULL,
+                    text_body TEXT,
+                    status TEXT DEFAULT 'queued',
+                    attempts INTEGER DEFAULT 0,
+                    max_attempts INTEGER DEFAULT 6,
+                    next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    locked_until TIMESTAMP,
+                    last_error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    sent_at TIMESTAMP
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_email_outbox_status_next_attempt
+                ON email_outbox (status, next_attempt_at)
+            """)
+            conn.commit()
+    
+    def enqueue(self, to_email: str, subject: str, html_body: str,
+                text_body: Optional[str] = None, max_attempts: int = 6) -> int:
+        """Add a message to the outbox; returns its ID"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO email_outbox (to_email, subject, html_body, text_body, max_attempts)
+                VALUES (?, ?, ?, ?, ?)
+            """, (to_email, subject, html_body, text_body, max_attempts))
+            conn.commit()
+            return cursor.lastrowid
+    
+    def enqueue_many(self, messages: Iterable[Tuple[str, str, str, Optional[str]]],
+                     max_attempts: int = 6) -> int:
+        """
+        Add many messages in one transaction
+        
+        Args:
+            messages: (to_email, subject, html_body, text_body) tuples
+        
+        Returns:
+            Number of messages added
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                INSERT INTO email_outbox (to_email, subject, html_body, text_body, max_attempts)
+                VALUES (?, ?, ?, ?, ?)
+            """, ((*message, max_attempts) for message in messages))
+            conn.commit()
+            return cursor.rowcount
+    
+    def claim_batch(self, limit: int, lease_seconds: int) -> List[OutboxMessage]:
+        """
+        Atomically take up to limit messages that are due for delivery
+        
+        Queued messages whose retry delay has passed are due, and so are
+        messages left in 'sending' by a sender that died mid-batch.
+        """
+        conn = self.get_connection()
+        try:
+            # Take the write lock up front so two senders can't claim the same rows
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id FROM email_outbox
+                WHERE (status = 'queued' AND next_attempt_at <= CURRENT_TIMESTAMP)
+                   OR (status = 'sending' AND locked_until < CURRENT_TIMESTAMP)
+                ORDER BY id
+                LIMIT ?
+            """, (limit,))
+            ids = [row['id'] for row in cursor.fetchall()]
+            if not ids:
+                conn.rollback()
+                return []
+            
+            placeholders = ', '.join('?' for _ in ids)
+            cursor.execute(f"""
+                UPDATE email_outbox
+                SET status = 'sending',
+                    attempts = attempts + 1,
+                    locked_until = datetime('now', ?)
+                WHERE id IN ({placeholders})
+            """, [f"+{int(lease_seconds)} seconds"] + ids)
+            cursor.execute(f"SELECT * FROM email_outbox WHERE id IN ({placeholders}) ORDER BY id", ids)
+            messages = [self._row_to_message(row) for row in cursor.fetchall()]
+            conn.commit()
+            return messages
+        finally:
+            conn.close()
+    
+    def mark_sent(self, message_ids: List[int]):
+        """Record messages the SMTP server accepted"""
+        if not message_ids:
+            return
+        placeholders = ', '.join('?' for _ in message_ids)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                UPDATE email_outbox
+                SET status = 'sent', locked_until = NULL, last_error = NULL,
+                    sent_at = CURRENT_TIMESTAMP
+                WHERE id IN ({placeholders})
+            """, message_ids)
+            conn.commit()
+    
+    def retry_later(self, message_id: int, error: str, delay_seconds: float):
+        """Put a message back in the outbox after a delay"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE email_outbox
+                SET status = 'queued',
+                    locked_until = NULL,
+                    last_error = ?,
+                    next_attempt_at = datetime('now', ?)
+                WHERE id = ?
+            """, (error, f"+{int(delay_seconds)} seconds", message_id))
+            conn.commit()
+    
+    def release(self, message_ids: List[int], delay_seconds: float = 0):
+        """Return claimed messages untouched (no attempt is counted), due again after a delay"""
+        if not message_ids:
+            return
+        placeholders = ', '.join('?' for _ in message_ids)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                UPDATE email_outbox
+                SET status = 'queued', locked_until = NULL, attempts = MAX(attempts - 1, 0),
+                    next_attempt_at = datetime('now', ?)
+                WHERE id IN ({placeholders}) AND status = 'sending'
+            """, [f"+{int(delay_seconds)} seconds"] + message_ids)
+            conn.commit()
+    
+    def mark_dead(self, message_id: int, error: str):
+        """Move a message to the dead-letter state; it is not retried again"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE email_outbox
+                SET status = 'dead', locked_until = NULL, last_error = ?
+                WHERE id = ?
+            """, (error, message_id))
+            conn.commit()
+    
+    def requeue_dead(self) -> int:
+        """Give every dead-lettered message a fresh set of attempts"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE email_outbox
+                SET status = 'queued', attempts = 0, next_attempt_at = CURRENT_TIMESTAMP
+                WHERE status = 'dead'
+            """)
+            conn.commit()
+            return cursor.rowcount
+    
+    def get_message(self, message_id: int) -> Optional[OutboxMessage]:
+        """Get a message by ID"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM email_outbox WHERE id = ?", (message_id,))
+            row = cursor.fetchone()
+            if row:
+                return self._row_to_message(row)
+            return None
+    
+    def get_dead_letters(self, limit: int = 50) -> List[OutboxMessage]:
+        """Get the most recent dead-lettered messages"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT * FROM email_outbox WHERE status = 'dead'
+                ORDER BY id DESC LIMIT ?
+            """, (limit,))
+            return [self._row_to_message(row) for row in cursor.fetchall()]
+    
+    def count_by_status(self) -> Dict[str, int]:
+        """Get number of messages per status"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT status, COUNT(*) as count FROM email_outbox GROUP BY status")
+            return {row['status']: row['count'] for row in cursor.fetchall()}
+    
+    def purge_sent(self, older_than_days: int = 7) -> int:
+        """Delete delivered messages older than the given age"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                DELETE FROM email_outbox
+                WHERE status = 'sent' AND sent_at < datetime('now', ?)
+            """, (f"-{int(older_than_days)} days",))
+            conn.commit()
+            return cursor.rowcount
+    
+    def _row_to_message(self, row) -> OutboxMessage:
+        """Convert database row to OutboxMessage object"""
+        def parse_time(value):
+            return datetime.fromisoformat(value) if value else None
+        
+        return OutboxMessage(
+            id=row['id'],
+            to_email=row['to_email'],
+            subject=row['subject'],
+            html_body=row['html_body'],
+            text_body=row['text_body'],
+            status=row['status'],
+            attempts=row['attempts'],
+            max_attempts=row['max_attempts'],
+            next_attempt_at=parse_time(row['next_attempt_at']),
+            locked_until=parse_time(row['locked_until']),
+            last_error=row['last_error'],
+            created_at=parse_time(row['created_at']),
+            sent_at=parse_time(row['sent_at'])
+        )
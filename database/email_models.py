@@ -0,0 +1,28 @@
+"""
+Outbound email data models
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass
+class OutboxMessage:
+    """An email waiting in (or delivered from) the outbox"""
+    id: Optional[int] = None
+    to_email: str = ""
+    subject: str = ""
+    html_body: str = ""
+    text_body: Optional[str] = None  # Plain-text alternative, if any
+    status: str = "queued"  # queued, sending, sent, dead
+    attempts: int = 0
+    max_attempts: int = 6
+    next_attempt_at: Optional[datetime] = None
+    locked_until: Optional[datetime] = None
+    last_error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    sent_at: Optional[datetime] = None
+    
+    def is_final_attempt(self) -> bool:
+        """Check if a failure now would exhaust the retries"""
+        return self.attempts >= self.max_attempts
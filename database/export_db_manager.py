@@ -0,0 +1,186 @@
+"""
+Export artifact database operations
+"""
+import json
+import sqlite3
+from pathlib import Path
+from typing import List, Optional, Tuple
+from datetime import datetime
+from database.export_models import ExportArtifact
+from config.settings import DATABASE_PATH
+
+
+class ExportDatabaseManager:
+    """Tracks background export jobs and the files they produce"""
+    
+    def __init__(self, db_path: Path = DATABASE_PATH):
+        """Initialize export database manager"""
+        self.db_path = db_path
+        self.init_database()
+    
+    def get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def init_database(self):
+        """Create export_artifacts table if it doesn't exist"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS export_artifacts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cache_key TEXT NOT NULL UNIQUE,
+                    format TEXT NOT NULL,
+                    filters TEXT NOT NULL,
+                    data_version INTEGER NOT NULL,
+                    status TEXT DEFAULT 'queued',
+                    rows_written INTEGER DEFAULT 0,
+                    total_rows INTEGER DEFAULT 0,
+                    file_path TEXT,
+                    size_bytes INTEGER,
+                    error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    finished_at TIMESTAMP
+                )
+            """)
+            conn.commit()
+    
+    def get_or_create(self, cache_key: str, export_format: str, filters: dict,
+                      data_version: int, total_rows: int) -> Tuple[ExportArtifact, bool]:
+        """
+        Get the artifact for a cache key, inserting a queued one if there is none
+        
+        Returns:
+            (artifact, created); only the caller that created it should
+            enqueue the job, so concurrent requests share one export
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT OR IGNORE INTO export_artifacts
+                (cache_key, format, filters, data_version, total_rows)
+                VALUES (?, ?, ?, ?, ?)
+            """, (cache_key, export_format, json.dumps(filters, sort_keys=True), data_version, total_rows))
+            created = cursor.rowcount > 0
+            cursor.execute("SELECT * FROM export_artifacts WHERE cache_key = ?", (cache_key,))
+            artifact = self._row_to_artifact(cursor.fetchone())
+            conn.commit()
+            return artifact, created
+    
+    def get_artifact(self, artifact_id: int) -> Optional[ExportArtifact]:
+        """Get an artifact by ID"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM export_artifacts WHERE id = ?", (artifact_id,))
+            row = cursor.fetchone()
+            if row:
+                return self._row_to_artifact(row)
+            return None
+    
+    def requeue(self, artifact_id: int, from_status: str) -> bool:
+        """
+        Reset an artifact to queued if it is still in from_status
+        
+        Returns:
+            True for the one caller that made the change (and should enqueue the job)
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE export_artifacts
+                SET status = 'queued', rows_written = 0, error = NULL,
+                    file_path = NULL, size_bytes = NULL, finished_at = NULL
+                WHERE id = ? AND status = ?
+            """, (artifact_id, from_status))
+            conn.commit()
+            return cursor.rowcount > 0
+    
+    def mark_running(self, artifact_id: int):
+        """Record that a worker started building the file"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE export_artifacts SET status = 'running', rows_written = 0 WHERE id = ?
+            """, (artifact_id,))
+            conn.commit()
+    
+    def update_progress(self, artifact_id: int, rows_written: int):
+        """Record how many rows have been written so far"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE export_artifacts SET rows_written = ? WHERE id = ?
+            """, (rows_written, artifact_id))
+            conn.commit()
+    
+    def mark_ready(self, artifact_id: int, file_path: str, size_bytes: int, rows_written: int):
+        """Record the finished file"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE export_artifacts
+                SET status = 'ready', file_path = ?, size_bytes = ?, rows_written = ?,
+                    total_rows = ?, error = NULL, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (file_path, size_bytes, rows_written, rows_written, artifact_id))
+            conn.commit()
+    
+    def mark_failed(self, artifact_id: int, error: str):
+        """Record that the export gave up"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE export_artifacts
+                SET status = 'failed', error = ?, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (error, artifact_id))
+            conn.commit()
+    
+    def get_stale_artifacts(self, current_version: int, max_age_hours: float,
+                            grace_minutes: int = 10) -> List[ExportArtifact]:
+        """
+        Get finished artifacts that should be deleted
+        
+        That is anything older than max_age_hours, plus artifacts built for
+        an older data version once they have been finished for
+        grace_minutes (so downloads already in progress can complete).
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT * FROM export_artifacts
+                WHERE status IN ('ready', 'failed')
+                  AND (created_at < datetime('now', ?)
+                       OR (data_version < ? AND finished_at < datetime('now', ?)))
+            """, (f"-{int(max_age_hours * 60)} minutes", current_version, f"-{int(grace_minutes)} minutes"))
+            return [self._row_to_artifact(row) for row in cursor.fetchall()]
+    
+    def delete_artifact(self, artifact_id: int):
+        """Forget an artifact (its file is removed by the caller)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM export_artifacts WHERE id = ?", (artifact_id,))
+            conn.commit()
+    
+    def _row_to_artifact(self, row) -> ExportArtifact:
+        """Convert database row to ExportArtifact object"""
+        def parse_time(value):
+            return datetime.fromisoformat(value) if value else None
+        
+        return ExportArtifact(
+            id=row['id'],
+            cache_key=row['cache_key'],
+            format=row['format'],
+            filters=json.loads(row['filters']),
+            data_version=row['data_version'],
+            status=row['status'],
+            rows_written=row['rows_written'],
+            total_rows=row['total_rows'],
+            file_path=row['file_path'],
+            size_bytes=row['size_bytes'],
+            error=row['error'],
+            created_at=parse_time(row['created_at']),
+            finished_at=parse_time(row['finished_at'])
+        )
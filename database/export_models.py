@@ -0,0 +1,33 @@
+"""
+Export artifact data models
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass
+class ExportArtifact:
+    """An export file built (or being built) by a background job"""
+    id: Optional[int] = None
+    cache_key: str = ""  # Hash of format, filters and data version
+    format: str = "csv"  # csv, xlsx, parquet
+    filters: dict = field(default_factory=dict)
+    data_version: int = 0
+    status: str = "queued"  # queued, running, ready, failed
+    rows_written: int = 0
+    total_rows: int = 0
+    file_path: Optional[str] = None
+    size_bytes: Optional[int] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    @property
+    def progress(self) -> float:
+        """Fraction of rows written, between 0 and 1"""
+        if self.status == 'ready':
+            return 1.0
+        if not self.total_rows:
+            return 0.0
+        return min(self.rows_written / self.total_rows, 1.0)
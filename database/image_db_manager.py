@@ -0,0 +1,303 @@
+"""
+Image variant registry operations
+"""
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import datetime
+from database.image_models import ImageVariant, ImageBlob
+from config.settings import DATABASE_PATH
+
+
+class ImageDatabaseManager:
+    """Tracks the size variants generated for each stored image"""
+    
+    def __init__(self, db_path: Path = DATABASE_PATH):
+        """Initialize image database manager"""
+        self.db_path = db_path
+        self.init_database()
+    
+    def get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def init_database(self):
+        """Create image tables if they don't exist"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS image_variants (
+                    photo_path TEXT NOT NULL,
+                    variant TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    width INTEGER,
+                    height INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (photo_path, variant)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS image_blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    photo_path TEXT NOT NULL,
+                    ref_count INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_image_blobs_photo_path
+                ON image_blobs (photo_path)
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS image_hashes (
+                    photo_path TEXT PRIMARY KEY,
+                    dhash TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Migration: Add new columns if they don't exist
+            migrations = [
+                "ALTER TABLE image_variants ADD COLUMN format TEXT",
+                "ALTER TABLE image_variants ADD COLUMN size_bytes INTEGER"
+            ]
+            
+            for migration in migrations:
+                try:
+                    cursor.execute(migration)
+                except sqlite3.OperationalError:
+                    # Column already exists
+                    pass
+            
+            conn.commit()
+    
+    def register_variant(self, variant: ImageVariant) -> bool:
+        """Insert or replace a variant record"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT OR REPLACE INTO image_variants
+                    (photo_path, variant, file_path, width, height, format, size_bytes)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (variant.photo_path, variant.variant, variant.file_path,
+                      variant.width, variant.height, variant.format, variant.size_bytes))
+                conn.commit()
+                return True
+        except sqlite3.Error as e:
+            print(f"Error registering image variant: {e}")
+            return False
+    
+    def get_variants(self, photo_path: str) -> Dict[str, ImageVariant]:
+        """Get all registered variants of an image keyed by variant name"""
+        return self.get_variants_for_paths([photo_path]).get(photo_path, {})
+    
+    def get_variants_for_paths(self, photo_paths: List[str]) -> Dict[str, Dict[str, ImageVariant]]:
+        """Get registered variants for several images in one query"""
+        if not photo_paths:
+            return {}
+        
+        placeholders = ', '.join('?' for _ in photo_paths)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT * FROM image_variants
+                WHERE photo_path IN ({placeholders})
+            """, list(photo_paths))
+            
+            variants = {}
+            for row in cursor.fetchall():
+                variant = self._row_to_variant(row)
+                variants.setdefault(variant.photo_path, {})[variant.variant] = variant
+            return variants
+    
+    def delete_variants(self, photo_path: str) -> List[ImageVariant]:
+        """Remove the registry entries of an image and return them"""
+        variants = list(self.get_variants(photo_path).values())
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM image_variants WHERE photo_path = ?", (photo_path,))
+            conn.commit()
+        return variants
+    
+    def get_blob(self, sha256: str) -> Optional[ImageBlob]:
+        """Get a stored blob by content hash"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM image_blobs WHERE sha256 = ?", (sha256,))
+            row = cursor.fetchone()
+            if row:
+                return self._row_to_blob(row)
+            return None
+    
+    def acquire_blob(self, sha256: str, photo_path: str, reset: bool = False) -> int:
+        """
+        Add a reference to a blob, creating it if needed; returns the new count
+        
+        Args:
+            reset: Start the count over at 1, for a blob whose file was lost
+                and has just been written again
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO image_blobs (sha256, photo_path, ref_count)
+                VALUES (?, ?, 1)
+                ON CONFLICT(sha256) DO UPDATE SET
+                    ref_count = CASE WHEN ? THEN 1 ELSE ref_count + 1 END,
+                    photo_path = excluded.photo_path
+            """, (sha256, photo_path, reset))
+            cursor.execute("SELECT ref_count FROM image_blobs WHERE sha256 = ?", (sha256,))
+            ref_count = cursor.fetchone()['ref_count']
+            conn.commit()
+            return ref_count
+    
+    def release_blob(self, photo_path: str) -> Optional[int]:
+        """
+        Drop one reference to the blob stored at photo_path
+        
+        Returns:
+            Remaining reference count (the row is removed at zero), or None
+            if the path is not a tracked blob
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE image_blobs SET ref_count = ref_count - 1
+                WHERE photo_path = ?
+            """, (photo_path,))
+            if cursor.rowcount == 0:
+                return None
+            
+            cursor.execute("SELECT ref_count FROM image_blobs WHERE photo_path = ?", (photo_path,))
+            ref_count = max(cursor.fetchone()['ref_count'], 0)
+            if ref_count == 0:
+                cursor.execute("DELETE FROM image_blobs WHERE photo_path = ?", (photo_path,))
+            conn.commit()
+            return ref_count
+    
+    def iter_blobs(self, batch_size: int = 500) -> Iterator[ImageBlob]:
+        """Yield every stored blob without loading the whole table"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM image_blobs")
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._row_to_blob(row)
+    
+    def set_blob_ref_counts(self, ref_counts: List[Tuple[str, int]]):
+        """
+        Overwrite the reference counts of blobs, keyed by photo path
+        
+        A blob set to zero is forgotten entirely (blob row, variants and
+        hash), leaving its files for the garbage collector.
+        """
+        if not ref_counts:
+            return
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                UPDATE image_blobs SET ref_count = ?
+                WHERE photo_path = ?
+            """, [(ref_count, photo_path) for photo_path, ref_count in ref_counts])
+            
+            unreferenced = [(photo_path,) for photo_path, ref_count in ref_counts if ref_count <= 0]
+            cursor.executemany("DELETE FROM image_blobs WHERE photo_path = ?", unreferenced)
+            cursor.executemany("DELETE FROM image_variants WHERE photo_path = ?", unreferenced)
+            cursor.executemany("DELETE FROM image_hashes WHERE photo_path = ?", unreferenced)
+            conn.commit()
+    
+    def set_hash(self, photo_path: str, dhash: str):
+        """Store the perceptual hash of an image"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT OR REPLACE INTO image_hashes (photo_path, dhash)
+                VALUES (?, ?)
+            """, (photo_path, dhash))
+            conn.commit()
+    
+    def get_hashes_for_paths(self, photo_paths: List[str]) -> Dict[str, str]:
+        """Get the perceptual hashes of several images keyed by photo path"""
+        if not photo_paths:
+            return {}
+        
+        placeholders = ', '.join('?' for _ in photo_paths)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT photo_path, dhash FROM image_hashes
+                WHERE photo_path IN ({placeholders})
+            """, list(photo_paths))
+            return {row['photo_path']: row['dhash'] for row in cursor.fetchall()}
+    
+    def iter_hashes(self, after_rowid: int = 0, batch_size: int = 500) -> Iterator[Tuple[int, str, str]]:
+        """
+        Yield (rowid, photo_path, dhash) for hashed images in insertion order
+        
+        Args:
+            after_rowid: Only hashes stored after the row with this rowid
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT rowid, photo_path, dhash FROM image_hashes
+                WHERE rowid > ?
+                ORDER BY rowid
+            """, (after_rowid,))
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row['rowid'], row['photo_path'], row['dhash']
+    
+    def delete_hash(self, photo_path: str):
+        """Remove the perceptual hash of an image"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM image_hashes WHERE photo_path = ?", (photo_path,))
+            conn.commit()
+    
+    def get_storage_summary(self) -> List[dict]:
+        """Get file count and total bytes per variant and format"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT variant, format, COUNT(*) as files, SUM(size_bytes) as total_bytes
+                FROM image_variants
+                GROUP BY variant, format
+                ORDER BY total_bytes DESC
+            """)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def _row_to_variant(self, row) -> ImageVariant:
+        """Convert database row to ImageVariant object"""
+        return ImageVariant(
+            photo_path=row['photo_path'],
+            variant=row['variant'],
+            file_path=row['file_path'],
+            width=row['width'],
+            height=row['height'],
+            format=row['format'],
+            size_bytes=row['size_bytes'],
+            created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
+        )
+    
+    def _row_to_blob(self, row) -> ImageBlob:
+        """Convert database row to ImageBlob object"""
+        return ImageBlob(
+            sha256=row['sha256'],
+            photo_path=row['photo_path'],
+            ref_count=row['ref_count'],
+            created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
+        )
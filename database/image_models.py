@@ -0,0 +1,28 @@
+"""
+Image data models
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass
+class ImageVariant:
+    """A stored size variant of an uploaded image"""
+    photo_path: str = ""  # Path of the full image as stored on the complaint
+    variant: str = "full"  # original, full, medium, thumb
+    file_path: str = ""  # Relative path of this variant's file
+    width: Optional[int] = None
+    height: Optional[int] = None
+    format: Optional[str] = None  # WEBP, AVIF, JPEG, PNG, ...
+    size_bytes: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+
+@dataclass
+class ImageBlob:
+    """A stored image identified by the SHA-256 of its uploaded bytes"""
+    sha256: str = ""
+    photo_path: str = ""  # Path of the full image as stored on complaints
+    ref_count: int = 0  # Number of complaint photos pointing at this blob
+    created_at: Optional[datetime] = None
@@ -0,0 +1,221 @@
+"""
+Background job database operations
+"""
+import json
+import sqlite3
+from pathlib import Path
+from typing import Optional, List, Dict, Iterator
+from datetime import datetime
+from database.job_models import Job
+from config.settings import DATABASE_PATH
+
+
+class JobDatabaseManager:
+    """Persists background jobs so they survive restarts"""
+    
+    def __init__(self, db_path: Path = DATABASE_PATH):
+        """Initialize job database manager"""
+        self.db_path = db_path
+        self.init_database()
+    
+    def get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def init_database(self):
+        """Create jobs table if it doesn't exist"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT DEFAULT 'queued',
+                    attempts INTEGER DEFAULT 0,
+                    max_attempts INTEGER DEFAULT 5,
+                    run_after TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    locked_until TIMESTAMP,
+                    last_error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    finished_at TIMESTAMP
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after
+                ON jobs (status, run_after)
+            """)
+            conn.commit()
+    
+    def enqueue(self, kind: str, payload: dict, max_attempts: int = 5) -> int:
+        """Insert a new queued job"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO jobs (kind, payload, max_attempts)
+                VALUES (?, ?, ?)
+            """, (kind, json.dumps(payload), max_attempts))
+            conn.commit()
+            return cursor.lastrowid
+    
+    def claim_next(self, kinds: List[str], lease_seconds: int) -> Optional[Job]:
+        """
+        Atomically take the oldest runnable job of the given kinds
+        
+        Queued jobs whose retry delay has passed are runnable, and so are
+        running jobs whose lease expired because their worker died. The
+        claim itself counts as an attempt, so a job whose worker died on
+        its final attempt comes back with attempts > max_attempts.
+        """
+        if not kinds:
+            return None
+        
+        placeholders = ', '.join('?' for _ in kinds)
+        conn = self.get_connection()
+        try:
+            # Take the write lock up front so two workers can't claim the same row
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT id FROM jobs
+                WHERE kind IN ({placeholders})
+                  AND ((status = 'queued' AND run_after <= CURRENT_TIMESTAMP)
+                       OR (status = 'running' AND locked_until < CURRENT_TIMESTAMP))
+                ORDER BY id
+                LIMIT 1
+            """, list(kinds))
+            row = cursor.fetchone()
+            if not row:
+                conn.rollback()
+                return None
+            
+            cursor.execute("""
+                UPDATE jobs
+                SET status = 'running',
+                    attempts = attempts + 1,
+                    locked_until = datetime('now', ?)
+                WHERE id = ?
+            """, (f"+{int(lease_seconds)} seconds", row['id']))
+            cursor.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],))
+            job = self._row_to_job(cursor.fetchone())
+            conn.commit()
+            return job
+        finally:
+            conn.close()
+    
+    def extend_lease(self, job_id: int, lease_seconds: int) -> bool:
+        """Push back the lease of a running job; False if it is no longer running"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE jobs
+                SET locked_until = datetime('now', ?)
+                WHERE id = ? AND status = 'running'
+            """, (f"+{int(lease_seconds)} seconds", job_id))
+            conn.commit()
+            return cursor.rowcount > 0
+    
+    def complete(self, job_id: int):
+        """Mark a job as done"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE jobs
+                SET status = 'done', locked_until = NULL, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (job_id,))
+            conn.commit()
+    
+    def retry_later(self, job_id: int, error: str, delay_seconds: float):
+        """Put a failed job back in the queue after a delay"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE jobs
+                SET status = 'queued',
+                    locked_until = NULL,
+                    last_error = ?,
+                    run_after = datetime('now', ?)
+                WHERE id = ?
+            """, (error, f"+{int(delay_seconds)} seconds", job_id))
+            conn.commit()
+    
+    def fail(self, job_id: int, error: str):
+        """Mark a job as permanently failed"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE jobs
+                SET status = 'failed', locked_until = NULL, last_error = ?,
+                    finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (error, job_id))
+            conn.commit()
+    
+    def get_job(self, job_id: int) -> Optional[Job]:
+        """Get a job by ID"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            if row:
+                return self._row_to_job(row)
+            return None
+    
+    def iter_payloads(self, kind: str, statuses=('queued', 'running'),
+                      batch_size: int = 500) -> Iterator[dict]:
+        """Yield the payloads of jobs of a kind that are still in the given states"""
+        placeholders = ', '.join('?' for _ in statuses)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT payload FROM jobs
+                WHERE kind = ? AND status IN ({placeholders})
+            """, [kind] + list(statuses))
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield json.loads(row['payload'])
+    
+    def count_by_status(self) -> Dict[str, int]:
+        """Get number of jobs per status"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT status, COUNT(*) as count FROM jobs GROUP BY status")
+            return {row['status']: row['count'] for row in cursor.fetchall()}
+    
+    def purge_finished(self, older_than_days: int = 7) -> int:
+        """Delete finished jobs older than the given age"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                DELETE FROM jobs
+                WHERE status IN ('done', 'failed')
+                  AND finished_at < datetime('now', ?)
+            """, (f"-{int(older_than_days)} days",))
+            conn.commit()
+            return cursor.rowcount
+    
+    def _row_to_job(self, row) -> Job:
+        """Convert database row to Job object"""
+        def parse_time(value):
+            return datetime.fromisoformat(value) if value else None
+        
+        return Job(
+            id=row['id'],
+            kind=row['kind'],
+            payload=json.loads(row['payload']),
+            status=row['status'],
+            attempts=row['attempts'],
+            max_attempts=row['max_attempts'],
+            run_after=parse_time(row['run_after']),
+            locked_until=parse_time(row['locked_until']),
+            last_error=row['last_error'],
+            created_at=parse_time(row['created_at']),
+            finished_at=parse_time(row['finished_at'])
+        )
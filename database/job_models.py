@@ -0,0 +1,30 @@
+"""
+Background job data models
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass
+class Job:
+    """Background job model"""
+    id: Optional[int] = None
+    kind: str = ""  # Name of the registered handler
+    payload: dict = field(default_factory=dict)
+    status: str = "queued"  # queued, running, done, failed
+    attempts: int = 0
+    max_attempts: int = 5
+    run_after: Optional[datetime] = None
+    locked_until: Optional[datetime] = None
+    last_error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    def is_final_attempt(self) -> bool:
+        """Check if a failure now would exhaust the retries"""
+        return self.attempts >= self.max_attempts
+    
+    def is_exhausted(self) -> bool:
+        """Check if the job was claimed more times than it may run (a lost final attempt)"""
+        return self.attempts > self.max_attempts
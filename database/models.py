@@ -3,7 +3,7 @@ Database models for the Pothole Complaint Portal
 """
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 @dataclass
 class Complaint:
@@ -22,6 +22,8 @@ class Complaint:
     user_id: Optional[int] = None  # User who created the complaint
     assigned_to: Optional[int] = None  # Admin/Moderator assigned to handle
     updated_by: Optional[int] = None  # Last user who updated the complaint
+    processing_status: str = "ready"  # processing, ready, failed (background photo processing)
+    similar_complaints: str = ""  # "id:distance" of earlier reports with similar photos, semicolon-separated
     
     def get_tags_list(self) -> List[str]:
         """Convert tags string to list"""
@@ -39,8 +41,20 @@ class Complaint:
         """Convert photo paths list to string"""
         self.photo_path = ';'.join(paths_list)
     
-   
-     def to_dict(self):
+    def get_similar_complaints(self) -> List[Tuple[int, int]]:
+        """Convert similar_complaints string to (complaint ID, hash distance) pairs"""
+        pairs = []
+        for entry in self.similar_complaints.split(';'):
+            complaint_id, _, distance = entry.partition(':')
+            if complaint_id.strip().isdigit() and distance.strip().isdigit():
+                pairs.append((int(complaint_id), int(distance)))
+        return pairs
+    
+    def is_processing(self) -> bool:
+        """Check if the photos are still being processed in the background"""
+        return self.processing_status == "processing"
+    
+    def to_dict(self):
         """Convert to dictionary"""
         return {
             'id': self.id,
@@ -56,5 +70,7 @@ class Complaint:
             'resolution_time_hours': self.resolution_time_hours,
             'user_id': self.user_id,
             'assigned_to': self.assigned_to,
-            'updated_by': self.updated_by
+            'updated_by': self.updated_by,
+            'processing_status': self.processing_status,
+            'similar_complaints': self.similar_complaints
         }
@@ -0,0 +1,168 @@
+"""
+Notification event database operations
+"""
+import sqlite3
+from pathlib import Path
+from typing import List
+from datetime import datetime
+from database.notification_models import NotificationEvent
+from config.settings import DATABASE_PATH
+
+
+class NotificationDatabaseManager:
+    """Buffers notification events until they are sent as a digest"""
+    
+    def __init__(self, db_path: Path = DATABASE_PATH):
+        """Initialize notification database manager"""
+        self.db_path = db_path
+        self.init_database()
+    
+    def get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def init_database(self):
+        """Create notification_events table if it doesn't exist"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS notification_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    recipient_email TEXT NOT NULL,
+                    recipient_name TEXT,
+                    event_type TEXT NOT NULL,
+                    complaint_id INTEGER NOT NULL,
+                    location TEXT,
+                    description TEXT,
+                    old_status TEXT,
+                    new_status TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    claimed_until TIMESTAMP,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            
+            # Migration: Add new columns if they don't exist
+            try:
+                cursor.execute("ALTER TABLE notification_events ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                # Column already exists
+                pass
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_notification_events_recipient
+                ON notification_events (recipient_email, created_at)
+            """)
+            conn.commit()
+    
+    def add_event(self, event: NotificationEvent) -> int:
+        """Buffer an event; returns its ID"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO notification_events
+                (recipient_email, recipient_name, event_type, complaint_id, location,
+                 description, old_status, new_status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                event.recipient_email, event.recipient_name, event.event_type,
+                event.complaint_id, event.location, event.description,
+                event.old_status, event.new_status
+            ))
+            conn.commit()
+            return cursor.lastrowid
+    
+    def get_due_recipients(self, window_seconds: int) -> List[str]:
+        """Recipients whose oldest unclaimed event has waited at least window_seconds"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT recipient_email FROM notification_events
+                WHERE claimed_until IS NULL OR claimed_until < CURRENT_TIMESTAMP
+                GROUP BY recipient_email
+                HAVING MIN(created_at) <= datetime('now', ?)
+            """, (f"-{int(window_seconds)} seconds",))
+            return [row['recipient_email'] for row in cursor.fetchall()]
+    
+    def claim_events(self, recipient_email: str, lease_seconds: int) -> List[NotificationEvent]:
+        """
+        Atomically take every unclaimed event for a recipient
+        
+        The events stay in the table until delete_events() is called after
+        the digest is queued; if that never happens, the lease runs out and
+        they are claimed again. Each claim counts as an attempt.
+        """
+        conn = self.get_connection()
+        try:
+            # Take the write lock up front so two senders can't claim the same rows
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT * FROM notification_events
+                WHERE recipient_email = ?
+                  AND (claimed_until IS NULL OR claimed_until < CURRENT_TIMESTAMP)
+                ORDER BY id
+            """, (recipient_email,))
+            events = [self._row_to_event(row) for row in cursor.fetchall()]
+            if not events:
+                conn.rollback()
+                return []
+            
+            ids = [event.id for event in events]
+            placeholders = ', '.join('?' for _ in ids)
+            cursor.execute(f"""
+                UPDATE notification_events
+                SET claimed_until = datetime('now', ?), attempts = attempts + 1
+                WHERE id IN ({placeholders})
+            """, [f"+{int(lease_seconds)} seconds"] + ids)
+            conn.commit()
+            for event in events:
+                event.attempts += 1
+            return events
+        finally:
+            conn.close()
+    
+    def release_events(self, event_ids: List[int]):
+        """Give claimed events back, e.g. when queueing their digest failed"""
+        self._update_ids("UPDATE notification_events SET claimed_until = NULL WHERE id IN ({})", event_ids)
+    
+    def delete_events(self, event_ids: List[int]):
+        """Drop events whose digest has been queued"""
+        self._update_ids("DELETE FROM notification_events WHERE id IN ({})", event_ids)
+    
+    def count_pending(self) -> int:
+        """Number of buffered events"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM notification_events")
+            return cursor.fetchone()[0]
+    
+    def _update_ids(self, query: str, event_ids: List[int]):
+        """Run a statement over a list of event IDs"""
+        if not event_ids:
+            return
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query.format(', '.join('?' for _ in event_ids)), event_ids)
+            conn.commit()
+    
+    def _row_to_event(self, row) -> NotificationEvent:
+        """Convert database row to NotificationEvent object"""
+        def parse_time(value):
+            return datetime.fromisoformat(value) if value else None
+        
+        return NotificationEvent(
+            id=row['id'],
+            recipient_email=row['recipient_email'],
+            recipient_name=row['recipient_name'] or "",
+            event_type=row['event_type'],
+            complaint_id=row['complaint_id'],
+            location=row['location'] or "",
+            description=row['description'] or "",
+            old_status=row['old_status'],
+            new_status=row['new_status'],
+            created_at=parse_time(row['created_at']),
+            claimed_until=parse_time(row['claimed_until']),
+            attempts=row['attempts']
+        )
@@ -0,0 +1,30 @@
+"""
+Notification event data models
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass
+class NotificationEvent:
+    """A change someone should hear about, waiting for the next digest"""
+    id: Optional[int] = None
+    recipient_email: str = ""
+    recipient_name: str = ""
+    event_type: str = "status"  # status, assignment
+    complaint_id: int = 0
+    location: str = ""
+    description: str = ""
+    old_status: Optional[str] = None
+    new_status: Optional[str] = None
+    created_at: Optional[datetime] = None
+    claimed_until: Optional[datetime] = None
+    attempts: int = 0  # Times a digest including this event was tried
+    
+    @property
+    def key(self) -> str:
+        """Name used by NOTIFICATION_IMMEDIATE_EVENTS ("assignment", "status:resolved")"""
+        if self.event_type == 'status':
+            return f"status:{self.new_status}"
+        return self.event_type
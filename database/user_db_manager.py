@@ -2,12 +2,12 @@
 User database operations
 """
 import sqlite3
-import bcrypt
 from pathlib import Path
 from typing import Optional, List
 from datetime import datetime
 from database.user_models import User
 from config.settings import DATABASE_PATH
+from utils.password_utils import get_password_hasher
 
 
 class UserDatabaseManager:
@@ -42,6 +42,17 @@ class UserDatabaseManager:
                     address TEXT
                 )
             """)
+            # Login sessions; the primary key makes each validation one index lookup
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    token_hash TEXT PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    expires_at TIMESTAMP NOT NULL,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id)")
             conn.commit()
             
             # Create default admin if no users exist
@@ -64,14 +75,13 @@ class UserDatabaseManager:
     
     @staticmethod
     def hash_password(password: str) -> str:
-        """Hash password using bcrypt"""
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        """Hash password using bcrypt (on the shared password hashing pool)"""
+        return get_password_hasher().hash(password)
     
     @staticmethod
     def verify_password(password: str, password_hash: str) -> bool:
-        """Verify password against hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        """Verify password against hash (on the shared password hashing pool)"""
+        return get_password_hasher().verify(password, password_hash)
     
     def create_user(self, user: User) -> Optional[int]:
         """Create a new user"""
@@ -120,13 +130,34 @@ class UserDatabaseManager:
             return None
     
     def authenticate_user(self, username: str, password: str) -> Optional[User]:
-        """Authenticate user with username and password"""
+        """
+        Authenticate user with username and password
+        
+        If the stored hash uses a different bcrypt cost than BCRYPT_ROUNDS,
+        it is replaced in the background, so the login isn't slowed down.
+        """
         user = self.get_user_by_username(username)
         if user and user.is_active:
             if self.verify_password(password, user.password_hash):
+                hasher = get_password_hasher()
+                if hasher.needs_rehash(user.password_hash):
+                    hasher.submit(self._rehash_password, user.id, password, user.password_hash)
                 return user
         return None
     
+    def _rehash_password(self, user_id: int, password: str, old_hash: str):
+        """Store a hash at the current cost (runs on the hashing pool)"""
+        try:
+            new_hash = get_password_hasher().hash_inline(password)
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                # Only if the password wasn't changed in the meantime; sessions stay valid
+                cursor.execute("UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?",
+                               (new_hash, user_id, old_hash))
+                conn.commit()
+        except Exception as e:
+            print(f"Error upgrading password hash: {e}")
+    
     def get_all_users(self) -> List[User]:
         """Get all users (admin only)"""
         with self.get_connection() as conn:
@@ -152,6 +183,8 @@ class UserDatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("UPDATE users SET is_active = 0 WHERE id = ?", (user_id,))
+                # Log the user out everywhere
+                cursor.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
                 conn.commit()
                 return True
         except Exception as e:
@@ -178,12 +211,69 @@ class UserDatabaseManager:
                 cursor = conn.cursor()
                 cursor.execute("UPDATE users SET password_hash = ? WHERE id = ?", 
                              (password_hash, user_id))
+                # Sessions from before the change must log in with the new password
+                cursor.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
                 conn.commit()
                 return True
         except Exception as e:
             print(f"Error updating password: {e}")
             return False
     
+    def create_session(self, token_hash: str, user_id: int, ttl_hours: float) -> bool:
+        """Store a new login session (only the token's hash is kept)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO sessions (token_hash, user_id, expires_at)
+                    VALUES (?, ?, datetime('now', ?))
+                """, (token_hash, user_id, f"{int(ttl_hours * 3600):+d} seconds"))
+                conn.commit()
+                return True
+        except Exception as e:
+            print(f"Error creating session: {e}")
+            return False
+    
+    def get_session_user(self, token_hash: str) -> Optional[User]:
+        """Get the active user of an unexpired session"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT users.* FROM sessions
+                JOIN users ON users.id = sessions.user_id
+                WHERE sessions.token_hash = ?
+                  AND sessions.expires_at > CURRENT_TIMESTAMP
+                  AND users.is_active = 1
+            """, (token_hash,))
+            row = cursor.fetchone()
+            if row:
+                return self._row_to_user(row)
+            return None
+    
+    def delete_session(self, token_hash: str) -> bool:
+        """Revoke one session (logout)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM sessions WHERE token_hash = ?", (token_hash,))
+            conn.commit()
+            return cursor.rowcount > 0
+    
+    def delete_user_sessions(self, user_id: int) -> int:
+        """Revoke every session of a user; returns how many there were"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+            conn.commit()
+            return cursor.rowcount
+    
+    def purge_expired_sessions(self) -> int:
+        """Delete expired sessions"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM sessions WHERE expires_at <= CURRENT_TIMESTAMP")
+            conn.commit()
+            return cursor.rowcount
+    
     def _row_to_user(self, row) -> User:
         """Convert database row to User object"""
         return User(
@@ -0,0 +1,101 @@
+"""
+Export complaints to CSV, Excel, Parquet, GeoJSON or GeoPackage for
+analytics pipelines and GIS
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from config.settings import PARQUET_COMPRESSION
+from services.export_service import ExportService, PARQUET_PARTITIONS
+
+
+def export_changes(output: Path, consumer: str):
+    """Write the changes a consumer hasn't received yet as NDJSON"""
+    print("=" * 60)
+    print("PathPatrol Incremental Export")
+    print("=" * 60)
+    
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'wb') as f:
+        result = ExportService().export_changes(consumer, f)
+    
+    if result['since'] is None:
+        print(f"\n🆕 First export for '{consumer}': full snapshot")
+    else:
+        print(f"\n🔖 Changes for '{consumer}' since version {result['since']}")
+    print(f"✏️ Created/changed: {result['upserts']}")
+    print(f"🗑️ Deleted: {result['deletes']}")
+    print(f"🔖 New watermark: {result['watermark']}")
+    print(f"💾 Size: {output.stat().st_size / 1024:.1f} KB")
+
+
+def export_data(output: Path, export_format: str, partition_by: list, compression: str,
+                filters: dict):
+    """Write the complaint table to a file (or a partitioned Parquet directory)"""
+    print("=" * 60)
+    print("PathPatrol Data Export")
+    print("=" * 60)
+    
+    exporter = ExportService()
+    
+    if export_format == 'parquet' and partition_by:
+        print(f"\n📁 Writing Parquet dataset to {output}/ partitioned by {', '.join(partition_by)}")
+        counts = exporter.write_parquet_dataset(output, partition_by=partition_by,
+                                                compression=compression, filters=filters)
+        total_bytes = sum(Path(file_path).stat().st_size for file_path in counts)
+        print(f"\n✅ Rows: {sum(counts.values())}")
+        print(f"📄 Files: {len(counts)}")
+        print(f"💾 Size: {total_bytes / (1024 * 1024):.1f} MB")
+        return
+    
+    print(f"\n📄 Writing {export_format} to {output}")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if export_format == 'gpkg':
+        count = exporter.write_geopackage(output, filters=filters)
+    else:
+        with open(output, 'wb') as f:
+            if export_format == 'parquet':
+                count = exporter.write_parquet(f, compression=compression, filters=filters)
+            else:
+                count = exporter.write(export_format, f, filters=filters)
+    
+    print(f"\n✅ Rows: {count}")
+    print(f"💾 Size: {output.stat().st_size / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("output", type=Path,
+                        help="Output file, or directory for a partitioned Parquet dataset")
+    parser.add_argument("--format", dest="export_format",
+                        choices=["csv", "xlsx", "parquet", "geojsonl", "gpkg"],
+                        default="parquet", help="Output format (default: parquet)")
+    parser.add_argument("--status", help="Only complaints with this status")
+    parser.add_argument("--bbox", nargs=4, type=float,
+                        metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"),
+                        help="Only complaints inside this bounding box")
+    parser.add_argument("--partition-by", nargs="+", choices=PARQUET_PARTITIONS, default=[],
+                        help="Split a Parquet export into month=/status= directories")
+    parser.add_argument("--changes-for", metavar="CONSUMER",
+                        help="Only write rows created, changed or deleted since this consumer's "
+                             "last export, as NDJSON, and remember the new watermark")
+    parser.add_argument("--compression", choices=["zstd", "snappy", "gzip", "none"],
+                        default=PARQUET_COMPRESSION,
+                        help=f"Parquet compression codec (default: {PARQUET_COMPRESSION})")
+    args = parser.parse_args()
+    
+    if args.changes_for and args.partition_by:
+        parser.error("--partition-by can't be combined with --changes-for")
+    if args.partition_by and args.export_format != 'parquet':
+        parser.error("--partition-by only applies to --format parquet")
+    
+    if args.changes_for:
+        export_changes(args.output, args.changes_for)
+    else:
+        filters = {'status': args.status, 'bbox': args.bbox}
+        export_data(args.output, args.export_format, args.partition_by, args.compression, filters)
@@ -41,6 +41,7 @@ def fix_complaints_without_gps():
         return
     
     print(f"Found {len(complaints)} complaint(s) without GPS coordinates\n")
+    updated_ids = []
     
     for complaint_id, location in complaints:
         print(f"Complaint #{complaint_id}: {location}")
@@ -61,6 +62,7 @@ def fix_complaints_without_gps():
                     SET latitude = ?, longitude = ?
                     WHERE id = ?
                 """, (lat, lon, complaint_id))
+                updated_ids.append(complaint_id)
                 
                 print(f"  ✅ Updated with GPS: {lat:.6f}, {lon:.6f}")
                 print(f"  📍 Full location: {full_name}\n")
@@ -69,6 +71,19 @@ def fix_complaints_without_gps():
         except Exception as e:
             print(f"  ⚠️ Error: {e}\n")
     
+    # Let running app instances drop their cached query results, and stamp
+    # the fixed rows so incremental exports pick them up
+    try:
+        cursor.execute("UPDATE app_meta SET value = value + 1 WHERE key = 'data_version'")
+        cursor.executemany("""
+            UPDATE complaints
+            SET updated_at = CURRENT_TIMESTAMP,
+                change_seq = (SELECT value FROM app_meta WHERE key = 'data_version')
+            WHERE id = ?
+        """, [(complaint_id,) for complaint_id in updated_ids])
+    except sqlite3.OperationalError:
+        pass  # Database created before the data version existed
+    
     conn.commit()
     conn.close()
     print("✅ GPS fix complete!")
@@ -0,0 +1,58 @@
+"""
+Delete or quarantine uploaded files that no complaint references anymore
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from config.settings import GC_GRACE_HOURS
+from services.cleanup_service import CleanupService
+
+
+def gc_uploads(grace_hours: float, quarantine: bool, dry_run: bool, batch_size: int):
+    """Collect orphaned uploads and staged files"""
+    print("=" * 60)
+    print("PathPatrol Orphaned Upload Cleanup")
+    print("=" * 60)
+    
+    cleanup = CleanupService()
+    print(f"\n📁 Upload Directory: {cleanup.upload_dir}")
+    print(f"⏳ Grace period: {grace_hours:g} hours")
+    if dry_run:
+        print("ℹ️  Dry run - no files will be removed")
+    elif quarantine:
+        print(f"📦 Orphans will be moved to {cleanup.quarantine_dir}")
+    
+    result = cleanup.collect_garbage(
+        grace_hours=grace_hours,
+        quarantine=quarantine,
+        dry_run=dry_run,
+        batch_size=batch_size
+    )
+    
+    action = "Would collect" if dry_run else ("Quarantined" if quarantine else "Deleted")
+    print(f"\n🔍 Scanned: {result['scanned']}")
+    print(f"✅ Referenced: {result['referenced']}")
+    print(f"⏭️ Too recent to collect: {result['recent']}")
+    print(f"🗑️ {action}: {result['collected']}")
+    print(f"💾 Reclaimed: {result['reclaimed_bytes'] / (1024 * 1024):.1f} MB")
+    print(f"🔢 Blob reference counts {'to fix' if dry_run else 'fixed'}: {result['reconciled']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--grace-hours", type=float, default=GC_GRACE_HOURS,
+                        help=f"Only collect files older than this (default: {GC_GRACE_HOURS})")
+    parser.add_argument("--quarantine", action="store_true",
+                        help="Move orphans to data/quarantine instead of deleting them")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only report what would be collected")
+    parser.add_argument("--batch-size", type=int, default=500,
+                        help="Files checked per database lookup (default: 500)")
+    args = parser.parse_args()
+    
+    gc_uploads(args.grace_hours, args.quarantine, args.dry_run, args.batch_size)
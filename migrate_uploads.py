@@ -0,0 +1,43 @@
+"""
+Move existing uploads from the flat upload directory into shard directories
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from services import StorageService
+
+
+def migrate_uploads(batch_size: int, pause: float, dry_run: bool):
+    """Shard the upload directory; safe to run while the app is online"""
+    print("=" * 60)
+    print("PathPatrol Upload Directory Migration")
+    print("=" * 60)
+    
+    storage = StorageService()
+    print(f"\n📁 Upload Directory: {storage.upload_dir}")
+    if dry_run:
+        print("ℹ️  Dry run - no files will be moved")
+    
+    result = storage.migrate_to_shards(batch_size=batch_size, pause=pause, dry_run=dry_run)
+    
+    print(f"\n✅ Moved: {result['moved']}")
+    print(f"⏭️ Skipped (directories, placeholders, temp files): {result['skipped']}")
+    print(f"⚠️ Already present in shard (left in place): {result['conflicts']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--batch-size", type=int, default=500,
+                        help="Files moved between pauses (default: 500)")
+    parser.add_argument("--pause", type=float, default=0.5,
+                        help="Seconds to sleep after each batch (default: 0.5)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only report what would be moved")
+    args = parser.parse_args()
+    
+    migrate_uploads(args.batch_size, args.pause, args.dry_run)
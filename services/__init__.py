@@ -1,7 +1,32 @@
 """
 Services package initialization
+
+Only the registry getters are cheap to import; the service modules pull
+in Pillow, the job queue and the image server, so they are imported on
+first attribute access.
 """
-from .complaint_service import ComplaintService
-from .storage_service import StorageService
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    'ComplaintService': 'complaint_service',
+    'StorageService': 'storage_service',
+    'get_complaint_service': 'registry',
+    'get_storage_service': 'registry',
+    'get_database_manager': 'registry',
+    'get_user_db_manager': 'registry',
+    'get_export_service': 'registry',
+    'get_export_job_service': 'registry',
+    'get_session_service': 'registry'
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = ['ComplaintService', 'StorageService']
+def __getattr__(name):
+    """Import the submodule that provides a name on first use"""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
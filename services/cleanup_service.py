@@ -0,0 +1,250 @@
+"""
+Cleanup service for files no complaint refers to anymore
+"""
+import os
+import time
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Iterator, List
+from database import DatabaseManager
+from database.image_db_manager import ImageDatabaseManager
+from database.job_db_manager import JobDatabaseManager
+from .complaint_service import PROCESS_PHOTOS_JOB
+from config.settings import (
+    UPLOAD_DIR, STAGING_DIR, QUARANTINE_DIR, DATABASE_PATH, GC_GRACE_HOURS
+)
+
+
+class CleanupService:
+    """Finds and removes orphaned uploads and staged files"""
+    
+    def __init__(self, upload_dir: Path = UPLOAD_DIR, staging_dir: Path = STAGING_DIR,
+                 quarantine_dir: Path = QUARANTINE_DIR, db_path: Path = DATABASE_PATH):
+        """Initialize cleanup service"""
+        self.upload_dir = upload_dir
+        self.staging_dir = staging_dir
+        self.quarantine_dir = quarantine_dir
+        self.db = DatabaseManager(db_path)
+        self.image_db = ImageDatabaseManager(db_path)
+        self.job_db = JobDatabaseManager(db_path)
+    
+    def collect_garbage(self, grace_hours: float = GC_GRACE_HOURS, quarantine: bool = False,
+                        dry_run: bool = False, batch_size: int = 500) -> dict:
+        """
+        Delete or quarantine files that nothing references
+        
+        The roots are the photo paths on complaints and the staged files of
+        pending jobs. They and the registered variants of each root photo
+        are streamed into a scratch SQLite database on disk, and the upload
+        tree is walked with os.scandir and checked against it one batch at
+        a time, so memory stays flat however many files there are. Files
+        modified within the grace period are skipped: a photo is written
+        before its path is recorded on the complaint.
+        
+        Blob reference counts are reset to the number of complaint photos
+        pointing at each blob, so a count leaked by a failed upload or
+        delete can't keep its files alive. While photo jobs are pending, a
+        job may hold a blob it hasn't recorded on its complaint yet, so
+        every blob stays a root and the counts are left alone.
+        
+        Args:
+            grace_hours: Minimum file age before it can be collected
+            quarantine: Move orphans to the quarantine directory instead
+                of deleting them
+            dry_run: Only report what would be collected
+            batch_size: Files checked per lookup query
+        
+        Returns:
+            Dictionary with scanned, referenced, recent, collected,
+            reclaimed_bytes and reconciled (blob counts corrected) counts
+        """
+        result = {'scanned': 0, 'referenced': 0, 'recent': 0,
+                  'collected': 0, 'reclaimed_bytes': 0, 'reconciled': 0}
+        cutoff = time.time() - grace_hours * 3600
+        
+        # An empty name gives a private temporary database on disk
+        scratch = sqlite3.connect('')
+        try:
+            if self._load_referenced(scratch, batch_size):
+                blob_paths = (blob.photo_path for blob in self.image_db.iter_blobs(batch_size))
+                self._insert_roots(scratch, blob_paths, batch_size)
+            else:
+                result['reconciled'] = self._reconcile_blobs(scratch, dry_run, batch_size)
+            
+            for root, files in (('uploads', self._walk(self.upload_dir)),
+                                ('staging', self._walk(self.staging_dir))):
+                batch = []
+                for entry in files:
+                    batch.append(entry)
+                    if len(batch) >= batch_size:
+                        self._collect_batch(scratch, root, batch, cutoff, quarantine, dry_run, result)
+                        batch = []
+                if batch:
+                    self._collect_batch(scratch, root, batch, cutoff, quarantine, dry_run, result)
+        finally:
+            scratch.close()
+        
+        return result
+    
+    def _load_referenced(self, scratch: sqlite3.Connection, batch_size: int) -> bool:
+        """
+        Fill the scratch database with every referenced (root, name) pair
+        
+        Returns:
+            True if photo jobs are still queued or running
+        """
+        scratch.execute("""
+            CREATE TABLE referenced (
+                root TEXT NOT NULL,
+                name TEXT NOT NULL,
+                PRIMARY KEY (root, name)
+            ) WITHOUT ROWID
+        """)
+        # Complaint photo paths with the number of complaint photos using each
+        scratch.execute("""
+            CREATE TABLE photo_refs (
+                photo_path TEXT PRIMARY KEY,
+                refs INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+        
+        for batch in self._batches(self.db.iter_photo_paths(batch_size), batch_size):
+            scratch.executemany("""
+                INSERT INTO photo_refs (photo_path, refs) VALUES (?, 1)
+                ON CONFLICT(photo_path) DO UPDATE SET refs = refs + 1
+            """, [(path,) for path in batch])
+        self._insert_roots(scratch, self._iter_photo_refs(scratch, batch_size), batch_size)
+        
+        jobs_pending = False
+        staged = []
+        for payload in self.job_db.iter_payloads(PROCESS_PHOTOS_JOB, batch_size=batch_size):
+            jobs_pending = True
+            staged.extend(payload.get('staged', []))
+        self._insert_names(scratch, 'staging', staged, batch_size)
+        scratch.commit()
+        return jobs_pending
+    
+    def _iter_photo_refs(self, scratch: sqlite3.Connection, batch_size: int) -> Iterator[str]:
+        """Yield the root photo paths collected in the scratch database"""
+        # Its own cursor, so the caller can keep inserting while this one reads
+        cursor = scratch.cursor()
+        cursor.execute("SELECT photo_path FROM photo_refs")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row[0]
+    
+    def _insert_roots(self, scratch: sqlite3.Connection, photo_paths: Iterable[str], batch_size: int):
+        """Mark root photos and every registered variant of them as referenced"""
+        for batch in self._batches(photo_paths, batch_size):
+            variants = self.image_db.get_variants_for_paths(batch)
+            file_paths = [variant.file_path for by_name in variants.values() for variant in by_name.values()]
+            self._insert_names(scratch, 'uploads', batch + file_paths, batch_size)
+    
+    def _reconcile_blobs(self, scratch: sqlite3.Connection, dry_run: bool, batch_size: int) -> int:
+        """
+        Reset blob reference counts to the complaint photos that use them
+        
+        Returns:
+            Number of blobs whose count was (or, on a dry run, would be) changed
+        """
+        reconciled = 0
+        for batch in self._batches(self.image_db.iter_blobs(batch_size), batch_size):
+            placeholders = ', '.join('?' for _ in batch)
+            cursor = scratch.execute(f"""
+                SELECT photo_path, refs FROM photo_refs
+                WHERE photo_path IN ({placeholders})
+            """, [blob.photo_path for blob in batch])
+            refs = dict(cursor.fetchall())
+            
+            changes = [
+                (blob.photo_path, refs.get(blob.photo_path, 0)) for blob in batch
+                if blob.ref_count != refs.get(blob.photo_path, 0)
+            ]
+            reconciled += len(changes)
+            if changes and not dry_run:
+                self.image_db.set_blob_ref_counts(changes)
+        return reconciled
+    
+    @staticmethod
+    def _batches(items: Iterable, batch_size: int) -> Iterator[list]:
+        """Split an iterable into lists of at most batch_size items"""
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def _insert_names(self, scratch: sqlite3.Connection, root: str,
+                      paths: Iterable[str], batch_size: int):
+        """Insert the file names of the given paths in batches"""
+        batch = []
+        for path in paths:
+            batch.append((root, Path(path).name))
+            if len(batch) >= batch_size:
+                scratch.executemany("INSERT OR IGNORE INTO referenced VALUES (?, ?)", batch)
+                batch = []
+        if batch:
+            scratch.executemany("INSERT OR IGNORE INTO referenced VALUES (?, ?)", batch)
+    
+    def _walk(self, directory: Path) -> Iterator[os.DirEntry]:
+        """Yield every file under a directory, one open directory at a time"""
+        if not directory.exists():
+            return
+        
+        pending = [directory]
+        while pending:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False) and not entry.name.startswith('.'):
+                        yield entry
+    
+    def _collect_batch(self, scratch: sqlite3.Connection, root: str, batch: List[os.DirEntry],
+                       cutoff: float, quarantine: bool, dry_run: bool, result: dict):
+        """Check one batch of files against the referenced names and collect orphans"""
+        placeholders = ', '.join('?' for _ in batch)
+        cursor = scratch.execute(f"""
+            SELECT name FROM referenced
+            WHERE root = ? AND name IN ({placeholders})
+        """, [root] + [entry.name for entry in batch])
+        referenced = {row[0] for row in cursor.fetchall()}
+        
+        for entry in batch:
+            result['scanned'] += 1
+            if entry.name in referenced:
+                result['referenced'] += 1
+                continue
+            
+            try:
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_mtime > cutoff:
+                    result['recent'] += 1
+                    continue
+                
+                if not dry_run:
+                    if quarantine:
+                        target = self._quarantine_path(root, entry.path)
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        os.replace(entry.path, target)
+                    else:
+                        os.unlink(entry.path)
+                
+                result['collected'] += 1
+                result['reclaimed_bytes'] += stat.st_size
+            except FileNotFoundError:
+                # Removed by the app while we were looking at it
+                continue
+            except OSError as e:
+                print(f"Error collecting {entry.path}: {e}")
+    
+    def _quarantine_path(self, root: str, file_path: str) -> Path:
+        """Quarantine location that keeps the file's place in its tree"""
+        base = self.upload_dir if root == 'uploads' else self.staging_dir
+        return self.quarantine_dir / root / Path(file_path).relative_to(base)
@@ -1,25 +1,61 @@
 """
 Complaint service for business logic
 """
-from typing import List, Optional
+from dataclasses import replace
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
 from database import DatabaseManager, Complaint
 from .storage_service import StorageService
-from .email_service import EmailService
+from .export_service import ExportService
+from .notification_service import get_notification_service
+from .events import get_event_bus, DomainEvent, ComplaintCreated, StatusChanged, Assigned, Deleted
+from .webhook_service import WebhookPublisher
+from .job_queue import get_job_queue
+from .duplicate_service import get_duplicate_detector
+from .image_server import get_image_server
+from .query_cache import QueryCache
+from config.settings import (
+    QUERY_CACHE_MAX_ROWS, QUERY_CACHE_TTL, QUERY_CACHE_TTLS, QUERY_CACHE_VERSION_MAX_AGE, WEBHOOK_URLS
+)
 import os
 
-    class ComplaintService:
-    """Handles complaint-related business logic"""
+# Job kind for turning staged uploads into stored photos
+PROCESS_PHOTOS_JOB = 'process_complaint_photos'
+
 
-    def __init__(self):
-        """Initialize complaint service"""
-        self.db = DatabaseManager()
-        self.storage = StorageService()
-        # Initialize email service if notifications are enabled
+class ComplaintService:
+    """Handles complaint-related business logic"""
+    
+    def __init__(self, db: Optional[DatabaseManager] = None,
+                 storage: Optional[StorageService] = None):
+        """Initialize complaint service (pass shared managers to avoid re-initializing them)"""
+        self.db = db or DatabaseManager()
+        self.storage = storage or StorageService()
+        # Status and assignment emails go through the digest buffer if enabled
         self.email_enabled = os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'false').lower() == 'true'
         if self.email_enabled:
-            self.email_service = EmailService()
+            self.notifications = get_notification_service()
         else:
-            self.email_service = None
+            self.notifications = None
+        
+        # Side effects of writes run as event subscribers, off the request path
+        self.events = get_event_bus()
+        if self.notifications:
+            self.events.subscribe('notify_status_change', StatusChanged, self._notify_status_change)
+            self.events.subscribe('notify_assignment', Assigned, self._notify_assignment)
+        if WEBHOOK_URLS:
+            self.events.subscribe('webhooks', DomainEvent, WebhookPublisher(WEBHOOK_URLS).send)
+        
+        # Photo processing runs on the shared background job queue
+        self.jobs = get_job_queue()
+        self.jobs.register(PROCESS_PHOTOS_JOB, self._process_photos_job,
+                           on_give_up=self._process_photos_failed)
+        
+        # Perceptual hash index shared by all sessions
+        self.duplicates = get_duplicate_detector()
+        
+        # Read results are reused across reruns until a write bumps the data version
+        self.cache = QueryCache(max_rows=QUERY_CACHE_MAX_ROWS, default_ttl=QUERY_CACHE_TTL)
     
     def submit_complaint(
         self,
@@ -34,118 +70,418 @@ import os
         """
         Submit a new complaint
         
+        The uploads are only staged here; decoding, resizing and GPS
+        enrichment run on the job queue, and the complaint stays in the
+        'processing' state until they finish.
+        
         Returns:
             Complaint ID if successful, None otherwise
         """
+        staged = []
         try:
             # Handle single or multiple files
             if not isinstance(uploaded_files, list):
                 uploaded_files = [uploaded_files]
             
-            # Save all images
-            photo_paths = []
+            # Stage the raw uploads
             for uploaded_file in uploaded_files:
-                photo_path = self.storage.save_image(uploaded_file)
-                if photo_path:
-                    photo_paths.append(photo_path)
+                staged_name = self.storage.stage_upload(uploaded_file)
+                if staged_name:
+                    staged.append(staged_name)
             
-            if not photo_paths:
+            if not staged:
                 return None
             
-            # Create complaint object
+            # Create complaint object; photo paths are filled in by the job
             complaint = Complaint(
-                photo_path=';'.join(photo_paths),  # Store multiple paths separated by semicolon
+                photo_path='',
                 location=location,
                 latitude=latitude,
                 longitude=longitude,
                 tags=', '.join(tags),
                 description=description,
                 status='pending',
-                user_id=user_id
+                user_id=user_id,
+                processing_status='processing'
             )
             
-            # Save to database
+            # Save to database and hand the photos to the workers
             complaint_id = self.db.create_complaint(complaint)
+            self.jobs.enqueue(PROCESS_PHOTOS_JOB, {
+                'complaint_id': complaint_id,
+                'staged': staged
+            })
+            self.events.publish(ComplaintCreated(
+                complaint_id, after=replace(complaint, id=complaint_id), actor_id=user_id
+            ))
             return complaint_id
-            
+        
         except Exception as e:
             print(f"Error submitting complaint: {e}")
+            for staged_name in staged:
+                self.storage.discard_staged(staged_name)
             return None
     
+    def _process_photos_job(self, payload: dict):
+        """
+        Store the staged photos of a complaint, enrich its location and
+        look for earlier reports with similar photos
+        
+        Each staged file is removed as soon as its photo is recorded on the
+        complaint, so a retry only processes what is left. A photo recorded
+        by an attempt that died before removing its staged file is not
+        added twice; the reference taken for it again is released. The
+        duplicate hint comes from the hashes stored with the photos, so the
+        submitting request never decodes an upload.
+        """
+        complaint_id = payload['complaint_id']
+        complaint = self.db.get_complaint(complaint_id)
+        if not complaint:
+            # Deleted while queued
+            for staged_name in payload['staged']:
+                self.storage.discard_staged(staged_name)
+            return
+        
+        # EXIF GPS from the first photo that has it, if none was given
+        latitude, longitude = complaint.latitude, complaint.longitude
+        
+        for staged_name in payload['staged']:
+            staged_path = self.storage.get_staged_path(staged_name)
+            if not staged_path.exists():
+                continue  # Processed by an earlier attempt
+            
+            with open(staged_path, 'rb') as staged_file:
+                if latitude is None or longitude is None:
+                    gps = self.storage.extract_gps_from_image(staged_file)
+                    if gps:
+                        latitude, longitude = gps
+                
+                photo_path = self.storage.save_image(staged_file)
+            
+            if not photo_path:
+                raise RuntimeError(f"Could not process staged photo {staged_name}")
+            
+            recorded = self.db.append_photo_path(complaint_id, photo_path)
+            self.storage.discard_staged(staged_name)
+            if not recorded:
+                # Recorded by an earlier attempt, or the complaint was deleted meanwhile
+                self.storage.delete_image(photo_path)
+                continue
+            
+            dhash = self.storage.get_image_hashes([photo_path]).get(photo_path)
+            if dhash:
+                self.duplicates.add(photo_path, dhash)
+        
+        # Still no coordinates: geocode the location text (best effort)
+        if (latitude is None or longitude is None) and complaint.location:
+            try:
+                from utils.location_utils import location_service
+                coords = location_service.geocode_address(complaint.location)
+                if coords:
+                    latitude, longitude = coords
+            except Exception as e:
+                print(f"Error geocoding complaint #{complaint_id}: {e}")
+        
+        # Earlier reports of what looks like the same pothole (best effort)
+        similar = None
+        try:
+            similar = ';'.join(
+                f"{other.id}:{distance}" for other, distance in self.find_duplicate_complaints(complaint_id)
+            )
+        except Exception as e:
+            print(f"Error finding similar complaints for #{complaint_id}: {e}")
+        
+        self.db.finish_processing(complaint_id, 'ready', latitude, longitude, similar)
+    
+    def _process_photos_failed(self, payload: dict, error: str):
+        """Flag the complaint once photo processing has used up its retries"""
+        self.db.finish_processing(payload['complaint_id'], 'failed')
+    
+    def get_similar_complaints(self, complaint: Complaint) -> List[Tuple[Complaint, int]]:
+        """
+        Earlier reports found to look alike when a complaint's photos were processed
+        
+        Returns:
+            (complaint, distance) pairs, most similar first; distance is the
+            number of differing bits between the closest pair of photo hashes.
+            Complaints deleted since are left out.
+        """
+        matches = []
+        for other_id, distance in complaint.get_similar_complaints():
+            other = self.get_complaint(other_id)
+            if other:
+                matches.append((other, distance))
+        return matches
+    
+    def find_duplicate_complaints(self, complaint_id: int, limit: int = 5) -> List[Tuple[Complaint, int]]:
+        """Find other complaints whose photos look like this complaint's photos"""
+        complaint = self.db.get_complaint(complaint_id)
+        if not complaint:
+            return []
+        
+        hashes = self.storage.get_image_hashes(complaint.get_photo_paths())
+        return self._complaints_near(list(hashes.values()), complaint_id, limit)
+    
+    def _complaints_near(self, hashes: List[Optional[str]], exclude_id: Optional[int],
+                         limit: int) -> List[Tuple[Complaint, int]]:
+        """Map index matches for a set of hashes back to complaints"""
+        nearest = self.duplicates.find_many([h for h in hashes if h])
+        if not nearest:
+            return []
+        
+        matches: Dict[int, Tuple[Complaint, int]] = {}
+        for complaint in self.db.get_complaints_by_photo_paths(list(nearest)):
+            if complaint.id == exclude_id:
+                continue
+            distance = min(nearest[path] for path in complaint.get_photo_paths() if path in nearest)
+            matches[complaint.id] = (complaint, distance)
+        
+        return sorted(matches.values(), key=lambda match: match[1])[:limit]
+    
+    def _cached(self, name: str, query, *args):
+        """Run a read query through the cache, keyed by method name and arguments"""
+        return self.cache.get_or_load(
+            (name, args),
+            self.db.get_data_version(max_age=QUERY_CACHE_VERSION_MAX_AGE),
+            lambda: query(*args),
+            ttl=QUERY_CACHE_TTLS.get(name)
+        )
+    
+    def _get_user(self, user_id: Optional[int]):
+        """Look up a user for notifications (None for anonymous complaints)"""
+        if not user_id:
+            return None
+        from .registry import get_user_db_manager
+        return get_user_db_manager().get_user_by_id(user_id)
+    
+    def get_cache_stats(self) -> dict:
+        """Get query cache hit/miss counters and size"""
+        return self.cache.get_stats()
+    
     def get_all_complaints(self, limit: int = 100) -> List[Complaint]:
         """Get all complaints"""
-        return self.db.get_all_complaints(limit=limit)
+        return self._cached('get_all_complaints', self.db.get_all_complaints, limit)
     
     def get_complaint(self, complaint_id: int) -> Optional[Complaint]:
         """Get a specific complaint"""
-        return self.db.get_complaint(complaint_id)
+        return self._cached('get_complaint', self.db.get_complaint, complaint_id)
     
     def get_complaints_by_user(self, user_id: int) -> List[Complaint]:
         """Get all complaints by a specific user"""
-        return self.db.get_complaints_by_user(user_id)
+        return self._cached('get_complaints_by_user', self.db.get_complaints_by_user, user_id)
+    
+    def get_complaints_page(self, page: int = 1, page_size: int = 20, sort: str = 'Newest First',
+                            user_id: Optional[int] = None, search_term: Optional[str] = None,
+                            tag: Optional[str] = None, status: Optional[str] = None,
+                            start_date: Optional[str] = None,
+                            end_date: Optional[str] = None) -> Tuple[List[Complaint], int]:
+        """
+        Get one page of filtered complaints and the total number of matches
+        
+        Filtering, sorting and paging happen in SQL, so the cost of a page
+        doesn't grow with the size of the result set.
+        
+        Returns:
+            Tuple of (complaints on the page, total matching complaints)
+        """
+        filters = (user_id, search_term or None, tag, status, start_date, end_date)
+        total = self._cached('count_complaints', self.db.count_complaints, *filters)
+        
+        # Clamp to the last page if the result set shrank
+        last_page = max(1, -(-total // page_size))
+        page = min(max(page, 1), last_page)
+        
+        complaints = self._cached(
+            'query_complaints', self.db.query_complaints,
+            *filters, sort, page_size, (page - 1) * page_size
+        )
+        return complaints, total
+    
+    def get_complaints_by_status(self, status: str) -> List[Complaint]:
+        """Get complaints with a given status"""
+        return self._cached('get_complaints_by_status', self.db.get_complaints_by_status, status)
     
     def filter_by_tag(self, tag: str) -> List[Complaint]:
         """Filter complaints by tag"""
-        return self.db.get_complaints_by_tag(tag)
+        return self._cached('filter_by_tag', self.db.get_complaints_by_tag, tag)
     
-    def update_status(self, complaint_id: int, status: str, user_email: Optional[str] = None) -> bool:
+    def update_status(self, complaint_id: int, status: str, updated_by_id: Optional[int] = None,
+                      priority: str = 'normal') -> bool:
         """
-        Update complaint status and send notification email
+        Update complaint status and publish StatusChanged
+        
+        The owner's email is sent by an event subscriber, so this returns
+        as soon as the update is committed.
         
         Args:
             complaint_id: ID of the complaint
             status: New status
-            user_email: Email of the user who filed the complaint (optional)
-            
+            updated_by_id: User making the change (optional)
+            priority: 'high' sends the email now instead of in the next digest
+        
         Returns:
             True if successful
         """
+        # Read before writing so the event carries the real old status
+        before = self.db.get_complaint(complaint_id)
         success = self.db.update_status(complaint_id, status)
         
-        # Send email notification if enabled and email provided
-        if success and self.email_service and user_email:
-            complaint = self.get_complaint(complaint_id)
-            if complaint:
-                self.email_service.send_complaint_status_update(
-                    user_email=user_email,
-                    complaint_id=complaint_id,
-                    old_status=complaint.status,
-                    new_status=status,
-                    location=complaint.location
-                )
+        if success and before and before.status != status:
+            self.events.publish(StatusChanged(
+                complaint_id,
+                before=before,
+                after=replace(before, status=status),
+                actor_id=updated_by_id,
+                priority=priority
+            ))
         
         return success
     
+    def assign_complaint(self, complaint_id: int, assigned_to_id: int, updated_by_id: int,
+                         priority: str = 'normal') -> bool:
+        """
+        Assign a complaint to a moderator/admin and publish Assigned
+        
+        Args:
+            complaint_id: ID of the complaint
+            assigned_to_id: User the complaint is assigned to
+            updated_by_id: User making the assignment
+            priority: 'high' sends the email now instead of in the next digest
+        
+        Returns:
+            True if successful
+        """
+        before = self.db.get_complaint(complaint_id)
+        success = self.db.assign_complaint(complaint_id, assigned_to_id, updated_by_id)
+        
+        if success and before:
+            self.events.publish(Assigned(
+                complaint_id,
+                before=before,
+                after=replace(before, assigned_to=assigned_to_id, updated_by=updated_by_id),
+                actor_id=updated_by_id,
+                priority=priority
+            ))
+        
+        return success
+    
+    def _notify_status_change(self, event: StatusChanged):
+        """Subscriber: tell the person who filed the complaint"""
+        owner = self._get_user(event.before.user_id)
+        if owner and owner.email:
+            self.notifications.notify_status_change(
+                recipient_email=owner.email,
+                recipient_name=owner.full_name,
+                complaint_id=event.complaint_id,
+                location=event.after.location,
+                old_status=event.before.status,
+                new_status=event.after.status,
+                priority=event.priority
+            )
+    
+    def _notify_assignment(self, event: Assigned):
+        """Subscriber: tell the moderator, unless they assigned it to themselves"""
+        if event.after.assigned_to in (event.actor_id, event.before.assigned_to):
+            return
+        moderator = self._get_user(event.after.assigned_to)
+        if moderator and moderator.email:
+            self.notifications.notify_assignment(
+                recipient_email=moderator.email,
+                recipient_name=moderator.full_name,
+                complaint_id=event.complaint_id,
+                location=event.after.location,
+                description=event.after.description,
+                priority=event.priority
+            )
+    
     def delete_complaint(self, complaint_id: int) -> bool:
-        """Delete a complaint and its image"""
+        """Delete a complaint and its images"""
         complaint = self.db.get_complaint(complaint_id)
         if complaint:
-            # Delete image
-            self.storage.delete_image(complaint.photo_path)
+            # Release every photo; photo_path holds a semicolon-joined list
+            for photo_path in complaint.get_photo_paths():
+                self.storage.delete_image(photo_path)
             # Delete from database
-            return self.db.delete_complaint(complaint_id)
+            if self.db.delete_complaint(complaint_id):
+                self.events.publish(Deleted(complaint_id, before=complaint))
+                return True
         return False
     
     def get_statistics(self) -> dict:
         """Get complaint statistics"""
-        return self.db.get_statistics()
+        return self._cached('get_statistics', self.db.get_statistics)
     
     def get_image_path(self, relative_path: str):
         """Get absolute image path"""
         return self.storage.get_image_path(relative_path)
     
+    def get_display_paths(self, relative_paths: List[str], max_width: int):
+        """Get absolute paths of the smallest image variants that fill max_width"""
+        return self.storage.get_display_paths(relative_paths, max_width)
+    
+    def get_display_sources(self, relative_paths: List[str], max_width: int) -> List[Optional[str]]:
+        """
+        Get what st.image should load for each image, None if the file is missing
+        
+        Returns immutable image server URLs so the browser fetches and caches
+        the bytes itself; falls back to local paths when the server is off.
+        """
+        return self.get_display_sources_by_width(relative_paths, [max_width])[max_width]
+    
+    def get_display_sources_by_width(self, relative_paths: List[str], widths) -> Dict[int, List[Optional[str]]]:
+        """Get display sources for several widths at once (e.g. thumbnail and link target)"""
+        server = get_image_server()
+        resolved = {}
+        for max_width, paths in self.storage.get_display_paths_by_width(relative_paths, widths).items():
+            if server:
+                resolved[max_width] = [server.url_for(path) for path in paths]
+            else:
+                resolved[max_width] = [str(path) if path.exists() else None for path in paths]
+        return resolved
+    
     def search_complaints(self, search_term: str) -> List[Complaint]:
         """Search complaints"""
-        return self.db.search_complaints(search_term)
+        return self._cached('search_complaints', self.db.search_complaints, search_term)
     
     def filter_by_date_range(self, start_date: str, end_date: str) -> List[Complaint]:
         """Filter by date range"""
-        return self.db.filter_by_date_range(start_date, end_date)
+        return self._cached('filter_by_date_range', self.db.filter_by_date_range, start_date, end_date)
+    
+    def export_geojson(self, output: BinaryIO,
+                       bbox: Optional[Tuple[float, float, float, float]] = None, **filters) -> int:
+        """
+        Stream complaint points as newline-delimited GeoJSON
+        
+        Args:
+            output: Binary file-like object to write to
+            bbox: (min longitude, min latitude, max longitude, max latitude)
+            **filters: Filters of get_complaints_page (status, tag, ...)
+        
+        Returns:
+            Number of features written
+        """
+        return ExportService(self.db).write_geojson(output, filters=dict(filters, bbox=bbox))
+    
+    def export_geopackage(self, path: Path,
+                          bbox: Optional[Tuple[float, float, float, float]] = None, **filters) -> int:
+        """
+        Write complaint points to a GeoPackage file
+        
+        Args:
+            path: .gpkg file to create
+            bbox: (min longitude, min latitude, max longitude, max latitude)
+            **filters: Filters of get_complaints_page (status, tag, ...)
+        
+        Returns:
+            Number of features written
+        """
+        return ExportService(self.db).write_geopackage(path, filters=dict(filters, bbox=bbox))
     
     def export_to_dataframe(self):
         """Export all complaints to pandas DataFrame"""
         import pandas as pd
-        complaints = self.get_all_complaints(limit=10000)
+        # Straight from the database; a one-off 10k-row result would only evict useful entries
+        complaints = self.db.get_all_complaints(limit=10000)
         
         data = []
         for c in complaints:
@@ -0,0 +1,182 @@
+"""
+Near-duplicate photo detection over perceptual hashes
+"""
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from database.image_db_manager import ImageDatabaseManager
+from config.settings import DATABASE_PATH, DUPLICATE_MAX_DISTANCE
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over 64-bit hashes with Hamming distance
+    
+    Each child edge is labelled with its distance to the parent, so a
+    query for "distance <= k" only descends into edges labelled within
+    k of the query's distance to the current node (triangle inequality)
+    instead of comparing against every hash.
+    """
+    
+    def __init__(self):
+        """Create an empty tree"""
+        # Node: [hash, items stored under this exact hash, {distance: child}]
+        self._root = None
+        self.size = 0
+    
+    def add(self, value: int, item: str):
+        """Add an item under a hash"""
+        self.size += 1
+        if self._root is None:
+            self._root = [value, {item}, {}]
+            return
+        
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].add(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, {item}, {}]
+                return
+            node = child
+    
+    def remove(self, value: int, item: str) -> bool:
+        """
+        Remove an item stored under a hash
+        
+        The node stays in place (its children hang off it), it just stops
+        matching once it has no items left.
+        """
+        node = self._root
+        while node is not None:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                if item not in node[1]:
+                    return False
+                node[1].discard(item)
+                self.size -= 1
+                return True
+            node = node[2].get(distance)
+        return False
+    
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, str]]:
+        """Get (distance, item) for every item within max_distance of a hash"""
+        if self._root is None:
+            return []
+        
+        matches = []
+        pending = [self._root]
+        while pending:
+            node = pending.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance:
+                matches.extend((distance, item) for item in node[1])
+            
+            low, high = distance - max_distance, distance + max_distance
+            for edge, child in node[2].items():
+                if low <= edge <= high:
+                    pending.append(child)
+        
+        return sorted(matches)
+
+
+class DuplicateDetector:
+    """
+    In-memory BK-tree index over the perceptual hashes of all stored photos
+    
+    Each lookup first pulls in hashes stored since the last one (by any
+    process), and matches are checked against the database before they
+    are returned, so photos deleted or collected elsewhere are dropped.
+    """
+    
+    def __init__(self, db_path: Path = DATABASE_PATH):
+        """Initialize detector (the index is loaded on first use)"""
+        self.image_db = ImageDatabaseManager(db_path)
+        self._tree: Optional[BKTree] = None
+        self._indexed: Dict[str, int] = {}  # photo_path -> hash
+        self._last_rowid = 0
+        self._lock = threading.Lock()
+    
+    def add(self, photo_path: str, dhash: str):
+        """Index a newly stored photo"""
+        with self._lock:
+            self._load()
+            self._add(photo_path, dhash)
+    
+    def remove(self, photo_path: str):
+        """Stop suggesting a deleted photo"""
+        with self._lock:
+            self._remove(photo_path)
+    
+    def find(self, dhash: str, max_distance: int = DUPLICATE_MAX_DISTANCE) -> List[Tuple[int, str]]:
+        """Get (distance, photo_path) of stored photos close to a hash, nearest first"""
+        with self._lock:
+            self._load()
+            self._refresh()
+            matches = self._tree.search(int(dhash, 16), max_distance)
+            
+            stored = self.image_db.get_hashes_for_paths([photo_path for _, photo_path in matches])
+            for _, photo_path in matches:
+                if photo_path not in stored:
+                    self._remove(photo_path)
+            return [(distance, photo_path) for distance, photo_path in matches if photo_path in stored]
+    
+    def find_many(self, dhashes: List[str],
+                  max_distance: int = DUPLICATE_MAX_DISTANCE) -> Dict[str, int]:
+        """Get the smallest distance to any of several hashes, keyed by photo path"""
+        nearest = {}
+        for dhash in dhashes:
+            for distance, photo_path in self.find(dhash, max_distance):
+                if distance < nearest.get(photo_path, max_distance + 1):
+                    nearest[photo_path] = distance
+        return nearest
+    
+    def _load(self):
+        """Build the tree from the stored hashes once per process"""
+        if self._tree is not None:
+            return
+        self._tree = BKTree()
+        self._refresh()
+    
+    def _refresh(self):
+        """Index hashes stored since the last load or refresh"""
+        for rowid, photo_path, dhash in self.image_db.iter_hashes(self._last_rowid):
+            self._add(photo_path, dhash)
+            self._last_rowid = rowid
+    
+    def _add(self, photo_path: str, dhash: str):
+        """Insert into the tree, replacing an older hash of the same photo"""
+        value = int(dhash, 16)
+        if self._indexed.get(photo_path) == value:
+            return
+        self._remove(photo_path)
+        self._indexed[photo_path] = value
+        self._tree.add(value, photo_path)
+    
+    def _remove(self, photo_path: str):
+        """Take a photo out of the tree if it is indexed (lock must be held)"""
+        value = self._indexed.pop(photo_path, None)
+        if value is not None and self._tree is not None:
+            self._tree.remove(value, photo_path)
+
+
+_detector: Optional[DuplicateDetector] = None
+_detector_lock = threading.Lock()
+
+
+def get_duplicate_detector() -> DuplicateDetector:
+    """Get the process-wide duplicate detector"""
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                _detector = DuplicateDetector()
+    return _detector
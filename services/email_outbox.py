@@ -0,0 +1,307 @@
+"""
+Background delivery of the email outbox
+Messages are stored in SQLite and sent by worker threads that keep their
+SMTP connection open between messages
+"""
+import time
+import threading
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+from database.email_db_manager import EmailOutboxDatabaseManager
+from database.email_models import OutboxMessage
+from config.settings import (
+    DATABASE_PATH, EMAIL_SENDER_WORKERS, EMAIL_BATCH_SIZE, EMAIL_RETRY_BASE_SECONDS,
+    EMAIL_RETRY_MAX_SECONDS, EMAIL_LEASE_SECONDS, EMAIL_POLL_INTERVAL, EMAIL_SMTP_TIMEOUT,
+    EMAIL_SMTP_IDLE_SECONDS, EMAIL_MESSAGES_PER_CONNECTION
+)
+
+
+class SmtpSession:
+    """One SMTP connection, opened on demand and reused for many messages"""
+    
+    def __init__(self, host: str, port: int, username: Optional[str] = None,
+                 password: Optional[str] = None, use_tls: bool = True,
+                 timeout: float = EMAIL_SMTP_TIMEOUT):
+        """Initialize session settings (nothing is opened yet)"""
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._server = None
+        self._sent_on_connection = 0
+        self._last_used = 0.0
+    
+    def send(self, message: EmailMessage):
+        """
+        Send one message, connecting (and reconnecting) as needed
+        
+        Raises:
+            smtplib.SMTPException or OSError; the caller decides whether
+            the failure is about this message or the connection
+        """
+        import smtplib
+        
+        if self._server and (
+            self._sent_on_connection >= EMAIL_MESSAGES_PER_CONNECTION
+            or time.monotonic() - self._last_used > EMAIL_SMTP_IDLE_SECONDS
+        ):
+            self.close()
+        
+        if not self._server:
+            self._connect()
+            self._server.send_message(message)
+        else:
+            try:
+                self._server.send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                # The server dropped a connection we kept open; one fresh try
+                self._server = None
+                self._connect()
+                self._server.send_message(message)
+        
+        self._sent_on_connection += 1
+        self._last_used = time.monotonic()
+    
+    def close_if_idle(self):
+        """Close the connection once it has been idle for EMAIL_SMTP_IDLE_SECONDS"""
+        if self._server and time.monotonic() - self._last_used > EMAIL_SMTP_IDLE_SECONDS:
+            self.close()
+    
+    def close(self):
+        """Say goodbye to the server, ignoring errors"""
+        if self._server:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+    
+    def _connect(self):
+        """Open, secure and authenticate a new connection"""
+        import smtplib
+        
+        if self.port == 465:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.use_tls:
+                server.starttls()
+        try:
+            if self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        
+        self._server = server
+        self._sent_on_connection = 0
+        self._last_used = time.monotonic()
+        self.connections_opened += 1
+
+
+class OutboxSender:
+    """Delivers queued email on worker threads with retries and dead-lettering"""
+    
+    def __init__(self, host: str, port: int, sender_email: str,
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 use_tls: bool = True, db_path: Path = DATABASE_PATH,
+                 workers: int = EMAIL_SENDER_WORKERS):
+        """Initialize outbox sender (workers start on first start() call)"""
+        self.db = EmailOutboxDatabaseManager(db_path)
+        self.sender_email = sender_email
+        self.workers = workers
+        self._session_args = (host, port, username, password, use_tls)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._last_purge = 0.0
+    
+    def enqueue(self, to_email: str, subject: str, html_body: str,
+                text_body: Optional[str] = None) -> int:
+        """Persist a message and wake a sender; returns the outbox ID"""
+        message_id = self.db.enqueue(to_email, subject, html_body, text_body)
+        self._wakeup.set()
+        return message_id
+    
+    def enqueue_many(self, messages: Iterable[Tuple[str, str, str, Optional[str]]]) -> int:
+        """Persist (to_email, subject, html_body, text_body) tuples in one transaction"""
+        count = self.db.enqueue_many(messages)
+        self._wakeup.set()
+        return count
+    
+    def start(self):
+        """Start the sender threads if they aren't running yet"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"email-sender-{index}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+    
+    def stop(self, timeout: float = 5.0):
+        """Ask the senders to finish their current batch and exit"""
+        self._stop.set()
+        self._wakeup.set()
+        with self._lock:
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+    
+    def new_session(self) -> SmtpSession:
+        """Create an SMTP session with this sender's settings"""
+        return SmtpSession(*self._session_args)
+    
+    def run_pending(self, session: Optional[SmtpSession] = None) -> int:
+        """
+        Deliver every due message on the calling thread (for scripts and tests)
+        
+        Returns:
+            Number of messages accepted by the server
+        """
+        own_session = session is None
+        session = session or self.new_session()
+        sent = 0
+        try:
+            while True:
+                messages = self.db.claim_batch(EMAIL_BATCH_SIZE, EMAIL_LEASE_SECONDS)
+                if not messages:
+                    break
+                delivered, connection_failed = self._deliver(session, messages)
+                sent += delivered
+                if connection_failed:
+                    break
+        finally:
+            if own_session:
+                session.close()
+        return sent
+    
+    def get_stats(self) -> dict:
+        """Get number of messages per outbox status"""
+        return self.db.count_by_status()
+    
+    def _worker_loop(self):
+        """Claim and deliver batches until stopped, reusing one connection"""
+        session = self.new_session()
+        connection_failures = 0
+        try:
+            while not self._stop.is_set():
+                try:
+                    messages = self.db.claim_batch(EMAIL_BATCH_SIZE, EMAIL_LEASE_SECONDS)
+                except Exception as e:
+                    print(f"Error claiming outbox messages: {e}")
+                    messages = []
+                
+                if messages:
+                    _, connection_failed = self._deliver(session, messages)
+                    if not connection_failed:
+                        connection_failures = 0
+                        continue
+                    # SMTP server unreachable or refusing logins: back off
+                    # instead of hammering it with the next batch
+                    connection_failures += 1
+                    self._stop.wait(self._retry_delay(connection_failures))
+                    continue
+                
+                session.close_if_idle()
+                self._purge_sent()
+                
+                # Sleep until a message is enqueued here or the poll interval
+                # passes (retries coming due, messages from other processes)
+                self._wakeup.wait(EMAIL_POLL_INTERVAL)
+                self._wakeup.clear()
+        finally:
+            session.close()
+    
+    def _deliver(self, session: SmtpSession, messages: List[OutboxMessage]):
+        """
+        Send a claimed batch over one session
+        
+        Returns:
+            (messages sent, whether the connection itself failed); on a
+            connection failure the unsent messages, including the one being
+            sent, are released with a delay and without using up an
+            attempt. Only a message the server rejected counts an attempt.
+        """
+        import smtplib
+        
+        sent = 0
+        for index, message in enumerate(messages):
+            try:
+                session.send(self._build_message(message))
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                # The server answered about this message; the connection is fine
+                self._message_failed(message, e)
+                continue
+            except (OSError, smtplib.SMTPException) as e:
+                print(f"❌ SMTP connection failed: {e}")
+                session.close()
+                self.db.release([pending.id for pending in messages[index:]], self._retry_delay(1))
+                return sent, True
+            
+            self.db.mark_sent([message.id])
+            sent += 1
+        return sent, False
+    
+    def _message_failed(self, message: OutboxMessage, error: Exception, permanent: Optional[bool] = None):
+        """Schedule a retry, or dead-letter the message if it can't succeed"""
+        if permanent is None:
+            permanent = self._is_permanent(error)
+        description = f"{error.__class__.__name__}: {error}"
+        
+        if permanent or message.is_final_attempt():
+            print(f"❌ Email #{message.id} to {message.to_email} dead-lettered: {description}")
+            self.db.mark_dead(message.id, description)
+        else:
+            self.db.retry_later(message.id, description, self._retry_delay(message.attempts))
+    
+    def _build_message(self, message: OutboxMessage) -> EmailMessage:
+        """Turn an outbox row into a MIME message"""
+        email = EmailMessage()
+        email["Subject"] = message.subject
+        email["From"] = self.sender_email
+        email["To"] = message.to_email
+        # Stable per outbox row, so a resend after a lost reply can be deduplicated
+        email["Message-ID"] = f"<outbox-{message.id}@{self.sender_email.rpartition('@')[2] or 'localhost'}>"
+        if message.text_body:
+            email.set_content(message.text_body)
+            email.add_alternative(message.html_body, subtype="html")
+        else:
+            email.set_content(message.html_body, subtype="html")
+        return email
+    
+    @staticmethod
+    def _is_permanent(error: Exception) -> bool:
+        """5xx replies mean retrying the same message won't help"""
+        import smtplib
+        
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return all(code >= 500 for code, _ in error.recipients.values())
+        if isinstance(error, smtplib.SMTPResponseException):
+            return error.smtp_code >= 500
+        return False
+    
+    @staticmethod
+    def _retry_delay(attempts: int) -> float:
+        """Exponential backoff after the given number of attempts"""
+        return min(EMAIL_RETRY_BASE_SECONDS * 2 ** (max(attempts, 1) - 1), EMAIL_RETRY_MAX_SECONDS)
+    
+    def _purge_sent(self):
+        """Drop delivered messages at most once an hour"""
+        if time.monotonic() - self._last_purge < 3600:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            self.db.purge_sent()
+        except Exception as e:
+            print(f"Error purging sent email: {e}")
@@ -0,0 +1,328 @@
+"""
+Email templates for PathPatrol notifications
+Templates are compiled once per process and rendered by plain substitution,
+with HTML-escaping of every user-provided field
+"""
+import html
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from string import Template
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+APP_URL = os.getenv("APP_URL", "http://localhost:8501")
+
+STATUS_EMOJI = {
+    'pending': '⏳',
+    'in_progress': '🔧',
+    'resolved': '✅',
+    'rejected': '❌'
+}
+
+# Shared by every template; $accent is the template's header/button colour
+SHARED_CSS = """
+        body { font-family: Arial, sans-serif; background-color: #f5f5f5; padding: 20px; }
+        .container { max-width: 600px; margin: 0 auto; background: white; border-radius: 10px; padding: 30px; }
+        .header { background: $accent; color: white; padding: 20px; border-radius: 10px 10px 0 0; text-align: center; }
+        .content { padding: 20px; color: #333; }
+        .details { background: #F3F4F6; padding: 20px; border-radius: 10px; margin: 20px 0; }
+        .details-highlight { background: #FEF3C7; border-left: 4px solid $accent; }
+        .feature { background: #F3F4F6; padding: 15px; margin: 10px 0; border-radius: 5px; }
+        .status-badge { display: inline-block; padding: 10px 20px; border-radius: 5px; font-weight: bold; margin: 10px 0; }
+        .status-resolved { background: #10B981; color: white; }
+        .status-in_progress { background: #F59E0B; color: white; }
+        .status-pending { background: #6B7280; color: white; }
+        .status-rejected { background: #EF4444; color: white; }
+        .resolved-note { color: #10B981; font-size: 18px; font-weight: bold; }
+        .footer { text-align: center; padding: 20px; color: #666; font-size: 12px; }
+        .button { display: inline-block; background: $accent; color: white; padding: 12px 30px; text-decoration: none; border-radius: 5px; margin-top: 20px; }
+"""
+
+LAYOUT = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <style>$css</style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>$heading</h1>
+        </div>
+        <div class="content">
+$content
+        </div>
+        <div class="footer">
+            <p>PathPatrol - Mapping Problems, Paving Solutions</p>
+            <p>This is an automated email. Please do not reply.</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+TEXT_FOOTER = """
+--
+PathPatrol - Mapping Problems, Paving Solutions
+This is an automated email. Please do not reply.
+"""
+
+
+@dataclass
+class RenderedEmail:
+    """Subject and both body parts of one message"""
+    subject: str
+    html_body: str
+    text_body: str
+
+
+class EmailTemplate:
+    """
+    A compiled subject, HTML body and plain-text body
+    
+    The layout and CSS are merged into the HTML template when it is
+    compiled, so rendering a message is three substitutions. Values are
+    HTML-escaped for the HTML part unless their key is listed in safe
+    (fragments the application builds itself from fixed strings).
+    """
+    
+    def __init__(self, subject: str, heading: str, html_content: str, text: str,
+                 accent: str = '#3B82F6', safe: Iterable[str] = ()):
+        """Compile the template parts"""
+        css = Template(SHARED_CSS).substitute(accent=accent)
+        document = Template(LAYOUT).substitute(css=css, heading=heading, content=html_content)
+        self.subject = Template(subject)
+        self.html = Template(document)
+        self.text = Template(text + TEXT_FOOTER)
+        self.safe = frozenset(safe)
+    
+    def render(self, context: Dict[str, object]) -> RenderedEmail:
+        """Render one message; every placeholder must have a value"""
+        html_context = {
+            key: value if key in self.safe else html.escape(str(value))
+            for key, value in context.items()
+        }
+        # Header values must stay on one line
+        subject_context = {key: ' '.join(str(value).split()) for key, value in context.items()}
+        return RenderedEmail(
+            subject=self.subject.substitute(subject_context),
+            html_body=self.html.substitute(html_context),
+            text_body=self.text.substitute(context)
+        )
+
+
+TEMPLATES = {
+    'status_update': dict(
+        subject="PathPatrol: Complaint #$complaint_id - Status Updated to $new_status_title",
+        heading="🛣️ PathPatrol Update",
+        html_content="""            <h2>Hello $user_name,</h2>
+            <p>Your complaint has been updated!</p>
+            <div class="details">
+                <p><strong>Complaint ID:</strong> #$complaint_id</p>
+                <p><strong>Location:</strong> $location</p>
+                <p><strong>Status Update:</strong></p>
+                <p>
+                    <span class="status-badge status-$old_status">$old_status_label</span>
+                    →
+                    <span class="status-badge status-$new_status">$new_status_label</span>
+                </p>
+            </div>
+            $resolved_note_html
+            <p>Thank you for using PathPatrol to report road issues!</p>
+            <a href="$app_url" class="button">View Your Complaints</a>""",
+        text="""Hello $user_name,
+
+Your complaint has been updated!
+
+Complaint ID: #$complaint_id
+Location: $location
+Status: $old_status_label -> $new_status_label
+$resolved_note
+Thank you for using PathPatrol to report road issues!
+View your complaints: $app_url
+""",
+        safe=('resolved_note_html',)
+    ),
+    'welcome': dict(
+        subject="Welcome to PathPatrol! 🛣️",
+        heading="🛣️ Welcome to PathPatrol!",
+        html_content="""            <h2>Hello $user_name,</h2>
+            <p>Thank you for joining PathPatrol! Your account has been created successfully.</p>
+            <div class="details">
+                <p><strong>Username:</strong> $username</p>
+                <p><strong>Email:</strong> $user_email</p>
+            </div>
+            <h3>What you can do:</h3>
+            <div class="feature">📸 <strong>Report Potholes:</strong> Upload photos and track complaints</div>
+            <div class="feature">🗺️ <strong>View Map:</strong> See all complaints on interactive map</div>
+            <div class="feature">📊 <strong>Track Progress:</strong> Monitor status of your reports</div>
+            <div class="feature">📈 <strong>View Statistics:</strong> See community impact</div>
+            <p>Help us make roads safer for everyone!</p>
+            <a href="$app_url" class="button">Get Started</a>""",
+        text="""Hello $user_name,
+
+Thank you for joining PathPatrol! Your account has been created successfully.
+
+Username: $username
+Email: $user_email
+
+What you can do:
+- Report potholes: upload photos and track complaints
+- View the map: see all complaints on an interactive map
+- Track progress: monitor the status of your reports
+- View statistics: see community impact
+
+Help us make roads safer for everyone!
+Get started: $app_url
+"""
+    ),
+    'assignment': dict(
+        subject="PathPatrol: New Complaint Assigned - #$complaint_id",
+        heading="🛡️ New Assignment",
+        html_content="""            <h2>Hello $moderator_name,</h2>
+            <p>A new complaint has been assigned to you:</p>
+            <div class="details details-highlight">
+                <p><strong>Complaint ID:</strong> #$complaint_id</p>
+                <p><strong>Location:</strong> $location</p>
+                <p><strong>Description:</strong> $description</p>
+            </div>
+            <p>Please review and update the status accordingly.</p>
+            <a href="$app_url" class="button">View Complaint</a>""",
+        text="""Hello $moderator_name,
+
+A new complaint has been assigned to you:
+
+Complaint ID: #$complaint_id
+Location: $location
+Description: $description
+
+Please review and update the status accordingly.
+View complaint: $app_url
+""",
+        accent='#F59E0B'
+    ),
+    'digest': dict(
+        subject="PathPatrol: $update_count updates on your complaints",
+        heading="🛣️ PathPatrol Summary",
+        html_content="""            <h2>Hello $user_name,</h2>
+            <p>Here is what changed since our last email:</p>
+            $items_html
+            <a href="$app_url" class="button">Open PathPatrol</a>""",
+        text="""Hello $user_name,
+
+Here is what changed since our last email:
+
+$items
+Open PathPatrol: $app_url
+""",
+        safe=('items_html',)
+    )
+}
+
+
+@lru_cache(maxsize=None)
+def get_template(name: str) -> EmailTemplate:
+    """Get a compiled template by name, compiling it on first use"""
+    if name not in TEMPLATES:
+        raise KeyError(f"Unknown email template: {name}")
+    return EmailTemplate(**TEMPLATES[name])
+
+
+def render(name: str, **context) -> RenderedEmail:
+    """Render one message from a named template"""
+    return get_template(name).render(dict(context, app_url=context.get('app_url', APP_URL)))
+
+
+def render_batch(name: str, contexts: Iterable[Dict[str, object]]) -> Iterator[RenderedEmail]:
+    """
+    Render many personalized messages from one compiled template
+    
+    Args:
+        name: Template name
+        contexts: One dict of placeholder values per message
+    
+    Yields:
+        Rendered messages, in order, without holding them all in memory
+    """
+    template = get_template(name)
+    for context in contexts:
+        if 'app_url' not in context:
+            context = dict(context, app_url=APP_URL)
+        yield template.render(context)
+
+
+def _status_label(status: str) -> str:
+    """Status with its emoji, e.g. ✅ Resolved"""
+    return f"{STATUS_EMOJI.get(status, '')} {status.replace('_', ' ').title()}".strip()
+
+
+def status_update_context(user_name: str, complaint_id: int, location: str,
+                          old_status: str, new_status: str) -> Dict[str, object]:
+    """Placeholder values for the 'status_update' template"""
+    resolved = new_status == 'resolved'
+    return {
+        'user_name': user_name,
+        'complaint_id': complaint_id,
+        'location': location,
+        'old_status': old_status,
+        'new_status': new_status,
+        'old_status_label': _status_label(old_status),
+        'new_status_label': _status_label(new_status),
+        'new_status_title': new_status.title(),
+        'resolved_note_html': (
+            '<p class="resolved-note">🎉 Your complaint has been resolved! '
+            'Thank you for helping make our roads safer.</p>' if resolved else ''
+        ),
+        'resolved_note': (
+            "\nYour complaint has been resolved! Thank you for helping make our roads safer.\n"
+            if resolved else ''
+        )
+    }
+
+
+def digest_context(user_name: str, status_changes: List[Tuple[int, str, str, str]],
+                   assignments: List[Tuple[int, str, str]]) -> Dict[str, object]:
+    """
+    Placeholder values for the 'digest' template
+    
+    Args:
+        user_name: Recipient's name
+        status_changes: (complaint_id, location, old_status, new_status) tuples
+        assignments: (complaint_id, location, description) tuples
+    
+    Returns:
+        Context whose item list is already escaped for HTML
+    """
+    html_parts = []
+    text_parts = []
+    if status_changes:
+        html_parts.append('<h3>Status updates</h3><div class="details">')
+        text_parts.append("Status updates:")
+        for complaint_id, location, old_status, new_status in status_changes:
+            html_parts.append(
+                f'<p><strong>#{complaint_id}</strong> {html.escape(location)}: '
+                f'<span class="status-badge status-{html.escape(old_status)}">{_status_label(old_status)}</span> → '
+                f'<span class="status-badge status-{html.escape(new_status)}">{_status_label(new_status)}</span></p>'
+            )
+            text_parts.append(
+                f"- #{complaint_id} {location}: {_status_label(old_status)} -> {_status_label(new_status)}"
+            )
+        html_parts.append('</div>')
+        text_parts.append("")
+    if assignments:
+        html_parts.append('<h3>Assigned to you</h3><div class="details details-highlight">')
+        text_parts.append("Assigned to you:")
+        for complaint_id, location, description in assignments:
+            html_parts.append(
+                f'<p><strong>#{complaint_id}</strong> {html.escape(location)}: {html.escape(description)}</p>'
+            )
+            text_parts.append(f"- #{complaint_id} {location}: {description}")
+        html_parts.append('</div>')
+        text_parts.append("")
+    
+    return {
+        'user_name': user_name,
+        'update_count': len(status_changes) + len(assignments),
+        'items_html': '\n            '.join(html_parts),
+        'items': '\n'.join(text_parts)
+    }
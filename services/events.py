@@ -0,0 +1,145 @@
+"""
+In-process domain events
+The service layer publishes an event after each committed write; side
+effects (email, webhooks, counters) subscribe to it and run on worker
+threads, so the request only waits for the database
+"""
+import threading
+import traceback
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Type
+from database.models import Complaint
+from config.settings import EVENT_BUS_WORKERS
+
+
+@dataclass(frozen=True)
+class DomainEvent:
+    """Something that happened to a complaint, with its state before and after"""
+    complaint_id: int
+    before: Optional[Complaint] = None  # None for ComplaintCreated
+    after: Optional[Complaint] = None  # None for Deleted
+    actor_id: Optional[int] = None  # User who made the change, if known
+    priority: str = 'normal'  # 'high' asks notifications to skip the digest
+    occurred_at: datetime = field(default_factory=datetime.now)
+    
+    @property
+    def name(self) -> str:
+        """Event name, e.g. StatusChanged"""
+        return type(self).__name__
+    
+    def to_dict(self) -> dict:
+        """JSON-ready representation (for webhooks)"""
+        return {
+            'event': self.name,
+            'complaint_id': self.complaint_id,
+            'actor_id': self.actor_id,
+            'occurred_at': self.occurred_at.isoformat(),
+            'before': self.before.to_dict() if self.before else None,
+            'after': self.after.to_dict() if self.after else None
+        }
+
+
+class ComplaintCreated(DomainEvent):
+    """A complaint was submitted"""
+
+
+class StatusChanged(DomainEvent):
+    """A complaint moved to a different status"""
+
+
+class Assigned(DomainEvent):
+    """A complaint was assigned to a moderator/admin"""
+
+
+class Deleted(DomainEvent):
+    """A complaint and its photos were deleted"""
+
+
+class EventBus:
+    """
+    Runs event subscribers on background threads
+    
+    Events for the same complaint always go to the same single-threaded
+    lane, so subscribers see them in the order they were published; events
+    for different complaints run in parallel. Subscriber errors are
+    printed and counted, never raised to the publisher.
+    """
+    
+    def __init__(self, workers: int = EVENT_BUS_WORKERS):
+        """Initialize event bus (lanes start with the first event)"""
+        self._lanes = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"event-bus-{index}")
+            for index in range(max(workers, 1))
+        ]
+        # name -> (event type, handler)
+        self._subscribers: Dict[str, Tuple[Type[DomainEvent], Callable[[DomainEvent], None]]] = {}
+        self._lock = threading.Lock()
+        self._stats = Counter()
+    
+    def subscribe(self, name: str, event_type: Type[DomainEvent], handler: Callable[[DomainEvent], None]):
+        """
+        Run handler for every event of event_type (or a subclass)
+        
+        Subscribing again under the same name replaces the handler, so
+        services built more than once don't deliver twice.
+        """
+        with self._lock:
+            self._subscribers[name] = (event_type, handler)
+    
+    def unsubscribe(self, name: str):
+        """Remove a subscriber"""
+        with self._lock:
+            self._subscribers.pop(name, None)
+    
+    def publish(self, event: DomainEvent):
+        """Hand an event to its subscribers without waiting for them"""
+        with self._lock:
+            handlers = [
+                (name, handler) for name, (event_type, handler) in self._subscribers.items()
+                if isinstance(event, event_type)
+            ]
+            self._stats[f"published.{event.name}"] += 1
+        if handlers:
+            lane = self._lanes[event.complaint_id % len(self._lanes)]
+            lane.submit(self._dispatch, event, handlers)
+    
+    def drain(self, timeout: Optional[float] = None):
+        """Wait until every event published so far has been handled (for scripts and tests)"""
+        markers: List[Future] = [lane.submit(lambda: None) for lane in self._lanes]
+        for marker in markers:
+            marker.result(timeout)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get published/handled/failed counters per event and subscriber"""
+        with self._lock:
+            return dict(self._stats)
+    
+    def _dispatch(self, event: DomainEvent, handlers):
+        """Run an event's handlers one after another on its lane"""
+        for name, handler in handlers:
+            try:
+                handler(event)
+                outcome = 'handled'
+            except Exception as e:
+                print(f"Error in event subscriber {name} for {event.name} #{event.complaint_id}: {e}")
+                traceback.print_exc()
+                outcome = 'failed'
+            with self._lock:
+                self._stats[f"{outcome}.{name}"] += 1
+
+
+_event_bus: Optional[EventBus] = None
+_event_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    """Get the shared event bus, created on first use"""
+    global _event_bus
+    if _event_bus is None:
+        with _event_bus_lock:
+            if _event_bus is None:
+                _event_bus = EventBus()
+    return _event_bus
@@ -0,0 +1,134 @@
+"""
+Background export jobs with cached result files
+"""
+import os
+import json
+import uuid
+import hashlib
+from pathlib import Path
+from typing import Optional
+from database import DatabaseManager
+from database.export_db_manager import ExportDatabaseManager
+from database.export_models import ExportArtifact
+from .export_service import ExportService, EXPORT_FORMATS
+from .job_queue import JobQueue, get_job_queue
+from config.settings import DATABASE_PATH, EXPORT_DIR, EXPORT_ARTIFACT_MAX_AGE_HOURS
+
+# Job kind for building an export file
+EXPORT_JOB = 'build_export'
+
+
+class ExportJobService:
+    """
+    Runs exports on the job queue and reuses finished files
+    
+    An export is identified by (format, filters, data version). Requests
+    for the same key share one artifact: the first one enqueues the job,
+    everyone else polls its progress and downloads the same file. Any
+    write bumps the data version, so the next request builds a fresh file.
+    """
+    
+    def __init__(self, db: Optional[DatabaseManager] = None,
+                 exporter: Optional[ExportService] = None,
+                 db_path: Path = DATABASE_PATH, export_dir: Path = EXPORT_DIR,
+                 jobs: Optional[JobQueue] = None):
+        """Initialize export job service"""
+        self.db = db or DatabaseManager()
+        self.exporter = exporter or ExportService(self.db)
+        self.export_db = ExportDatabaseManager(db_path)
+        self.export_dir = Path(export_dir)
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        
+        self.jobs = jobs or get_job_queue()
+        self.jobs.register(EXPORT_JOB, self._export_job, on_give_up=self._export_failed)
+    
+    def request_export(self, export_format: str, filters: Optional[dict] = None) -> ExportArtifact:
+        """
+        Get the export for the current data, starting a job if needed
+        
+        Args:
+            export_format: One of EXPORT_FORMATS
+            filters: Keyword filters of DatabaseManager.query_complaints
+        
+        Returns:
+            The artifact; poll get_artifact() until its status is 'ready'
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {export_format}")
+        
+        filters = {name: value for name, value in (filters or {}).items() if value is not None}
+        data_version = self.db.get_data_version()
+        cache_key = hashlib.sha256(
+            json.dumps([export_format, filters, data_version], sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        
+        artifact, created = self.export_db.get_or_create(
+            cache_key, export_format, filters, data_version,
+            total_rows=self.db.count_complaints(**filters)
+        )
+        
+        enqueue = created
+        if artifact.status == 'failed':
+            enqueue = self.export_db.requeue(artifact.id, from_status='failed')
+        elif artifact.status == 'ready' and not (artifact.file_path and os.path.exists(artifact.file_path)):
+            # File deleted behind our back; build it again
+            enqueue = self.export_db.requeue(artifact.id, from_status='ready')
+        
+        if enqueue:
+            self.jobs.enqueue(EXPORT_JOB, {'artifact_id': artifact.id})
+            artifact = self.export_db.get_artifact(artifact.id)
+        return artifact
+    
+    def get_artifact(self, artifact_id: int) -> Optional[ExportArtifact]:
+        """Get the current state of an export"""
+        return self.export_db.get_artifact(artifact_id)
+    
+    def purge_stale(self) -> int:
+        """Delete export files for old data versions or past the maximum age"""
+        removed = 0
+        stale = self.export_db.get_stale_artifacts(self.db.get_data_version(), EXPORT_ARTIFACT_MAX_AGE_HOURS)
+        for artifact in stale:
+            if artifact.file_path:
+                try:
+                    os.remove(artifact.file_path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    # Still open for a download (Windows); retry next time
+                    print(f"Error removing export file {artifact.file_path}: {e}")
+                    continue
+            self.export_db.delete_artifact(artifact.id)
+            removed += 1
+        return removed
+    
+    def _export_job(self, payload: dict):
+        """Job handler: write the export to a file in the export directory"""
+        artifact = self.export_db.get_artifact(payload['artifact_id'])
+        if not artifact or artifact.status == 'ready':
+            return
+        
+        self.export_db.mark_running(artifact.id)
+        extension = EXPORT_FORMATS[artifact.format][0]
+        file_path = self.export_dir / f"export_{artifact.cache_key[:16]}{extension}"
+        # Unique scratch name: a retried job may overlap a stalled earlier attempt
+        part_path = self.export_dir / f"{file_path.name}.{uuid.uuid4().hex[:8]}.part"
+        
+        try:
+            with open(part_path, 'wb') as f:
+                rows = self.exporter.write(
+                    artifact.format, f,
+                    filters=artifact.filters,
+                    progress=lambda count: self.export_db.update_progress(artifact.id, count)
+                )
+            os.replace(part_path, file_path)
+        except Exception:
+            if part_path.exists():
+                part_path.unlink()
+            raise
+        
+        self.export_db.mark_ready(artifact.id, str(file_path), file_path.stat().st_size, rows)
+        self.purge_stale()
+    
+    def _export_failed(self, payload: dict, error: str):
+        """Give-up handler: surface the error to whoever is waiting"""
+        self.export_db.mark_failed(payload['artifact_id'], error)
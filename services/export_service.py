@@ -0,0 +1,718 @@
+"""
+Export service for complaint data
+"""
+import io
+import re
+import csv
+import json
+import heapq
+import shutil
+import struct
+import sqlite3
+import tempfile
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+from database import DatabaseManager
+from config.settings import (
+    EXPORT_SPOOL_MAX_BYTES, EXPORT_BATCH_SIZE, PARQUET_ROW_GROUP_SIZE, PARQUET_COMPRESSION,
+    PARQUET_MAX_BUFFERED_ROWS, PARQUET_MAX_OPEN_WRITERS
+)
+
+# (database column, exported header) in output order
+EXPORT_COLUMNS: List[Tuple[str, str]] = [
+    ('id', 'ID'),
+    ('location', 'Location'),
+    ('latitude', 'Latitude'),
+    ('longitude', 'Longitude'),
+    ('tags', 'Tags'),
+    ('description', 'Description'),
+    ('status', 'Status'),
+    ('created_at', 'Created At'),
+    ('resolved_at', 'Resolved At'),
+    ('resolution_time_hours', 'Resolution Time (hours)')
+]
+
+# Export format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'csv': ('.csv', 'text/csv'),
+    'xlsx': ('.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'geojsonl': ('.geojsonl', 'application/geo+json-seq'),
+    'gpkg': ('.gpkg', 'application/geopackage+sqlite3')
+}
+
+# WGS 84, the coordinate system of the stored latitude/longitude
+WGS84_SRS_ID = 4326
+WGS84_WKT = (
+    'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,'
+    'AUTHORITY["EPSG","7030"]],AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,'
+    'AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],'
+    'AUTHORITY["EPSG","4326"]]'
+)
+
+# GeoPackage header (magic, version 0, little-endian with no envelope, SRS ID)
+# followed by a little-endian WKB point
+GPKG_POINT = struct.Struct('<2sBBiBIdd')
+
+STATUS_SUMMARY_HEADERS = ['Status', 'Complaints', 'Avg Resolution Time (hours)']
+TAG_SUMMARY_HEADERS = ['Tag', 'Complaints', 'Resolved']
+
+# Columns a Parquet dataset can be split into directories by
+PARQUET_PARTITIONS = ('month', 'status')
+
+# Control characters Excel rejects inside cell text
+ILLEGAL_EXCEL_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class ExportService:
+    """Streams complaint data out of SQLite into export files"""
+    
+    def __init__(self, db: DatabaseManager = None):
+        """Initialize export service"""
+        self.db = db or DatabaseManager()
+    
+    def iter_rows(self, filters: Optional[dict] = None,
+                  progress: Optional[Callable[[int], None]] = None) -> Iterator[tuple]:
+        """Yield each matching complaint as a tuple of export column values"""
+        columns = [column for column, _ in EXPORT_COLUMNS]
+        for row in self._iter_source_rows(filters, progress):
+            yield tuple(row[column] for column in columns)
+    
+    def write(self, export_format: str, output: BinaryIO, filters: Optional[dict] = None,
+              progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Write complaints in one of EXPORT_FORMATS
+        
+        Args:
+            export_format: 'csv', 'xlsx', 'parquet', 'geojsonl' or 'gpkg'
+            output: Seekable binary file-like object to write to
+            filters: Keyword filters of DatabaseManager.query_complaints
+            progress: Called with the number of rows read after every batch
+        
+        Returns:
+            Number of complaint rows written
+        """
+        if export_format == 'csv':
+            return self.write_csv(output, filters=filters, progress=progress)
+        if export_format == 'xlsx':
+            return self.write_excel(output, filters=filters, progress=progress)
+        if export_format == 'parquet':
+            return self.write_parquet(output, filters=filters, progress=progress)
+        if export_format == 'geojsonl':
+            return self.write_geojson(output, filters=filters, progress=progress)
+        if export_format == 'gpkg':
+            # GeoPackage is an SQLite database, which needs a real file
+            with tempfile.TemporaryDirectory() as scratch_dir:
+                scratch_path = Path(scratch_dir) / 'export.gpkg'
+                count = self.write_geopackage(scratch_path, filters=filters, progress=progress)
+                with open(scratch_path, 'rb') as f:
+                    shutil.copyfileobj(f, output)
+            return count
+        raise ValueError(f"Unknown export format: {export_format}")
+    
+    def export(self, export_format: str, filters: Optional[dict] = None) -> BinaryIO:
+        """
+        Export complaints to a temporary file with no row limit
+        
+        Returns:
+            Spooled temporary file positioned at the start; it stays in
+            memory up to EXPORT_SPOOL_MAX_BYTES and moves to disk beyond.
+            The caller closes it.
+        """
+        output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_BYTES, mode='w+b')
+        try:
+            self.write(export_format, output, filters=filters)
+        except Exception:
+            output.close()
+            raise
+        output.seek(0)
+        return output
+    
+    def write_csv(self, output: BinaryIO, filters: Optional[dict] = None,
+                  progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Write matching complaints as UTF-8 CSV, one row at a time
+        
+        Args:
+            output: Binary file-like object to write to
+            filters: Keyword filters of DatabaseManager.query_complaints
+            progress: Called with the number of rows read after every batch
+        
+        Returns:
+            Number of complaint rows written
+        """
+        # csv needs a text stream; encode it into the binary output a batch at a time
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([header for _, header in EXPORT_COLUMNS])
+        
+        count = 0
+        for values in self.iter_rows(filters, progress):
+            writer.writerow(values)
+            count += 1
+            if count % EXPORT_BATCH_SIZE == 0:
+                self._drain(buffer, output)
+        
+        self._drain(buffer, output)
+        return count
+    
+    def write_changes(self, output: BinaryIO, since: Optional[int]) -> dict:
+        """
+        Write complaints changed since a data version as newline-delimited JSON
+        
+        Each line is {"op": "upsert", "seq": ..., "complaint": {...}} or
+        {"op": "delete", "seq": ..., "id": ...}, in the order the changes
+        were committed. Applying the lines in order brings a copy that was
+        current at version since up to the returned watermark.
+        
+        Args:
+            output: Binary file-like object to write to
+            since: Watermark from the previous export, or None for a full
+                snapshot (no delete lines)
+        
+        Returns:
+            Dictionary with 'upserts', 'deletes' and 'watermark' (pass it as
+            since next time)
+        """
+        until = self.db.get_data_version()
+        
+        upserts = (
+            (row['change_seq'], 'upsert', row)
+            for row in self.db.iter_changed_rows(-1 if since is None else since, until,
+                                                 batch_size=EXPORT_BATCH_SIZE)
+        )
+        streams = [upserts]
+        if since is not None:
+            streams.append(
+                (row['change_seq'], 'delete', row)
+                for row in self.db.iter_tombstones(since, until, batch_size=EXPORT_BATCH_SIZE)
+            )
+        
+        counts = {'upsert': 0, 'delete': 0}
+        for seq, op, row in heapq.merge(*streams, key=lambda change: change[0]):
+            if op == 'upsert':
+                change = {'op': op, 'seq': seq, 'complaint': self._change_record(row)}
+            else:
+                change = {'op': op, 'seq': seq, 'id': row['complaint_id'], 'deleted_at': row['deleted_at']}
+            output.write(json.dumps(change, ensure_ascii=False).encode('utf-8') + b'\n')
+            counts[op] += 1
+        
+        return {'upserts': counts['upsert'], 'deletes': counts['delete'], 'watermark': until}
+    
+    def export_changes(self, consumer: str, output: BinaryIO) -> dict:
+        """
+        Write everything a consumer hasn't received yet and advance its watermark
+        
+        The first export for a consumer is a full snapshot. The watermark is
+        only saved once the output has been written, so a failed export is
+        simply repeated next time.
+        
+        Args:
+            consumer: Name of the downstream system, e.g. 'city-gis'
+            output: Binary file-like object to write to
+        
+        Returns:
+            Dictionary with 'since', 'upserts', 'deletes' and 'watermark'
+        """
+        since = self.db.get_export_watermark(consumer)
+        result = self.write_changes(output, since)
+        output.flush()
+        self.db.set_export_watermark(consumer, result['watermark'])
+        result['since'] = since
+        return result
+    
+    def write_excel(self, output: BinaryIO, filters: Optional[dict] = None,
+                    progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Write matching complaints to an .xlsx workbook in openpyxl write-only mode
+        
+        Rows are appended straight from the database cursor and never kept
+        as cell objects. The status and tag summary sheets are tallied in
+        the same pass, so the table is read only once.
+        
+        Args:
+            output: Seekable binary file-like object to write to
+            filters: Keyword filters of DatabaseManager.query_complaints
+            progress: Called with the number of rows read after every batch
+        
+        Returns:
+            Number of complaint rows written
+        """
+        from openpyxl import Workbook
+        
+        workbook = Workbook(write_only=True)
+        complaints_sheet = workbook.create_sheet('Complaints')
+        status_sheet = workbook.create_sheet('Status Summary')
+        tag_sheet = workbook.create_sheet('Tag Summary')
+        
+        complaints_sheet.append([header for _, header in EXPORT_COLUMNS])
+        
+        columns = [column for column, _ in EXPORT_COLUMNS]
+        status_index = columns.index('status')
+        tags_index = columns.index('tags')
+        hours_index = columns.index('resolution_time_hours')
+        
+        # status -> [complaints, resolution hours total, resolved with hours]
+        by_status: Dict[str, list] = {}
+        # tag -> [complaints, resolved]
+        by_tag: Dict[str, list] = {}
+        
+        count = 0
+        for values in self.iter_rows(filters, progress):
+            complaints_sheet.append([self._excel_value(value) for value in values])
+            count += 1
+            
+            status = values[status_index] or ''
+            totals = by_status.setdefault(status, [0, 0.0, 0])
+            totals[0] += 1
+            if values[hours_index] is not None:
+                totals[1] += values[hours_index]
+                totals[2] += 1
+            
+            for tag in (values[tags_index] or '').split(','):
+                tag = tag.strip()
+                if tag:
+                    tag_totals = by_tag.setdefault(tag, [0, 0])
+                    tag_totals[0] += 1
+                    tag_totals[1] += status == 'resolved'
+        
+        status_sheet.append(STATUS_SUMMARY_HEADERS)
+        for status, (complaints, hours, timed) in sorted(by_status.items()):
+            average = round(hours / timed, 1) if timed else None
+            status_sheet.append([status, complaints, average])
+        
+        tag_sheet.append(TAG_SUMMARY_HEADERS)
+        for tag, (complaints, resolved) in sorted(by_tag.items(), key=lambda item: (-item[1][0], item[0])):
+            tag_sheet.append([self._excel_value(tag), complaints, resolved])
+        
+        workbook.save(output)
+        return count
+    
+    def write_parquet(self, output, compression: str = PARQUET_COMPRESSION,
+                      row_group_size: int = PARQUET_ROW_GROUP_SIZE, filters: Optional[dict] = None,
+                      progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Write matching complaints to a single Parquet file with typed columns
+        
+        Timestamps are UTC timestamps, coordinates and resolution time are
+        doubles and tags are a list of strings. Rows are converted one row
+        group at a time.
+        
+        Args:
+            output: File path or binary file-like object
+            compression: zstd, snappy, gzip or none
+            row_group_size: Rows per row group
+            filters: Keyword filters of DatabaseManager.query_complaints
+            progress: Called with the number of rows read after every batch
+        
+        Returns:
+            Number of complaint rows written
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        schema = self._parquet_schema()
+        count = 0
+        with pq.ParquetWriter(output, schema, compression=compression) as writer:
+            batch = []
+            for record in self.iter_records(filters, progress):
+                batch.append(record)
+                if len(batch) >= row_group_size:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    count += len(batch)
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+        return count
+    
+    def write_geojson(self, output: BinaryIO, filters: Optional[dict] = None,
+                      progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Write complaints with coordinates as newline-delimited GeoJSON
+        
+        One Point Feature per line (the GeoJSONSeq layout GDAL/QGIS read),
+        streamed straight from the database cursor. Complaints without
+        coordinates are skipped.
+        
+        Args:
+            output: Binary file-like object to write to
+            filters: Keyword filters of DatabaseManager.query_complaints,
+                including bbox=(min lon, min lat, max lon, max lat)
+            progress: Called with the number of rows read after every batch
+        
+        Returns:
+            Number of features written
+        """
+        count = 0
+        lines = []
+        for row in self._iter_source_rows(filters, progress):
+            if row['latitude'] is None or row['longitude'] is None:
+                continue
+            feature = {
+                'type': 'Feature',
+                'id': row['id'],
+                'geometry': {'type': 'Point', 'coordinates': [row['longitude'], row['latitude']]},
+                'properties': self._spatial_properties(row)
+            }
+            lines.append(json.dumps(feature, ensure_ascii=False))
+            count += 1
+            if len(lines) >= EXPORT_BATCH_SIZE:
+                output.write(('\n'.join(lines) + '\n').encode('utf-8'))
+                lines = []
+        if lines:
+            output.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        return count
+    
+    def write_geopackage(self, path: Path, filters: Optional[dict] = None,
+                         progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Write complaints with coordinates to a GeoPackage point layer
+        
+        The file is built with sqlite3 directly (no GDAL needed), following
+        the OGC GeoPackage 1.3 core: WGS 84 points in a 'complaints' table
+        registered in gpkg_contents with its extent. Rows are inserted a
+        batch at a time. No spatial index is created; QGIS and ogr2ogr add
+        one on demand.
+        
+        Args:
+            path: GeoPackage file to create (replaced if it exists)
+            filters: Keyword filters of DatabaseManager.query_complaints,
+                including bbox=(min lon, min lat, max lon, max lat)
+            progress: Called with the number of rows read after every batch
+        
+        Returns:
+            Number of features written
+        """
+        path = Path(path)
+        if path.exists():
+            path.unlink()
+        
+        conn = sqlite3.connect(path)
+        try:
+            # A throwaway file until it is complete; skip the journal
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("PRAGMA application_id = 1196444487")  # 'GPKG'
+            conn.execute("PRAGMA user_version = 10300")
+            self._create_geopackage_tables(conn)
+            
+            count = 0
+            extent = None
+            batch = []
+            insert = """
+                INSERT INTO complaints
+                (fid, geom, location, status, tags, description, created_at, resolved_at,
+                 updated_at, resolution_time_hours)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """
+            for row in self._iter_source_rows(filters, progress):
+                x, y = row['longitude'], row['latitude']
+                if x is None or y is None:
+                    continue
+                properties = self._spatial_properties(row)
+                batch.append((
+                    row['id'],
+                    GPKG_POINT.pack(b'GP', 0, 1, WGS84_SRS_ID, 1, 1, x, y),
+                    properties['location'],
+                    properties['status'],
+                    ', '.join(properties['tags']),
+                    properties['description'],
+                    properties['created_at'],
+                    properties['resolved_at'],
+                    properties['updated_at'],
+                    properties['resolution_time_hours']
+                ))
+                extent = (x, y, x, y) if extent is None else (
+                    min(extent[0], x), min(extent[1], y), max(extent[2], x), max(extent[3], y)
+                )
+                count += 1
+                if len(batch) >= EXPORT_BATCH_SIZE:
+                    conn.executemany(insert, batch)
+                    batch = []
+            if batch:
+                conn.executemany(insert, batch)
+            
+            if extent:
+                conn.execute("""
+                    UPDATE gpkg_contents SET min_x = ?, min_y = ?, max_x = ?, max_y = ?
+                    WHERE table_name = 'complaints'
+                """, extent)
+            conn.commit()
+        finally:
+            conn.close()
+        return count
+    
+    def write_parquet_dataset(self, root_dir: Path, partition_by: Sequence[str] = ('month',),
+                              compression: str = PARQUET_COMPRESSION,
+                              row_group_size: int = PARQUET_ROW_GROUP_SIZE,
+                              filters: Optional[dict] = None,
+                              max_buffered_rows: int = PARQUET_MAX_BUFFERED_ROWS,
+                              max_open_writers: int = PARQUET_MAX_OPEN_WRITERS) -> Dict[str, int]:
+        """
+        Write complaints as a Hive-partitioned Parquet dataset
+        
+        Files go to e.g. root_dir/month=2024-05/status=pending/part-0.parquet,
+        which pyarrow, Spark, DuckDB and most warehouses read as a single
+        table. As with pyarrow's write_to_dataset, a partition column is
+        stored in the directory name, not in the files.
+        
+        Memory is bounded however many partitions there are: once
+        max_buffered_rows are buffered in total, the largest buffers are
+        written as (smaller) row groups until half that is left, and
+        opening a writer beyond max_open_writers closes the least recently
+        used one, so a partition seen again later continues in part-1, ...
+        
+        Args:
+            root_dir: Directory to write into (created if missing)
+            partition_by: Any of 'month' (of created_at) and 'status', in order
+            compression: zstd, snappy, gzip or none
+            row_group_size: Rows buffered per partition before a row group is written
+            filters: Keyword filters of DatabaseManager.query_complaints,
+                including bbox=(min lon, min lat, max lon, max lat)
+            max_buffered_rows: Rows buffered across all partitions
+            max_open_writers: Partition files open at once
+        
+        Returns:
+            Dictionary of written file path -> row count
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        unknown = [name for name in partition_by if name not in PARQUET_PARTITIONS]
+        if unknown:
+            raise ValueError(f"Can't partition by {unknown}; choose from {PARQUET_PARTITIONS}")
+        
+        schema = self._parquet_schema()
+        for name in partition_by:
+            if name in schema.names:
+                schema = schema.remove(schema.get_field_index(name))
+        
+        root_dir = Path(root_dir)
+        # Open writers, least recently used first
+        writers: "OrderedDict[tuple, Tuple[str, pq.ParquetWriter]]" = OrderedDict()
+        parts: Dict[tuple, int] = {}  # Files started per partition
+        buffers: Dict[tuple, list] = {}
+        counts: Dict[str, int] = {}
+        buffered = 0
+        
+        def flush(key: tuple):
+            nonlocal buffered
+            if key in writers:
+                writers.move_to_end(key)
+            else:
+                if len(writers) >= max(max_open_writers, 1):
+                    _, (_, oldest) = writers.popitem(last=False)
+                    oldest.close()
+                directory = root_dir.joinpath(*(
+                    f"{name}={quote(value, safe='')}" for name, value in zip(partition_by, key)
+                ))
+                directory.mkdir(parents=True, exist_ok=True)
+                part = parts.get(key, 0)
+                parts[key] = part + 1
+                file_path = str(directory / f'part-{part}.parquet')
+                writers[key] = (file_path, pq.ParquetWriter(file_path, schema, compression=compression))
+            file_path, writer = writers[key]
+            writer.write_table(pa.Table.from_pylist(buffers[key], schema=schema))
+            counts[file_path] = counts.get(file_path, 0) + len(buffers[key])
+            buffered -= len(buffers[key])
+            buffers[key] = []
+        
+        try:
+            for record in self.iter_records(filters):
+                key = tuple(self._partition_value(record, name) for name in partition_by)
+                buffers.setdefault(key, []).append(record)
+                buffered += 1
+                if len(buffers[key]) >= row_group_size:
+                    flush(key)
+                elif buffered >= max_buffered_rows:
+                    for largest in sorted(buffers, key=lambda k: len(buffers[k]), reverse=True):
+                        if buffered <= max_buffered_rows // 2:
+                            break
+                        flush(largest)
+            for key, rows in buffers.items():
+                if rows:
+                    flush(key)
+        finally:
+            for _, writer in writers.values():
+                writer.close()
+        return counts
+    
+    def iter_records(self, filters: Optional[dict] = None,
+                     progress: Optional[Callable[[int], None]] = None) -> Iterator[dict]:
+        """Yield each matching complaint as a dict of typed export values"""
+        for row in self._iter_source_rows(filters, progress):
+            yield {
+                'id': row['id'],
+                'location': row['location'],
+                'latitude': row['latitude'],
+                'longitude': row['longitude'],
+                'tags': [tag.strip() for tag in (row['tags'] or '').split(',') if tag.strip()],
+                'description': row['description'],
+                'status': row['status'],
+                'created_at': self._parse_timestamp(row['created_at']),
+                'resolved_at': self._parse_timestamp(row['resolved_at']),
+                'resolution_time_hours': row['resolution_time_hours']
+            }
+    
+    def _iter_source_rows(self, filters: Optional[dict],
+                          progress: Optional[Callable[[int], None]]) -> Iterator:
+        """Read matching complaint rows in batches, reporting progress per batch"""
+        count = 0
+        for row in self.db.iter_export_rows(batch_size=EXPORT_BATCH_SIZE, **(filters or {})):
+            yield row
+            count += 1
+            if progress and count % EXPORT_BATCH_SIZE == 0:
+                progress(count)
+        if progress:
+            progress(count)
+    
+    @staticmethod
+    def _create_geopackage_tables(conn: sqlite3.Connection):
+        """Create the GeoPackage metadata tables and the empty complaints layer"""
+        conn.execute("""
+            CREATE TABLE gpkg_spatial_ref_sys (
+                srs_name TEXT NOT NULL,
+                srs_id INTEGER PRIMARY KEY,
+                organization TEXT NOT NULL,
+                organization_coordsys_id INTEGER NOT NULL,
+                definition TEXT NOT NULL,
+                description TEXT
+            )
+        """)
+        conn.executemany("INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)", [
+            ('Undefined cartesian SRS', -1, 'NONE', -1, 'undefined', 'undefined cartesian coordinate reference system'),
+            ('Undefined geographic SRS', 0, 'NONE', 0, 'undefined', 'undefined geographic coordinate reference system'),
+            ('WGS 84 geodetic', WGS84_SRS_ID, 'EPSG', WGS84_SRS_ID, WGS84_WKT, 'longitude/latitude coordinates in decimal degrees')
+        ])
+        conn.execute("""
+            CREATE TABLE gpkg_contents (
+                table_name TEXT NOT NULL PRIMARY KEY,
+                data_type TEXT NOT NULL,
+                identifier TEXT UNIQUE,
+                description TEXT DEFAULT '',
+                last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+                min_x DOUBLE,
+                min_y DOUBLE,
+                max_x DOUBLE,
+                max_y DOUBLE,
+                srs_id INTEGER,
+                CONSTRAINT fk_gc_r_srs_id FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys(srs_id)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE gpkg_geometry_columns (
+                table_name TEXT NOT NULL,
+                column_name TEXT NOT NULL,
+                geometry_type_name TEXT NOT NULL,
+                srs_id INTEGER NOT NULL,
+                z TINYINT NOT NULL,
+                m TINYINT NOT NULL,
+                CONSTRAINT pk_geom_cols PRIMARY KEY (table_name, column_name),
+                CONSTRAINT fk_gc_tn FOREIGN KEY (table_name) REFERENCES gpkg_contents(table_name),
+                CONSTRAINT fk_gc_srs FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys(srs_id)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE complaints (
+                fid INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+                geom POINT,
+                location TEXT,
+                status TEXT,
+                tags TEXT,
+                description TEXT,
+                created_at DATETIME,
+                resolved_at DATETIME,
+                updated_at DATETIME,
+                resolution_time_hours REAL
+            )
+        """)
+        conn.execute("""
+            INSERT INTO gpkg_contents (table_name, data_type, identifier, description, srs_id)
+            VALUES ('complaints', 'features', 'complaints', 'PathPatrol pothole complaints', ?)
+        """, (WGS84_SRS_ID,))
+        conn.execute("""
+            INSERT INTO gpkg_geometry_columns VALUES ('complaints', 'geom', 'POINT', ?, 0, 0)
+        """, (WGS84_SRS_ID,))
+    
+    def _spatial_properties(self, row) -> dict:
+        """Feature attributes for the spatial exports, timestamps in ISO 8601 UTC"""
+        return {
+            'location': row['location'],
+            'status': row['status'],
+            'tags': [tag.strip() for tag in (row['tags'] or '').split(',') if tag.strip()],
+            'description': row['description'],
+            'created_at': self._iso_timestamp(row['created_at']),
+            'resolved_at': self._iso_timestamp(row['resolved_at']),
+            'updated_at': self._iso_timestamp(row['updated_at']),
+            'resolution_time_hours': row['resolution_time_hours']
+        }
+    
+    @classmethod
+    def _iso_timestamp(cls, value) -> Optional[str]:
+        """Format a stored timestamp as YYYY-MM-DDTHH:MM:SS.SSSZ"""
+        parsed = cls._parse_timestamp(value)
+        if not parsed:
+            return None
+        return parsed.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.') + f"{parsed.microsecond // 1000:03d}Z"
+    
+    @staticmethod
+    def _change_record(row) -> dict:
+        """JSON-ready complaint for the change feed"""
+        record = {column: row[column] for column, _ in EXPORT_COLUMNS}
+        record['tags'] = [tag.strip() for tag in (row['tags'] or '').split(',') if tag.strip()]
+        record['updated_at'] = row['updated_at']
+        return record
+    
+    @staticmethod
+    def _parquet_schema():
+        """Arrow schema of the Parquet export"""
+        import pyarrow as pa
+        
+        return pa.schema([
+            ('id', pa.int64()),
+            ('location', pa.string()),
+            ('latitude', pa.float64()),
+            ('longitude', pa.float64()),
+            ('tags', pa.list_(pa.string())),
+            ('description', pa.string()),
+            ('status', pa.string()),
+            ('created_at', pa.timestamp('s', tz='UTC')),
+            ('resolved_at', pa.timestamp('s', tz='UTC')),
+            ('resolution_time_hours', pa.float64())
+        ])
+    
+    @staticmethod
+    def _parse_timestamp(value) -> Optional[datetime]:
+        """Parse a SQLite CURRENT_TIMESTAMP string (UTC) into an aware datetime"""
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    
+    @staticmethod
+    def _partition_value(record: dict, name: str) -> str:
+        """Directory value of a record for one partition column"""
+        if name == 'month':
+            created_at = record['created_at']
+            return created_at.strftime('%Y-%m') if created_at else 'unknown'
+        return record[name] or 'unknown'
+    
+    @staticmethod
+    def _excel_value(value):
+        """Strip characters that would make openpyxl reject a text cell"""
+        if isinstance(value, str):
+            return ILLEGAL_EXCEL_CHARS.sub('', value)
+        return value
+    
+    def _drain(self, buffer: io.StringIO, output: BinaryIO):
+        """Move buffered CSV text into the binary output and reset the buffer"""
+        output.write(buffer.getvalue().encode('utf-8'))
+        buffer.seek(0)
+        buffer.truncate()
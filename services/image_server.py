@@ -0,0 +1,266 @@
+"""
+HTTP server for stored photos with cache-friendly, immutable URLs
+"""
+import os
+import re
+import stat as stat_module
+import hashlib
+import mimetypes
+import threading
+from functools import lru_cache
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from .storage_service import StorageService
+from config.settings import (
+    IMAGE_SERVER_ENABLED, IMAGE_SERVER_HOST, IMAGE_SERVER_PORT, IMAGE_BASE_URL
+)
+
+# Formats the stdlib table may not know about
+mimetypes.add_type('image/webp', '.webp')
+mimetypes.add_type('image/avif', '.avif')
+
+# A year; the token in the URL changes whenever the bytes do
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# /i/<token>/<file name>; names can't start with a dot, so no "." or ".."
+URL_PATTERN = re.compile(r'^/i/([0-9a-f]{16})/([A-Za-z0-9_-][A-Za-z0-9_.-]*)$')
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+@lru_cache(maxsize=8192)
+def _content_token(file_path: str, mtime_ns: int, size: int) -> str:
+    """Short SHA-256 of a file's bytes, cached until the file changes"""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()[:16]
+
+
+def content_token(file_path: Path, stat: Optional[os.stat_result] = None) -> str:
+    """Content hash used as the URL version and ETag of a file"""
+    stat = stat or file_path.stat()
+    return _content_token(str(file_path), stat.st_mtime_ns, stat.st_size)
+
+
+class ImageRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves GET/HEAD /i/<token>/<name> from the upload directory
+    
+    The token must match the file's current content hash, so only URLs the
+    app handed out work; guessing a file name (e.g. an original upload
+    with its EXIF location) gets a 404.
+    """
+    
+    server_version = 'PathPatrolImages/1.0'
+    
+    def do_GET(self):
+        """Send an image, honouring conditional and range requests"""
+        self._serve(send_body=True)
+    
+    def do_HEAD(self):
+        """Send the headers of an image only"""
+        self._serve(send_body=False)
+    
+    def log_message(self, format, *args):
+        """Keep per-request logging out of the app's console"""
+        pass
+    
+    def _serve(self, send_body: bool):
+        """Resolve the URL to a stored file and answer the request"""
+        match = URL_PATTERN.match(self.path.split('?', 1)[0])
+        if not match:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        
+        token, name = match.groups()
+        file_path = self.server.storage.get_image_path(f"uploads/{name}")
+        try:
+            stat = file_path.stat()
+            if not stat_module.S_ISREG(stat.st_mode) or token != content_token(file_path, stat):
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        
+        etag = f'"{token}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        
+        if self._not_modified(etag, stat.st_mtime):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            self.send_header('Cache-Control', IMMUTABLE_CACHE_CONTROL)
+            self.end_headers()
+            return
+        
+        byte_range = self._parse_range(stat.st_size, etag)
+        if byte_range == 'invalid':
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header('Content-Range', f"bytes */{stat.st_size}")
+            self.end_headers()
+            return
+        
+        start, end = byte_range or (0, stat.st_size - 1)
+        length = max(end - start + 1, 0)
+        
+        self.send_response(HTTPStatus.PARTIAL_CONTENT if byte_range else HTTPStatus.OK)
+        self.send_header('Content-Type', mimetypes.guess_type(name)[0] or 'application/octet-stream')
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('Cache-Control', IMMUTABLE_CACHE_CONTROL)
+        if byte_range:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{stat.st_size}")
+        self.end_headers()
+        
+        if send_body and length:
+            self._send_file(file_path, start, length)
+    
+    def _not_modified(self, etag: str, mtime: float) -> bool:
+        """Check If-None-Match, falling back to If-Modified-Since"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            candidates = [value.strip() for value in if_none_match.split(',')]
+            return '*' in candidates or etag in candidates or f"W/{etag}" in candidates
+        
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+    
+    def _parse_range(self, size: int, etag: str):
+        """
+        Parse a single-range Range header
+        
+        Returns:
+            (start, end) inclusive, None to send the whole file, or
+            'invalid' if the range can't be satisfied
+        """
+        header = self.headers.get('Range')
+        if not header:
+            return None
+        
+        # If-Range with an outdated validator means "send everything"
+        if_range = self.headers.get('If-Range')
+        if if_range and if_range.strip() != etag:
+            return None
+        
+        match = RANGE_PATTERN.match(header.strip())
+        if not match or match.groups() == ('', ''):
+            # Multiple or malformed ranges: ignore and send the whole file
+            return None
+        
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(last), 0)
+            end = size - 1
+        
+        if start >= size or start > end:
+            return 'invalid'
+        return start, end
+    
+    def _send_file(self, file_path: Path, start: int, length: int):
+        """Copy a byte range of the file to the client in chunks"""
+        try:
+            with open(file_path, 'rb') as f:
+                f.seek(start)
+                remaining = length
+                while remaining > 0:
+                    chunk = f.read(min(64 * 1024, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            # Browser navigated away mid-transfer
+            pass
+
+
+class ImageServer:
+    """Runs the image HTTP server on a daemon thread and builds its URLs"""
+    
+    def __init__(self, storage: Optional[StorageService] = None, host: str = IMAGE_SERVER_HOST,
+                 port: int = IMAGE_SERVER_PORT, base_url: str = IMAGE_BASE_URL):
+        """Initialize image server (call start() to begin serving)"""
+        self.storage = storage or StorageService()
+        self.host = host
+        self.port = port
+        self.base_url = base_url
+        self.running = False
+        self._httpd: Optional[ThreadingHTTPServer] = None
+    
+    def start(self) -> bool:
+        """
+        Bind and serve in the background
+        
+        Returns:
+            True if serving; False if the port is unavailable
+        """
+        if self.running:
+            return True
+        try:
+            self._httpd = ThreadingHTTPServer((self.host, self.port), ImageRequestHandler)
+        except OSError as e:
+            print(f"Image server could not listen on {self.host}:{self.port}: {e}")
+            return False
+        
+        self._httpd.daemon_threads = True
+        self._httpd.storage = self.storage
+        thread = threading.Thread(target=self._httpd.serve_forever, name='image-server', daemon=True)
+        thread.start()
+        self.running = True
+        return True
+    
+    def stop(self):
+        """Stop serving"""
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        self.running = False
+    
+    def url_for(self, file_path: Path) -> Optional[str]:
+        """Immutable URL of a stored file, or None if it doesn't exist"""
+        try:
+            token = content_token(file_path)
+        except OSError:
+            return None
+        return f"{self.base_url}/i/{token}/{file_path.name}"
+
+
+_image_server: Optional[ImageServer] = None
+_image_server_lock = threading.Lock()
+
+
+def get_image_server() -> Optional[ImageServer]:
+    """
+    Get the process-wide image server, starting it on first use
+    
+    Returns:
+        The running server, or None if serving is disabled or the port
+        could not be bound (callers fall back to local file paths)
+    """
+    global _image_server
+    if not IMAGE_SERVER_ENABLED:
+        return None
+    if _image_server is None:
+        with _image_server_lock:
+            if _image_server is None:
+                from .registry import get_storage_service
+                server = ImageServer(get_storage_service())
+                server.start()
+                _image_server = server
+    return _image_server if _image_server.running else None
@@ -0,0 +1,185 @@
+"""
+Durable background job queue
+Jobs are stored in SQLite and executed by worker threads in this process
+"""
+import time
+import threading
+import traceback
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from database.job_db_manager import JobDatabaseManager
+from database.job_models import Job
+from config.settings import (
+    DATABASE_PATH, JOB_WORKERS, JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_SECONDS,
+    JOB_LEASE_SECONDS, JOB_POLL_INTERVAL
+)
+
+
+class JobQueue:
+    """Runs registered job handlers on worker threads with retries"""
+    
+    def __init__(self, db_path: Path = DATABASE_PATH, workers: int = JOB_WORKERS,
+                 lease_seconds: int = JOB_LEASE_SECONDS):
+        """Initialize job queue (workers start on first start() call)"""
+        self.db = JobDatabaseManager(db_path)
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self._handlers: Dict[str, Callable[[dict], None]] = {}
+        self._give_up_handlers: Dict[str, Callable[[dict, str], None]] = {}
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._last_purge = 0.0
+    
+    def register(self, kind: str, handler: Callable[[dict], None],
+                 on_give_up: Optional[Callable[[dict, str], None]] = None):
+        """
+        Register the handler for a job kind
+        
+        Args:
+            kind: Job kind name
+            handler: Called with the job payload; raising schedules a retry
+            on_give_up: Called with the payload and last error once all
+                attempts have failed
+        """
+        self._handlers[kind] = handler
+        if on_give_up:
+            self._give_up_handlers[kind] = on_give_up
+    
+    def enqueue(self, kind: str, payload: dict, max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        """Persist a job and wake a worker; returns the job ID"""
+        job_id = self.db.enqueue(kind, payload, max_attempts)
+        self._wakeup.set()
+        return job_id
+    
+    def start(self):
+        """Start the worker threads if they aren't running yet"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"job-worker-{index}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+    
+    def stop(self, timeout: float = 5.0):
+        """Ask the workers to finish their current job and exit"""
+        self._stop.set()
+        self._wakeup.set()
+        with self._lock:
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+    
+    def run_pending(self, max_jobs: Optional[int] = None) -> int:
+        """Run due jobs on the calling thread (for scripts); returns jobs run"""
+        count = 0
+        while max_jobs is None or count < max_jobs:
+            job = self.db.claim_next(list(self._handlers), self.lease_seconds)
+            if not job:
+                break
+            self._run_job(job)
+            count += 1
+        return count
+    
+    def _worker_loop(self):
+        """Claim and run jobs until stopped"""
+        while not self._stop.is_set():
+            try:
+                job = self.db.claim_next(list(self._handlers), self.lease_seconds)
+            except Exception as e:
+                print(f"Error claiming job: {e}")
+                job = None
+            
+            if job:
+                self._run_job(job)
+                continue
+            
+            self._purge_old_jobs()
+            
+            # Sleep until new work is enqueued here or the poll interval
+            # passes (retries coming due, jobs enqueued by other processes)
+            self._wakeup.wait(JOB_POLL_INTERVAL)
+            self._wakeup.clear()
+    
+    def _run_job(self, job: Job):
+        """Run one claimed job and record the outcome"""
+        if job.is_exhausted():
+            # The worker running the final attempt died before finishing it
+            self._give_up(job, job.last_error or "Lease expired on the final attempt")
+            return
+        
+        handler = self._handlers.get(job.kind)
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job.id, done),
+            name=f"job-heartbeat-{job.id}", daemon=True
+        )
+        heartbeat.start()
+        try:
+            handler(job.payload)
+            self.db.complete(job.id)
+        except Exception as e:
+            error = f"{e.__class__.__name__}: {e}"
+            print(f"Job #{job.id} ({job.kind}) attempt {job.attempts} failed: {error}")
+            
+            if job.is_final_attempt():
+                traceback.print_exc()
+                self._give_up(job, error)
+            else:
+                delay = JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+                self.db.retry_later(job.id, error, delay)
+        finally:
+            done.set()
+    
+    def _heartbeat(self, job_id: int, done: threading.Event):
+        """Keep a running job's lease from expiring while its handler works"""
+        # Renew well before expiry, so one slow database write doesn't lose the lease
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                if not self.db.extend_lease(job_id, self.lease_seconds):
+                    return
+            except Exception as e:
+                print(f"Error extending lease of job #{job_id}: {e}")
+    
+    def _give_up(self, job: Job, error: str):
+        """Mark a job as failed and run its give-up handler"""
+        self.db.fail(job.id, error)
+        on_give_up = self._give_up_handlers.get(job.kind)
+        if on_give_up:
+            try:
+                on_give_up(job.payload, error)
+            except Exception as give_up_error:
+                print(f"Error in give-up handler for job #{job.id}: {give_up_error}")
+    
+    def _purge_old_jobs(self):
+        """Drop finished jobs at most once an hour"""
+        if time.monotonic() - self._last_purge < 3600:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            self.db.purge_finished()
+        except Exception as e:
+            print(f"Error purging finished jobs: {e}")
+
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Get the process-wide job queue, starting its workers on first use"""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                queue = JobQueue()
+                queue.start()
+                _job_queue = queue
+    return _job_queue
@@ -0,0 +1,236 @@
+"""
+Notification digests for PathPatrol
+Status changes and assignments are buffered per recipient and sent as one
+summary email, so a bulk operation doesn't send one email per complaint
+"""
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from database.notification_db_manager import NotificationDatabaseManager
+from database.notification_models import NotificationEvent
+from . import email_templates
+from .email_service import EmailService, get_email_service
+from config.settings import (
+    DATABASE_PATH, NOTIFICATION_DIGEST_WINDOW_SECONDS, NOTIFICATION_IMMEDIATE_EVENTS,
+    NOTIFICATION_POLL_INTERVAL, NOTIFICATION_LEASE_SECONDS, NOTIFICATION_MAX_ATTEMPTS
+)
+
+
+class NotificationService:
+    """
+    Buffers notification events and sends one digest per recipient
+    
+    An event waits in the notification_events table until the oldest
+    event for its recipient is window_seconds old; then all of that
+    recipient's events are coalesced into one email. Several transitions
+    of the same complaint collapse into one (first old status, last new
+    status), and a complaint that ends where it started is left out.
+    Events listed in immediate_events, or sent with priority='high',
+    skip the buffer. Nothing is buffered while email is disabled, and
+    events whose digest failed max_attempts times are dropped.
+    """
+    
+    def __init__(self, email: Optional[EmailService] = None, db_path: Path = DATABASE_PATH,
+                 window_seconds: int = NOTIFICATION_DIGEST_WINDOW_SECONDS,
+                 immediate_events=NOTIFICATION_IMMEDIATE_EVENTS,
+                 max_attempts: int = NOTIFICATION_MAX_ATTEMPTS):
+        """Initialize notification service (the flush thread starts on first start() call)"""
+        self.email = email or get_email_service()
+        self.db = NotificationDatabaseManager(db_path)
+        self.window_seconds = window_seconds
+        self.immediate_events = frozenset(immediate_events)
+        self.max_attempts = max_attempts
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+    
+    def notify_status_change(self, recipient_email: str, recipient_name: str, complaint_id: int,
+                             location: str, old_status: str, new_status: str,
+                             priority: str = 'normal') -> bool:
+        """
+        Tell a citizen their complaint changed status
+        
+        Returns:
+            True if the event was buffered or the email queued
+        """
+        return self._notify(NotificationEvent(
+            recipient_email=recipient_email,
+            recipient_name=recipient_name,
+            event_type='status',
+            complaint_id=complaint_id,
+            location=location,
+            old_status=old_status,
+            new_status=new_status
+        ), priority)
+    
+    def notify_assignment(self, recipient_email: str, recipient_name: str, complaint_id: int,
+                          location: str, description: str, priority: str = 'normal') -> bool:
+        """
+        Tell a moderator a complaint was assigned to them
+        
+        Returns:
+            True if the event was buffered or the email queued
+        """
+        return self._notify(NotificationEvent(
+            recipient_email=recipient_email,
+            recipient_name=recipient_name,
+            event_type='assignment',
+            complaint_id=complaint_id,
+            location=location,
+            description=description
+        ), priority)
+    
+    def flush(self, force: bool = False) -> int:
+        """
+        Send digests to every recipient whose window has passed
+        
+        Args:
+            force: Send everything buffered, regardless of the window
+        
+        Returns:
+            Number of digest emails queued
+        """
+        sent = 0
+        for recipient in self.db.get_due_recipients(0 if force else self.window_seconds):
+            events = self.db.claim_events(recipient, NOTIFICATION_LEASE_SECONDS)
+            if not events:
+                continue  # Another process got there first
+            try:
+                delivered = self._send_digest(events)
+            except Exception as e:
+                print(f"Error sending digest to {recipient}: {e}")
+                delivered = False
+            
+            if delivered:
+                self.db.delete_events([event.id for event in events])
+                sent += 1
+                continue
+            
+            # Events that kept failing are dropped; newer ones get another try
+            expired = [event.id for event in events if event.attempts >= self.max_attempts]
+            if expired:
+                print(f"❌ Dropping {len(expired)} notification events for {recipient} "
+                      f"after {self.max_attempts} failed attempts")
+                self.db.delete_events(expired)
+            self.db.release_events([event.id for event in events if event.attempts < self.max_attempts])
+        return sent
+    
+    def start(self):
+        """Start the flush thread if it isn't running yet"""
+        with self._lock:
+            if self._thread:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._flush_loop, name="notification-digest", daemon=True)
+            self._thread.start()
+    
+    def stop(self, timeout: float = 5.0):
+        """Stop the flush thread (buffered events stay in the database)"""
+        self._stop.set()
+        with self._lock:
+            if self._thread:
+                self._thread.join(timeout)
+            self._thread = None
+    
+    def get_pending_count(self) -> int:
+        """Number of events waiting for a digest"""
+        return self.db.count_pending()
+    
+    @staticmethod
+    def coalesce(events: List[NotificationEvent]) -> Tuple[List[Tuple[int, str, str, str]], List[Tuple[int, str, str]]]:
+        """
+        Collapse a recipient's events into one entry per complaint
+        
+        Returns:
+            (status changes, assignments) in the order the complaints first
+            appeared, in the tuple shapes email_templates.digest_context takes
+        """
+        status_changes: Dict[int, List[str]] = {}
+        assignments: Dict[int, Tuple[int, str, str]] = {}
+        for event in events:
+            if event.event_type == 'status':
+                change = status_changes.setdefault(
+                    event.complaint_id, [event.location, event.old_status, event.new_status]
+                )
+                change[0] = event.location
+                change[2] = event.new_status
+            elif event.event_type == 'assignment':
+                assignments[event.complaint_id] = (event.complaint_id, event.location, event.description)
+        
+        return (
+            [
+                (complaint_id, location, old_status, new_status)
+                for complaint_id, (location, old_status, new_status) in status_changes.items()
+                if old_status != new_status
+            ],
+            list(assignments.values())
+        )
+    
+    def _notify(self, event: NotificationEvent, priority: str) -> bool:
+        """Send an event now or buffer it for the recipient's digest"""
+        if not event.recipient_email or not self.email.enabled:
+            return False
+        if self.window_seconds <= 0 or priority == 'high' or event.key in self.immediate_events:
+            return self._send_digest([event])
+        
+        try:
+            self.db.add_event(event)
+        except Exception as e:
+            print(f"Error buffering notification: {e}")
+            return False
+        self.start()
+        return True
+    
+    def _send_digest(self, events: List[NotificationEvent]) -> bool:
+        """Queue one email covering the given events of one recipient"""
+        recipient = events[-1]
+        status_changes, assignments = self.coalesce(events)
+        
+        if not status_changes and not assignments:
+            return True  # Everything cancelled out
+        
+        # A single item reads better in its own template than as a summary
+        if len(status_changes) == 1 and not assignments:
+            complaint_id, location, old_status, new_status = status_changes[0]
+            return self.email.send_complaint_status_update(
+                recipient.recipient_email, recipient.recipient_name,
+                complaint_id, location, old_status, new_status
+            )
+        if len(assignments) == 1 and not status_changes:
+            complaint_id, location, description = assignments[0]
+            return self.email.send_assignment_notification(
+                recipient.recipient_email, recipient.recipient_name,
+                complaint_id, location, description
+            )
+        
+        email = email_templates.render(
+            'digest',
+            **email_templates.digest_context(recipient.recipient_name, status_changes, assignments)
+        )
+        return self.email.send_email(recipient.recipient_email, email.subject, email.html_body, email.text_body)
+    
+    def _flush_loop(self):
+        """Send due digests every NOTIFICATION_POLL_INTERVAL seconds until stopped"""
+        while not self._stop.is_set():
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing notification digests: {e}")
+            self._stop.wait(NOTIFICATION_POLL_INTERVAL)
+
+
+_notification_service: Optional[NotificationService] = None
+_notification_service_lock = threading.Lock()
+
+
+def get_notification_service() -> NotificationService:
+    """Get the shared notification service, created and started on first use"""
+    global _notification_service
+    if _notification_service is None:
+        with _notification_service_lock:
+            if _notification_service is None:
+                service = NotificationService()
+                # Pick up events buffered before a restart
+                service.start()
+                _notification_service = service
+    return _notification_service
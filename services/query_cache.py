@@ -0,0 +1,115 @@
+"""
+Read-through cache for query results, invalidated by the data version
+"""
+import copy
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import is_dataclass
+from typing import Any, Callable, Hashable, Optional
+
+
+def _detach(value: Any) -> Any:
+    """
+    Copy a cached value so changes by the caller don't reach the cache
+    
+    Records (dataclasses such as Complaint) only hold immutable scalars,
+    so a shallow copy of each is enough and much cheaper than deepcopy;
+    anything else is deep-copied.
+    """
+    if isinstance(value, list):
+        return [copy.copy(item) if is_dataclass(item) else copy.deepcopy(item) for item in value]
+    return copy.copy(value) if is_dataclass(value) else copy.deepcopy(value)
+
+
+class QueryCache:
+    """
+    LRU cache of query results with per-entry TTLs and a size cap
+    
+    Every entry remembers the data version it was loaded at; a lookup
+    with a newer version is a miss, so any write (which bumps the
+    version) invalidates everything without tracking which queries it
+    touched. Size is measured in rows (list length, 1 for anything
+    else) so a few huge result sets can't crowd out memory. Callers get
+    copies that share nothing mutable with the cache.
+    """
+    
+    def __init__(self, max_rows: int = 20000, default_ttl: float = 60.0):
+        """Initialize an empty cache"""
+        self.max_rows = max_rows
+        self.default_ttl = default_ttl
+        # key -> (data_version, expires_at, rows, value)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stale': 0, 'expired': 0, 'evictions': 0}
+    
+    def get_or_load(self, key: Hashable, data_version: int, loader: Callable[[], Any],
+                    ttl: Optional[float] = None) -> Any:
+        """
+        Return a copy of the cached value, loading it on a miss
+        
+        Args:
+            key: Query identity, e.g. (method name, arguments)
+            data_version: Current data version; older entries are reloaded
+            loader: Runs the query
+            ttl: Seconds the entry may be served (default_ttl if None)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                version, expires_at, _, value = entry
+                if version == data_version and expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return _detach(value)
+                self._stats['stale' if version != data_version else 'expired'] += 1
+                self._remove(key)
+            self._stats['misses'] += 1
+        
+        # Query outside the lock so slow loads don't serialize all readers
+        value = loader()
+        self._store(key, data_version, value, self.default_ttl if ttl is None else ttl)
+        return _detach(value)
+    
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+    
+    def get_stats(self) -> dict:
+        """Get hit/miss counters, hit rate and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['rows'] = self._rows
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+    
+    def _store(self, key: Hashable, data_version: int, value: Any, ttl: float):
+        """Insert an entry and evict least recently used ones over the cap"""
+        rows = len(value) if isinstance(value, (list, tuple, dict)) else 1
+        if rows > self.max_rows or ttl <= 0:
+            return
+        
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing and existing[0] > data_version:
+                # A concurrent reader already cached a newer result
+                return
+            self._remove(key)
+            self._entries[key] = (data_version, time.monotonic() + ttl, rows, value)
+            self._rows += rows
+            
+            while self._rows > self.max_rows:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+    
+    def _remove(self, key: Hashable):
+        """Remove an entry if present (lock must be held)"""
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._rows -= entry[2]
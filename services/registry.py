@@ -0,0 +1,85 @@
+"""
+Process-wide service registry
+
+Services and database managers are stateless apart from their
+configuration, so one instance of each is shared by every session and
+rerun instead of re-running schema setup and directory creation per
+render. Service modules are imported inside the getters so importing
+the registry stays cheap.
+"""
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, TypeVar
+from database.db_manager import DatabaseManager
+
+if TYPE_CHECKING:
+    from database.user_db_manager import UserDatabaseManager
+    from .storage_service import StorageService
+    from .complaint_service import ComplaintService
+    from .export_service import ExportService
+    from .export_job_service import ExportJobService
+    from .session_service import SessionService
+
+T = TypeVar('T')
+
+_instances: Dict[str, object] = {}
+# Re-entrant: factories call other getters while the lock is held
+_lock = threading.RLock()
+
+
+def _get_or_create(name: str, factory: Callable[[], T]) -> T:
+    """Return the shared instance for a name, building it on first use"""
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = factory()
+                _instances[name] = instance
+    return instance
+
+
+def get_database_manager() -> DatabaseManager:
+    """Get the shared complaint database manager"""
+    return _get_or_create('database', DatabaseManager)
+
+
+def get_user_db_manager() -> 'UserDatabaseManager':
+    """Get the shared user database manager"""
+    from database.user_db_manager import UserDatabaseManager
+    return _get_or_create('user_database', UserDatabaseManager)
+
+
+def get_storage_service() -> 'StorageService':
+    """Get the shared storage service"""
+    from .storage_service import StorageService
+    return _get_or_create('storage', StorageService)
+
+
+def get_complaint_service() -> 'ComplaintService':
+    """Get the shared complaint service"""
+    from .complaint_service import ComplaintService
+    return _get_or_create('complaints', lambda: ComplaintService(
+        db=get_database_manager(),
+        storage=get_storage_service()
+    ))
+
+
+def get_export_service() -> 'ExportService':
+    """Get the shared export service"""
+    from .export_service import ExportService
+    return _get_or_create('export', lambda: ExportService(get_database_manager()))
+
+
+def get_export_job_service() -> 'ExportJobService':
+    """Get the shared background export service"""
+    from .export_job_service import ExportJobService
+    return _get_or_create('export_jobs', lambda: ExportJobService(
+        db=get_database_manager(),
+        exporter=get_export_service()
+    ))
+
+
+def get_session_service() -> 'SessionService':
+    """Get the shared login session service"""
+    from .session_service import SessionService
+    return _get_or_create('sessions', lambda: SessionService(user_db=get_user_db_manager()))
@@ -0,0 +1,119 @@
+"""
+Login sessions backed by signed tokens
+A successful password login issues a token that the browser keeps in a
+cookie; later page loads present the token instead of the password, so
+bcrypt only runs on real logins
+"""
+import os
+import hmac
+import time
+import base64
+import hashlib
+import secrets
+from pathlib import Path
+from typing import Optional
+from database.user_db_manager import UserDatabaseManager
+from database.user_models import User
+from config.settings import SESSION_TTL_HOURS, SESSION_SECRET, SESSION_SECRET_FILE
+
+
+def load_session_secret(secret_file: Path = SESSION_SECRET_FILE) -> bytes:
+    """
+    Get the key that signs session tokens
+    
+    Uses SESSION_SECRET if set, otherwise a random key generated once and
+    kept in secret_file so sessions survive restarts. Changing the key
+    logs everyone out.
+    """
+    if SESSION_SECRET:
+        return SESSION_SECRET.encode('utf-8')
+    
+    secret_file = Path(secret_file)
+    if not secret_file.exists():
+        secret_file.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # O_EXCL: if another process wins the race, read its key instead
+            fd = os.open(secret_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                f.write(secrets.token_hex(32))
+        except FileExistsError:
+            pass
+    return secret_file.read_text().strip().encode('utf-8')
+
+
+class SessionService:
+    """
+    Issues, validates and revokes login sessions
+    
+    A token is "<random>.<signature>": the signature (HMAC-SHA256 of the
+    random part) rejects forged cookies without touching the database, and
+    the sessions table stores only a SHA-256 of the token, so a leaked
+    database can't be replayed as cookies. Validation is one primary-key
+    lookup joined to the user, which also enforces expiry and deactivation.
+    """
+    
+    def __init__(self, user_db: Optional[UserDatabaseManager] = None,
+                 secret: Optional[bytes] = None, ttl_hours: float = SESSION_TTL_HOURS):
+        """Initialize session service"""
+        self.user_db = user_db or UserDatabaseManager()
+        self.secret = secret or load_session_secret()
+        self.ttl_hours = ttl_hours
+        self._last_purge = 0.0
+    
+    def create_session(self, user: User) -> Optional[str]:
+        """
+        Start a session for a user who just logged in
+        
+        Expired sessions are deleted here too, at most once an hour.
+        
+        Returns:
+            Token to store in the browser cookie, or None on failure
+        """
+        self._purge_expired_hourly()
+        random_part = secrets.token_urlsafe(32)
+        token = f"{random_part}.{self._sign(random_part)}"
+        if not self.user_db.create_session(self._hash(token), user.id, self.ttl_hours):
+            return None
+        return token
+    
+    def validate(self, token: Optional[str]) -> Optional[User]:
+        """Get the user a token belongs to, or None if it is forged, expired or revoked"""
+        if not token or '.' not in token:
+            return None
+        random_part, _, signature = token.partition('.')
+        if not hmac.compare_digest(signature.encode('utf-8'), self._sign(random_part).encode('ascii')):
+            return None
+        return self.user_db.get_session_user(self._hash(token))
+    
+    def revoke(self, token: Optional[str]):
+        """End one session (logout)"""
+        if token:
+            self.user_db.delete_session(self._hash(token))
+    
+    def revoke_user(self, user_id: int) -> int:
+        """End every session of a user"""
+        return self.user_db.delete_user_sessions(user_id)
+    
+    def purge_expired(self) -> int:
+        """Delete expired sessions"""
+        return self.user_db.purge_expired_sessions()
+    
+    def _purge_expired_hourly(self):
+        """Drop expired sessions at most once an hour"""
+        if time.monotonic() - self._last_purge < 3600:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            self.purge_expired()
+        except Exception as e:
+            print(f"Error purging expired sessions: {e}")
+    
+    def _sign(self, value: str) -> str:
+        """URL-safe HMAC-SHA256 of a value"""
+        digest = hmac.new(self.secret, value.encode('utf-8'), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+    
+    @staticmethod
+    def _hash(token: str) -> str:
+        """What the sessions table stores instead of the token"""
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
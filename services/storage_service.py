@@ -2,22 +2,52 @@
 Storage service for handling file uploads
 """
 import os
+import time
+import uuid
 import hashlib
+import threading
 from pathlib import Path
-from datetime import datetime
-from typing import Optional, List, Tuple
+from typing import Optional, Dict, List, Tuple
 from PIL import Image
 from PIL.ExifTags import TAGS, GPSTAGS
-from config.settings import UPLOAD_DIR, ALLOWED_EXTENSIONS, MAX_FILE_SIZE_MB
+from database.image_db_manager import ImageDatabaseManager
+from database.image_models import ImageVariant
+from .duplicate_service import get_duplicate_detector
+from config.settings import (
+    UPLOAD_DIR, STAGING_DIR, DATABASE_PATH, ALLOWED_EXTENSIONS, MAX_FILE_SIZE_MB, UPLOAD_SHARD_LEVELS,
+    IMAGE_MAX_SIZE, IMAGE_VARIANTS, MAX_IMAGE_PIXELS, MAX_CONCURRENT_DECODES,
+    IMAGE_OUTPUT_FORMAT, IMAGE_FORMAT_FALLBACKS, IMAGE_QUALITY, KEEP_ORIGINAL_UPLOADS
+)
+
+# Pillow itself only errors at twice its limit; _open_image rejects anything
+# above MAX_IMAGE_PIXELS before a single pixel is decoded
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+# Bounds how many images are decoded at once across all sessions, so peak
+# memory is roughly MAX_CONCURRENT_DECODES x one decoded image
+_decode_slots = threading.BoundedSemaphore(MAX_CONCURRENT_DECODES)
+
+# File extension written for each output format
+FORMAT_EXTENSIONS = {
+    'WEBP': '.webp',
+    'AVIF': '.avif',
+    'JPEG': '.jpg',
+    'PNG': '.png',
+}
 
 
 class StorageService:
     """Handles file storage operations"""
     
-    def __init__(self, upload_dir: Path = UPLOAD_DIR):
+    def __init__(self, upload_dir: Path = UPLOAD_DIR, db_path: Path = DATABASE_PATH,
+                 staging_dir: Path = STAGING_DIR):
         """Initialize storage service"""
         self.upload_dir = upload_dir
         self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self.staging_dir = staging_dir
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        self.image_db = ImageDatabaseManager(db_path)
+        self.output_format = self._resolve_output_format()
     
     def save_image(self, uploaded_file, optimize: bool = True) -> Optional[str]:
         """
@@ -26,7 +56,7 @@ class StorageService:
         Args:
             uploaded_file: Streamlit UploadedFile object
             optimize: Whether to optimize the image
-            
+        
         Returns:
             Relative path to saved file or None if failed
         """
@@ -35,42 +65,235 @@ class StorageService:
             if not self._validate_file(uploaded_file):
                 return None
             
-            # Generate unique filename
-            filename = self._generate_filename(uploaded_file.name)
-            file_path = self.upload_dir / filename
+            # Identical bytes are stored once; further uploads just add a reference
+            digest = self._hash_file(uploaded_file)
+            blob = self.image_db.get_blob(digest)
+            if blob and self.get_image_path(blob.photo_path).exists():
+                self.image_db.acquire_blob(digest, blob.photo_path)
+                return blob.photo_path
             
-            # Open and process image
-            image = Image.open(uploaded_file)
+            # Name by content hash; the extension follows the output format
+            stem = digest
+            relative_path = f"uploads/{stem}{FORMAT_EXTENSIONS[self.output_format]}"
             
-            # Optimize if requested
-            if optimize:
-                image = self._optimize_image(image)
+            try:
+                with _decode_slots:
+                    # Open and process image, decoding at the reduced size when possible
+                    image = self._open_image(uploaded_file, IMAGE_MAX_SIZE if optimize else None)
+                    
+                    # Optimize if requested
+                    if optimize:
+                        image = self._optimize_image(image, IMAGE_MAX_SIZE)
+                    
+                    # Encode and register the full image, then the smaller variants
+                    self._write_variant(image, relative_path, 'full', relative_path)
+                    self._save_variants(image, relative_path)
+                    self.image_db.set_hash(relative_path, self.compute_dhash(image))
+                
+                # Optionally keep the upload exactly as received, once it decoded
+                if KEEP_ORIGINAL_UPLOADS:
+                    self._save_original(uploaded_file, stem, relative_path)
+            except Exception:
+                # Corrupt upload: remove what was written, unless another upload
+                # of the same content has finished storing it meanwhile
+                if self.image_db.get_blob(digest) == blob:
+                    self._discard_files(relative_path)
+                raise
             
-            # Save image
-            image.save(file_path, quality=85, optimize=True)
+            # A blob row whose file is gone is stale; this upload starts it over
+            self.image_db.acquire_blob(digest, relative_path, reset=blob is not None)
             
             # Return relative path
-            return f"uploads/{filename}"
-            
+            return relative_path
+        
         except Exception as e:
             print(f"Error saving image: {e}")
             return None
     
+    def stage_upload(self, uploaded_file) -> Optional[str]:
+        """
+        Write an upload to the staging area as received, without decoding it
+        
+        Returns:
+            Staged file name or None if the upload is invalid
+        """
+        try:
+            if not self._validate_file(uploaded_file):
+                return None
+            
+            staged_name = f"{uuid.uuid4().hex}{Path(uploaded_file.name).suffix.lower()}"
+            uploaded_file.seek(0)
+            with open(self.staging_dir / staged_name, 'wb') as f:
+                for chunk in iter(lambda: uploaded_file.read(1024 * 1024), b''):
+                    f.write(chunk)
+            uploaded_file.seek(0)
+            return staged_name
+        
+        except Exception as e:
+            print(f"Error staging upload: {e}")
+            return None
+    
+    def get_staged_path(self, staged_name: str) -> Path:
+        """Get absolute path of a staged upload"""
+        return self.staging_dir / Path(staged_name).name
+    
+    def discard_staged(self, staged_name: str):
+        """Remove a staged upload once processed"""
+        staged_path = self.get_staged_path(staged_name)
+        if staged_path.exists():
+            staged_path.unlink()
+    
+    def generate_variants(self, relative_path: str) -> int:
+        """
+        Generate the size variants of an already stored image
+        
+        Args:
+            relative_path: Path of the full image as stored on the complaint
+        
+        Returns:
+            Number of variant files written
+        """
+        file_path = self.get_image_path(relative_path)
+        with _decode_slots:
+            with self._open_image(file_path) as image:
+                image.load()
+                self._register_variant(
+                    relative_path, 'full', relative_path, image.size,
+                    image.format, file_path.stat().st_size
+                )
+                self.image_db.set_hash(relative_path, self.compute_dhash(image))
+                return self._save_variants(image, relative_path)
+    
     def delete_image(self, relative_path: str) -> bool:
-        """Delete image from disk"""
+        """
+        Release an image, deleting it and its variants once unreferenced
+        
+        Returns:
+            True if the reference was released or the files were deleted
+        """
         try:
-            file_path = self.upload_dir.parent / relative_path
-            if file_path.exists():
-                file_path.unlink()
+            # Other complaints still point at the same content
+            if self.image_db.release_blob(relative_path):
                 return True
-            return False
+            return self._discard_files(relative_path)
         except Exception as e:
             print(f"Error deleting image: {e}")
             return False
     
+    def get_image_hashes(self, relative_paths: List[str]) -> Dict[str, str]:
+        """Get the stored perceptual hashes of images keyed by path"""
+        return self.image_db.get_hashes_for_paths(relative_paths)
+    
+    def compute_dhash(self, image: Image.Image) -> str:
+        """
+        64-bit difference hash of an image as 16 hex digits
+        
+        Each bit says whether a pixel of a 9x8 grayscale thumbnail is
+        brighter than its right neighbour, which survives re-compression,
+        resizing and small exposure changes.
+        """
+        small = image.convert('L').resize((9, 8), Image.Resampling.BOX)
+        pixels = list(small.getdata())
+        
+        value = 0
+        for row in range(8):
+            for col in range(8):
+                left = pixels[row * 9 + col]
+                right = pixels[row * 9 + col + 1]
+                value = (value << 1) | (left > right)
+        return f"{value:016x}"
+    
     def get_image_path(self, relative_path: str) -> Path:
-        """Get absolute path for an image"""
-        return self.upload_dir.parent / relative_path
+        """
+        Get absolute path for an image
+        
+        Stored paths keep the flat ``uploads/<name>`` form while the file
+        lives in a shard directory derived from its name. Files that
+        migrate_uploads.py has not moved yet are found at the flat location.
+        """
+        sharded_path = self._shard_path(Path(relative_path).name)
+        if sharded_path.exists():
+            return sharded_path
+        
+        flat_path = self.upload_dir.parent / relative_path
+        if flat_path.exists():
+            return flat_path
+        
+        return sharded_path
+    
+    def migrate_to_shards(self, batch_size: int = 500, pause: float = 0.0,
+                          dry_run: bool = False) -> dict:
+        """
+        Move files from the flat upload directory into shard directories
+        
+        Safe to run while the app is serving: get_image_path finds a file
+        in either place, and each move is an atomic rename.
+        
+        Args:
+            batch_size: Number of files moved between pauses
+            pause: Seconds to sleep after each batch to limit I/O pressure
+            dry_run: Only count what would be moved
+        
+        Returns:
+            Dictionary with moved, skipped and conflict counts
+        """
+        result = {'moved': 0, 'skipped': 0, 'conflicts': 0}
+        
+        with os.scandir(self.upload_dir) as entries:
+            for entry in entries:
+                # Shard directories, placeholders and in-progress writes stay put
+                if not entry.is_file() or entry.name.startswith('.') or entry.name.endswith('.tmp'):
+                    result['skipped'] += 1
+                    continue
+                
+                target = self._shard_path(entry.name)
+                if target.exists():
+                    result['conflicts'] += 1
+                    continue
+                
+                if not dry_run:
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(entry.path, target)
+                result['moved'] += 1
+                
+                if pause and result['moved'] % batch_size == 0:
+                    time.sleep(pause)
+        
+        return result
+    
+    def get_storage_summary(self) -> List[dict]:
+        """Get stored file count and bytes per variant and format"""
+        return self.image_db.get_storage_summary()
+    
+    def select_variant(self, max_width: int) -> str:
+        """Name of the smallest variant that is at least ``max_width`` pixels wide"""
+        for name, (width, _) in sorted(IMAGE_VARIANTS.items(), key=lambda item: item[1][0]):
+            if width >= max_width:
+                return name
+        return 'full'
+    
+    def get_display_paths(self, relative_paths: List[str], max_width: int) -> List[Path]:
+        """
+        Resolve images to the smallest stored variant that fills ``max_width``
+        
+        Images without a registered variant (e.g. the original was already
+        smaller than the variant box) fall back to the full image.
+        """
+        return self.get_display_paths_by_width(relative_paths, [max_width])[max_width]
+    
+    def get_display_paths_by_width(self, relative_paths: List[str], widths) -> Dict[int, List[Path]]:
+        """Resolve images for several display widths with one registry lookup"""
+        registered = self.image_db.get_variants_for_paths(relative_paths)
+        
+        resolved = {}
+        for max_width in widths:
+            variant = self.select_variant(max_width)
+            paths = []
+            for relative_path in relative_paths:
+                record = registered.get(relative_path, {}).get(variant)
+                paths.append(self.get_image_path(record.file_path if record else relative_path))
+            resolved[max_width] = paths
+        return resolved
     
     def _validate_file(self, uploaded_file) -> bool:
         """Validate uploaded file"""
@@ -89,13 +312,65 @@ class StorageService:
         
         return True
     
-    def _generate_filename(self, original_name: str) -> str:
-        """Generate unique filename"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        hash_obj = hashlib.md5(f"{original_name}{timestamp}".encode())
-        hash_str = hash_obj.hexdigest()[:8]
-        ext = Path(original_name).suffix.lower()
-        return f"pothole_{timestamp}_{hash_str}{ext}"
+    def _shard_path(self, filename: str) -> Path:
+        """Absolute shard location for a file name, e.g. uploads/3f/a9/<name>"""
+        digest = hashlib.sha256(filename.encode()).hexdigest()
+        shards = [digest[level * 2:level * 2 + 2] for level in range(UPLOAD_SHARD_LEVELS)]
+        return self.upload_dir.joinpath(*shards, filename)
+    
+    def _storage_path(self, relative_path: str) -> Path:
+        """Shard location to write a new file to, creating its directory"""
+        target = self._shard_path(Path(relative_path).name)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        return target
+    
+    def _hash_file(self, uploaded_file) -> str:
+        """SHA-256 of the uploaded bytes, read in chunks"""
+        sha256 = hashlib.sha256()
+        uploaded_file.seek(0)
+        for chunk in iter(lambda: uploaded_file.read(1024 * 1024), b''):
+            sha256.update(chunk)
+        uploaded_file.seek(0)
+        return sha256.hexdigest()
+    
+    def _resolve_output_format(self) -> str:
+        """Pick the configured output format, falling back if Pillow can't write it"""
+        Image.init()
+        for image_format in [IMAGE_OUTPUT_FORMAT] + IMAGE_FORMAT_FALLBACKS:
+            if image_format in Image.SAVE and image_format in FORMAT_EXTENSIONS:
+                return image_format
+        return 'JPEG'
+    
+    def _open_image(self, source, max_size: Optional[tuple] = None) -> Image.Image:
+        """
+        Open an image without decoding more pixels than max_size needs
+        
+        JPEGs are decoded at a reduced DCT scale (draft mode), so a 48 MP
+        photo never inflates to full resolution in memory. Other formats are
+        decoded in full, bounded by MAX_IMAGE_PIXELS, then reduced by an
+        integer factor that keeps at least twice the target size for the
+        final LANCZOS resample.
+        
+        Raises:
+            ValueError: If the image has more than MAX_IMAGE_PIXELS pixels
+        """
+        image = Image.open(source)
+        
+        # Header only so far; reject decompression bombs before decoding
+        width, height = image.size
+        if width * height > MAX_IMAGE_PIXELS:
+            image.close()
+            raise ValueError(f"Image has too many pixels: {width}x{height}")
+        
+        if max_size and (width > max_size[0] or height > max_size[1]):
+            if image.format == 'JPEG':
+                image.draft(image.mode, max_size)
+            else:
+                factor = int(max(width / max_size[0], height / max_size[1]) // 2)
+                if factor >= 2:
+                    image = image.reduce(factor)
+        
+        return image
     
     def _optimize_image(self, image: Image.Image, max_size: tuple = (1920, 1080)) -> Image.Image:
         """Optimize image size and quality"""
@@ -111,6 +386,106 @@ class StorageService:
         
         return image
     
+    def _discard_files(self, relative_path: str) -> bool:
+        """
+        Remove an image's files, variants and hash (its blob row is left alone)
+        
+        Returns:
+            True if the full image file was deleted
+        """
+        self.image_db.delete_hash(relative_path)
+        get_duplicate_detector().remove(relative_path)
+        for variant in self.image_db.delete_variants(relative_path):
+            if variant.file_path != relative_path:
+                variant_path = self.get_image_path(variant.file_path)
+                if variant_path.exists():
+                    variant_path.unlink()
+        
+        file_path = self.get_image_path(relative_path)
+        if file_path.exists():
+            file_path.unlink()
+            return True
+        return False
+    
+    def _save_variants(self, image: Image.Image, relative_path: str) -> int:
+        """Write and register the configured size variants of an image"""
+        stem = Path(relative_path).stem
+        ext = FORMAT_EXTENSIONS[self.output_format]
+        written = 0
+        
+        # Largest first so each variant is downscaled from the previous one
+        for variant, box in sorted(IMAGE_VARIANTS.items(), key=lambda item: item[1][0], reverse=True):
+            if image.size[0] <= box[0] and image.size[1] <= box[1]:
+                # Already fits; lookups fall back to the next larger image
+                continue
+            
+            image = image.copy()
+            image.thumbnail(box, Image.Resampling.LANCZOS)
+            
+            self._write_variant(image, relative_path, variant, f"uploads/{stem}_{variant}{ext}")
+            written += 1
+        
+        return written
+    
+    def _write_variant(self, image: Image.Image, photo_path: str, variant: str, file_path: str):
+        """Encode an image with the output policy for its variant and register it"""
+        image_format = self.output_format
+        options = {'quality': IMAGE_QUALITY.get(variant, 80)}
+        
+        if image_format == 'WEBP':
+            options['method'] = 4
+        elif image_format == 'JPEG':
+            options.update(optimize=True, progressive=True)
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+        elif image_format == 'PNG':
+            options = {'optimize': True}
+        
+        # Write under a temporary name so a concurrent upload of the same
+        # content never sees a half-written file
+        target = self._storage_path(file_path)
+        temp_path = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            image.save(temp_path, format=image_format, **options)
+            os.replace(temp_path, target)
+        except Exception:
+            temp_path.unlink(missing_ok=True)
+            raise
+        self._register_variant(
+            photo_path, variant, file_path, image.size,
+            image_format, target.stat().st_size
+        )
+    
+    def _save_original(self, uploaded_file, stem: str, photo_path: str):
+        """Copy the upload byte for byte and register it as the 'original' variant"""
+        file_path = f"uploads/{stem}_original{Path(uploaded_file.name).suffix.lower()}"
+        target = self._storage_path(file_path)
+        
+        uploaded_file.seek(0)
+        with open(target, 'wb') as f:
+            for chunk in iter(lambda: uploaded_file.read(1024 * 1024), b''):
+                f.write(chunk)
+        uploaded_file.seek(0)
+        
+        image_format = Path(file_path).suffix.lstrip('.').upper()
+        self._register_variant(
+            photo_path, 'original', file_path, (None, None),
+            'JPEG' if image_format == 'JPG' else image_format, target.stat().st_size
+        )
+    
+    def _register_variant(self, photo_path: str, variant: str, file_path: str, size: tuple,
+                          image_format: Optional[str] = None, size_bytes: Optional[int] = None):
+        """Record a stored variant in the image registry"""
+        self.image_db.register_variant(ImageVariant(
+            photo_path=photo_path,
+            variant=variant,
+            file_path=file_path,
+            width=size[0],
+            height=size[1],
+            format=image_format,
+            size_bytes=size_bytes
+        ))
+    
     def extract_gps_from_image(self, uploaded_file) -> Optional[Tuple[float, float]]:
         """
         Extract GPS coordinates from image EXIF data
@@ -152,7 +527,7 @@ class StorageService:
                 lon = -lon
             
             return (lat, lon)
-            
+        
         except Exception as e:
             print(f"Error extracting GPS data: {e}")
             return None
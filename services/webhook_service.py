@@ -0,0 +1,35 @@
+"""
+Webhook delivery of complaint events
+Each domain event is POSTed as JSON to every URL in WEBHOOK_URLS
+"""
+import json
+import urllib.request
+from typing import List
+from .events import DomainEvent
+from config.settings import WEBHOOK_TIMEOUT
+
+
+class WebhookPublisher:
+    """POSTs events to external endpoints (runs as an event bus subscriber)"""
+    
+    def __init__(self, urls: List[str], timeout: float = WEBHOOK_TIMEOUT):
+        """Initialize webhook publisher"""
+        self.urls = list(urls)
+        self.timeout = timeout
+    
+    def send(self, event: DomainEvent):
+        """Deliver one event to every endpoint, best effort"""
+        body = json.dumps(event.to_dict()).encode('utf-8')
+        for url in self.urls:
+            request = urllib.request.Request(
+                url,
+                data=body,
+                headers={'Content-Type': 'application/json', 'X-PathPatrol-Event': event.name},
+                method='POST'
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+            except Exception as e:
+                # One endpoint being down shouldn't stop the others
+                print(f"Error delivering {event.name} webhook to {url}: {e}")
@@ -0,0 +1,86 @@
+"""
+Near-duplicate photo index
+Checks that the index follows photos stored and deleted through the
+database, not just the ones added in this process
+"""
+import io
+
+from PIL import Image
+
+import services.complaint_service as complaint_module
+from database import DatabaseManager
+from services.complaint_service import ComplaintService
+from services.duplicate_service import BKTree, DuplicateDetector
+from services.job_queue import JobQueue
+from services.storage_service import StorageService
+
+
+def test_bk_tree_finds_and_removes():
+    tree = BKTree()
+    tree.add(0b0000, 'a')
+    tree.add(0b0001, 'b')
+    tree.add(0b1111, 'c')
+
+    assert tree.search(0b0000, 1) == [(0, 'a'), (1, 'b')]
+    assert tree.remove(0b0000, 'a')
+    assert not tree.remove(0b0000, 'a')
+    assert tree.search(0b0000, 1) == [(1, 'b')]
+    assert tree.search(0b1110, 1) == [(1, 'c')]  # Reached through the emptied root
+    assert tree.size == 2
+
+
+def test_index_follows_the_database(tmp_path):
+    """Hashes stored elsewhere are found; deleted ones are not suggested"""
+    detector = DuplicateDetector(tmp_path / "images.db")
+    other_process = DuplicateDetector(tmp_path / "images.db").image_db
+
+    other_process.set_hash('uploads/a.webp', 'ffff000000000000')
+    assert detector.find('ffff000000000001') == [(1, 'uploads/a.webp')]
+
+    other_process.set_hash('uploads/b.webp', 'ffff000000000003')
+    assert [path for _, path in detector.find('ffff000000000001')] == ['uploads/a.webp', 'uploads/b.webp']
+
+    other_process.delete_hash('uploads/a.webp')
+    assert detector.find('ffff000000000001') == [(1, 'uploads/b.webp')]
+
+    detector.remove('uploads/b.webp')
+    other_process.delete_hash('uploads/b.webp')
+    assert detector.find('ffff000000000001') == []
+
+
+class Upload(io.BytesIO):
+    """Stands in for a Streamlit UploadedFile"""
+
+    def __init__(self, data: bytes, name: str = 'photo.png'):
+        super().__init__(data)
+        self.name = name
+
+
+def test_photo_job_records_earlier_reports(tmp_path, monkeypatch):
+    """Similar complaints are found by the photo job; submitting never decodes the upload"""
+    queue = JobQueue(db_path=tmp_path / "jobs.db", workers=0, lease_seconds=60)
+    monkeypatch.setattr(complaint_module, 'get_job_queue', lambda: queue)
+    # Default image database, shared with the process-wide duplicate index
+    storage = StorageService(upload_dir=tmp_path / "uploads", staging_dir=tmp_path / "staging")
+    service = ComplaintService(DatabaseManager(tmp_path / "complaints.db"), storage)
+
+    buffer = io.BytesIO()
+    image = Image.new('RGB', (800, 600), (90, 90, 90))
+    image.paste((230, 230, 230), (0, 0, 400, 600))
+    image.save(buffer, format='PNG')
+
+    decodes = []
+    open_image = storage._open_image
+    monkeypatch.setattr(storage, '_open_image', lambda *args: decodes.append(args) or open_image(*args))
+
+    first = service.submit_complaint(Upload(buffer.getvalue()), 'Main St', None, None, ['pothole'], '')
+    second = service.submit_complaint(Upload(buffer.getvalue()), 'Main Street', None, None, ['pothole'], '')
+    assert not decodes
+
+    assert queue.run_pending() == 2
+    assert decodes  # Decoded by the job instead
+    assert service.db.get_complaint(first).get_similar_complaints() == []
+    complaint = service.db.get_complaint(second)
+    assert complaint.processing_status == 'ready'
+    assert complaint.get_similar_complaints() == [(first, 0)]
+    assert [(other.id, distance) for other, distance in service.get_similar_complaints(complaint)] == [(first, 0)]
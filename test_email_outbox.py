@@ -0,0 +1,134 @@
+"""
+Email outbox delivery against a local SMTP server
+Runs an aiosmtpd server on localhost and checks that queued messages share
+one connection, that 4xx replies are retried and 5xx replies dead-lettered
+"""
+import socket
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+
+from aiosmtpd.controller import Controller
+from services.email_outbox import OutboxSender
+
+
+class RecordingHandler:
+    """Accepts mail, except for recipients it has been told to reject"""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+        self.rejections = {}  # recipient -> SMTP reply
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.rejections:
+            return self.rejections[address]
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append(envelope)
+        return '250 Message accepted for delivery'
+
+
+def _free_port() -> int:
+    """Ask the OS for a port nothing is listening on"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    """A local SMTP server without TLS or authentication"""
+    handler = RecordingHandler()
+    port = _free_port()
+    controller = Controller(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+    try:
+        yield handler, port
+    finally:
+        controller.stop()
+
+
+@pytest.fixture
+def sender(smtp_server, tmp_path):
+    """An outbox sender with its own database, pointed at the local server"""
+    _, port = smtp_server
+    return OutboxSender(
+        host='127.0.0.1',
+        port=port,
+        sender_email='pathpatrol@example.com',
+        use_tls=False,
+        db_path=tmp_path / 'outbox.db'
+    )
+
+
+def test_batch_is_sent_over_one_connection(smtp_server, sender):
+    """Many queued messages go out in a single SMTP session"""
+    handler, _ = smtp_server
+    for index in range(20):
+        sender.enqueue(f"user{index}@example.com", f"Update #{index}", f"<p>Update {index}</p>",
+                       text_body=f"Update {index}")
+
+    session = sender.new_session()
+    assert sender.run_pending(session) == 20
+    session.close()
+
+    assert len(handler.messages) == 20
+    assert session.connections_opened == 1
+    assert len(handler.sessions) == 1
+    assert sender.get_stats() == {'sent': 20}
+    assert b'multipart/alternative' in handler.messages[0].original_content
+
+
+def test_temporary_rejection_is_retried(smtp_server, sender):
+    """A 4xx reply puts the message back in the outbox with a delay"""
+    handler, _ = smtp_server
+    handler.rejections['busy@example.com'] = '451 Try again later'
+    message_id = sender.enqueue('busy@example.com', 'Status', '<p>Resolved</p>')
+
+    assert sender.run_pending() == 0
+
+    message = sender.db.get_message(message_id)
+    assert message.status == 'queued'
+    assert message.attempts == 1
+    assert message.next_attempt_at > message.created_at
+    assert '451' in message.last_error
+
+
+def test_permanent_rejection_is_dead_lettered(smtp_server, sender):
+    """A 5xx reply dead-letters the message without blocking the rest"""
+    handler, _ = smtp_server
+    handler.rejections['nobody@example.com'] = '550 No such user'
+    dead_id = sender.enqueue('nobody@example.com', 'Status', '<p>Resolved</p>')
+    sender.enqueue('someone@example.com', 'Status', '<p>Resolved</p>')
+
+    assert sender.run_pending() == 1
+
+    assert sender.db.get_message(dead_id).status == 'dead'
+    assert [envelope.rcpt_tos for envelope in handler.messages] == [['someone@example.com']]
+
+
+def test_unreachable_server_releases_the_batch(tmp_path):
+    """If the connection fails, the whole batch is retried later without using attempts"""
+    offline = OutboxSender(
+        host='127.0.0.1',
+        port=_free_port(),  # Nothing listens here
+        sender_email='pathpatrol@example.com',
+        use_tls=False,
+        db_path=tmp_path / 'outbox.db'
+    )
+    first_id = offline.enqueue('a@example.com', 'Status', '<p>x</p>')
+    second_id = offline.enqueue('b@example.com', 'Status', '<p>x</p>')
+
+    assert offline.run_pending() == 0
+
+    for message_id in (first_id, second_id):
+        message = offline.db.get_message(message_id)
+        assert message.status == 'queued'
+        assert message.attempts == 0
+        assert message.next_attempt_at > message.created_at
+    assert offline.run_pending() == 0  # Backing off, not claimed again
@@ -0,0 +1,52 @@
+"""
+Email template rendering
+"""
+from services import email_templates
+
+
+def test_user_fields_are_escaped_in_html_only():
+    """Location and description can't inject markup into the HTML part"""
+    email = email_templates.render(
+        'assignment',
+        moderator_name='Sam',
+        complaint_id=12,
+        location='Main St & 5th <script>alert(1)</script>',
+        description='"Deep" pothole'
+    )
+
+    assert '<script>' not in email.html_body
+    assert 'Main St &amp; 5th &lt;script&gt;' in email.html_body
+    assert '&quot;Deep&quot; pothole' in email.html_body
+    assert 'Main St & 5th <script>alert(1)</script>' in email.text_body
+    assert email.subject == 'PathPatrol: New Complaint Assigned - #12'
+
+
+def test_status_update_resolved_note():
+    """The resolved note appears only when the new status is resolved"""
+    resolved = email_templates.render(
+        'status_update',
+        **email_templates.status_update_context('Ana', 3, 'Ring Rd', 'in_progress', 'resolved')
+    )
+    rejected = email_templates.render(
+        'status_update',
+        **email_templates.status_update_context('Ana', 3, 'Ring Rd', 'pending', 'rejected')
+    )
+
+    assert 'class="resolved-note"' in resolved.html_body
+    assert 'has been resolved' in resolved.text_body
+    assert 'class="resolved-note"' not in rejected.html_body
+    assert 'status-rejected">❌ Rejected' in rejected.html_body
+
+
+def test_render_batch_personalizes_each_message():
+    """One compiled template renders many different recipients"""
+    contexts = [
+        {'user_name': f'User {index}', 'username': f'user{index}', 'user_email': f'u{index}@example.com'}
+        for index in range(3)
+    ]
+
+    emails = list(email_templates.render_batch('welcome', contexts))
+
+    assert [email.subject for email in emails] == ['Welcome to PathPatrol! 🛣️'] * 3
+    assert all(f'Hello User {index},' in email.html_body for index, email in enumerate(emails))
+    assert all('$' not in email.html_body for email in emails)
@@ -0,0 +1,59 @@
+"""
+In-process event bus
+"""
+import time
+
+from database.models import Complaint
+from services.events import EventBus, DomainEvent, StatusChanged, Deleted
+
+
+def _status_changed(complaint_id, old_status, new_status):
+    before = Complaint(id=complaint_id, status=old_status)
+    return StatusChanged(complaint_id, before=before, after=Complaint(id=complaint_id, status=new_status))
+
+
+def test_events_of_one_complaint_arrive_in_order():
+    """Subscribers see one complaint's transitions in publish order"""
+    bus = EventBus(workers=4)
+    seen = []
+
+    def slow_handler(event):
+        time.sleep(0.001)
+        seen.append((event.complaint_id, event.after.status))
+
+    bus.subscribe('record', StatusChanged, slow_handler)
+    for status in ['in_progress', 'resolved', 'pending', 'rejected']:
+        bus.publish(_status_changed(7, 'x', status))
+    bus.drain(5)
+
+    assert seen == [(7, 'in_progress'), (7, 'resolved'), (7, 'pending'), (7, 'rejected')]
+
+
+def test_failing_subscriber_does_not_affect_others():
+    """An exception is counted, and the other subscribers still run"""
+    bus = EventBus(workers=1)
+    seen = []
+
+    def broken(event):
+        raise RuntimeError("webhook down")
+
+    bus.subscribe('broken', DomainEvent, broken)
+    bus.subscribe('record', DomainEvent, lambda event: seen.append(event.name))
+    bus.publish(Deleted(3, before=Complaint(id=3)))
+    bus.drain(5)
+
+    assert seen == ['Deleted']
+    assert bus.get_stats()['failed.broken'] == 1
+    assert bus.get_stats()['handled.record'] == 1
+
+
+def test_subscribing_twice_under_one_name_replaces():
+    """A service built twice doesn't deliver every event twice"""
+    bus = EventBus(workers=1)
+    seen = []
+    bus.subscribe('record', DomainEvent, lambda event: seen.append('first'))
+    bus.subscribe('record', DomainEvent, lambda event: seen.append('second'))
+    bus.publish(_status_changed(1, 'pending', 'resolved'))
+    bus.drain(5)
+
+    assert seen == ['second']
@@ -0,0 +1,164 @@
+"""
+Complaint exports
+Writes a small complaints table out in each format and reads it back
+"""
+import io
+import os
+import csv
+import json
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from database import DatabaseManager
+from database.models import Complaint
+from services.export_service import GPKG_POINT, ExportService
+
+PROJECT_ROOT = Path(__file__).parent
+
+STATUSES = ['pending', 'in_progress', 'resolved']
+
+
+@pytest.fixture
+def exporter(tmp_path):
+    """An export service over 30 complaints spread across three statuses"""
+    db = DatabaseManager(tmp_path / "complaints.db")
+    for index in range(30):
+        db.create_complaint(Complaint(
+            photo_path='', location=f"Street {index}", latitude=12.0 + index / 100,
+            longitude=77.0 + index / 100, tags='pothole', description=f"Complaint {index}",
+            status=STATUSES[index % 3]
+        ))
+    return ExportService(db)
+
+
+def test_parquet_dataset_stays_within_buffer_and_writer_limits(exporter, tmp_path):
+    """Tight limits split partitions into several files without losing rows"""
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    counts = exporter.write_parquet_dataset(tmp_path / "dataset", partition_by=('status',),
+                                            max_buffered_rows=4, max_open_writers=1)
+
+    assert sum(counts.values()) == 30
+    assert len(counts) > len(STATUSES)  # Closed writers were continued in new parts
+    for status in STATUSES:
+        files = sorted((tmp_path / "dataset" / f"status={status}").glob('part-*.parquet'))
+        assert sum(pq.read_table(file_path).num_rows for file_path in files) == 10
+
+
+def test_csv_rows_match_the_database(exporter):
+    """Every complaint is written once, filtered exports included"""
+    output = io.BytesIO()
+    count = exporter.write('csv', output)
+
+    rows = list(csv.reader(io.StringIO(output.getvalue().decode('utf-8'))))
+    assert count == exporter.db.count_complaints() == 30
+    assert len(rows) == count + 1  # Header
+    assert sorted(int(row[0]) for row in rows[1:]) == list(range(1, 31))
+
+    output = io.BytesIO()
+    count = exporter.write('csv', output, filters={'status': 'resolved'})
+    assert count == exporter.db.count_complaints(status='resolved') == 10
+    assert len(output.getvalue().decode('utf-8').splitlines()) == count + 1
+
+
+def test_excel_rows_match_the_database(exporter):
+    """The complaints sheet has one row per complaint and the summaries add up"""
+    openpyxl = pytest.importorskip("openpyxl")
+    output = io.BytesIO()
+    count = exporter.write('xlsx', output)
+
+    workbook = openpyxl.load_workbook(io.BytesIO(output.getvalue()), read_only=True)
+    rows = list(workbook['Complaints'].iter_rows(values_only=True))
+    status_rows = list(workbook['Status Summary'].iter_rows(min_row=2, values_only=True))
+
+    assert count == exporter.db.count_complaints() == 30
+    assert len(rows) == count + 1  # Header
+    assert {row[0]: row[1] for row in status_rows} == {status: 10 for status in STATUSES}
+
+
+def _changes(output: io.BytesIO) -> list:
+    return [json.loads(line) for line in output.getvalue().decode('utf-8').splitlines()]
+
+
+def test_change_feed_advances_watermark_and_reports_deletes(exporter):
+    """A snapshot first, then only what changed, with deleted complaints as tombstones"""
+    db = exporter.db
+    output = io.BytesIO()
+    first = exporter.export_changes('city-gis', output)
+
+    assert first['since'] is None
+    assert first['upserts'] == 30 and first['deletes'] == 0
+    assert db.get_export_watermark('city-gis') == first['watermark'] == db.get_data_version()
+
+    db.update_status(3, 'resolved')
+    db.delete_complaint(7)
+    output = io.BytesIO()
+    second = exporter.export_changes('city-gis', output)
+
+    assert second['since'] == first['watermark']
+    assert second['watermark'] > first['watermark']
+    assert db.get_export_watermark('city-gis') == second['watermark']
+    changes = _changes(output)
+    assert [(change['op'], change.get('id') or change['complaint']['id']) for change in changes] == [
+        ('upsert', 3), ('delete', 7)
+    ]
+    assert changes[0]['complaint']['status'] == 'resolved'
+
+    output = io.BytesIO()
+    third = exporter.export_changes('city-gis', output)
+    assert third['upserts'] == third['deletes'] == 0
+    assert third['watermark'] == second['watermark']
+    assert output.getvalue() == b''
+
+
+def test_geopackage_header_and_bbox_filter(exporter, tmp_path):
+    """The file is a GeoPackage with WGS 84 points, and bbox keeps only the complaints inside it"""
+    bbox = (77.0, 12.0, 77.095, 12.095)
+    path = tmp_path / "complaints.gpkg"
+    count = exporter.write_geopackage(path, filters={'bbox': bbox})
+
+    assert path.read_bytes()[:16] == b'SQLite format 3\x00'
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA application_id").fetchone()[0] == 0x47504B47  # 'GPKG'
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 10300
+        geoms = [row[0] for row in conn.execute("SELECT geom FROM complaints ORDER BY fid")]
+        extent = conn.execute("SELECT min_x, min_y, max_x, max_y, srs_id FROM gpkg_contents").fetchone()
+    finally:
+        conn.close()
+
+    assert count == len(geoms) == exporter.db.count_complaints(bbox=bbox) == 10
+    magic, version, flags, srs_id, byte_order, geometry_type, x, y = GPKG_POINT.unpack(geoms[0])
+    assert (magic, version, srs_id, geometry_type) == (b'GP', 0, 4326, 1)
+    assert (x, y) == (77.0, 12.0)
+    assert extent[-1] == 4326
+    assert bbox[0] <= extent[0] <= extent[2] <= bbox[2] and bbox[1] <= extent[1] <= extent[3] <= bbox[3]
+
+    output = io.BytesIO()
+    assert exporter.write('geojsonl', output, filters={'bbox': bbox}) == 10
+    for line in output.getvalue().decode('utf-8').splitlines():
+        lon, lat = json.loads(line)['geometry']['coordinates']
+        assert bbox[0] <= lon <= bbox[2] and bbox[1] <= lat <= bbox[3]
+
+
+def test_partitioned_cli_export_applies_filters(exporter, tmp_path):
+    """export_data.py --partition-by honours --status and --bbox"""
+    pq = pytest.importorskip("pyarrow.parquet")
+    output = tmp_path / "dataset"
+    env = dict(os.environ, DATABASE_PATH=str(exporter.db.db_path))
+    result = subprocess.run(
+        [sys.executable, str(PROJECT_ROOT / "export_data.py"), str(output), "--format", "parquet",
+         "--partition-by", "status", "--status", "resolved", "--bbox", "77.0", "12.0", "77.15", "12.15"],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    assert [path.name for path in output.iterdir()] == ['status=resolved']
+    table = pq.read_table(output / "status=resolved")
+    expected = exporter.db.count_complaints(status='resolved', bbox=(77.0, 12.0, 77.15, 12.15))
+    assert table.num_rows == expected == 5
+    assert all(77.0 <= lon <= 77.15 for lon in table.column('longitude').to_pylist())
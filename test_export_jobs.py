@@ -0,0 +1,73 @@
+"""
+Background export artifacts
+Checks that requests for the same data share one file and that files for
+old data versions are purged once their grace period is over
+"""
+import os
+
+import pytest
+
+from database import DatabaseManager
+from database.models import Complaint
+from services.export_job_service import ExportJobService
+from services.job_queue import JobQueue
+
+
+@pytest.fixture
+def exports(tmp_path):
+    """An export service with its own database and a queue run by the test"""
+    db_path = tmp_path / "complaints.db"
+    db = DatabaseManager(db_path)
+    db.create_complaint(Complaint(photo_path='', location='Main St'))
+    jobs = JobQueue(db_path=db_path, workers=0)
+    return ExportJobService(db=db, db_path=db_path, export_dir=tmp_path / "exports", jobs=jobs)
+
+
+def _build(exports, export_format='csv', filters=None):
+    artifact = exports.request_export(export_format, filters)
+    exports.jobs.run_pending()
+    return exports.get_artifact(artifact.id)
+
+
+def test_same_request_reuses_the_artifact(exports):
+    """Same format, filters and data version: one job, one file"""
+    first = exports.request_export('csv')
+    again = exports.request_export('csv')
+    assert again.id == first.id
+    assert exports.jobs.run_pending() == 1
+
+    ready = exports.request_export('csv')
+    assert ready.id == first.id
+    assert ready.status == 'ready'
+    assert ready.rows_written == 1
+    assert exports.jobs.run_pending() == 0
+
+    assert exports.request_export('csv', {'status': 'resolved'}).id != first.id
+    assert exports.request_export('geojsonl').id != first.id
+
+
+def test_write_starts_a_new_artifact(exports):
+    """A write bumps the data version, so the next request builds a fresh file"""
+    first = _build(exports)
+    exports.db.create_complaint(Complaint(photo_path='', location='Ring Rd'))
+
+    second = _build(exports)
+    assert second.id != first.id
+    assert second.data_version > first.data_version
+    assert second.rows_written == 2
+
+
+def test_old_version_is_purged_after_grace_period(exports):
+    """Outdated files survive a grace period for running downloads, then go"""
+    old = _build(exports)
+    exports.db.create_complaint(Complaint(photo_path='', location='Ring Rd'))
+
+    assert exports.purge_stale() == 0
+    assert os.path.exists(old.file_path)
+
+    with exports.export_db.get_connection() as conn:
+        conn.execute("UPDATE export_artifacts SET finished_at = datetime('now', '-11 minutes') WHERE id = ?",
+                     (old.id,))
+    assert exports.purge_stale() == 1
+    assert not os.path.exists(old.file_path)
+    assert exports.get_artifact(old.id) is None
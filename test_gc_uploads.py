@@ -0,0 +1,55 @@
+"""
+Orphaned upload collection
+Builds a small upload tree and checks that only files reachable from a
+complaint survive, even when a blob's reference count has leaked
+"""
+import os
+
+from database import DatabaseManager
+from database.image_models import ImageVariant
+from database.models import Complaint
+from services.cleanup_service import CleanupService
+from services.storage_service import StorageService
+
+
+def _store(storage, relative_path):
+    """Write a file at its stored location, old enough to be collected"""
+    file_path = storage.get_image_path(relative_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    file_path.write_bytes(b'x' * 10)
+    os.utime(file_path, (0, 0))
+    return file_path
+
+
+def test_leaked_blob_is_collected_and_counts_reconciled(tmp_path):
+    db_path = tmp_path / "complaints.db"
+    storage = StorageService(upload_dir=tmp_path / "uploads", db_path=db_path,
+                             staging_dir=tmp_path / "staging")
+    db = DatabaseManager(db_path)
+    db.create_complaint(Complaint(photo_path='uploads/kept.webp', location='Main St'))
+    db.create_complaint(Complaint(photo_path='uploads/kept.webp', location='Main St'))
+
+    files = {}
+    for stem in ('kept', 'leaked'):
+        for variant in ('full', 'thumb'):
+            relative_path = f"uploads/{stem}.webp" if variant == 'full' else f"uploads/{stem}_{variant}.webp"
+            files[(stem, variant)] = _store(storage, relative_path)
+            storage.image_db.register_variant(ImageVariant(
+                photo_path=f"uploads/{stem}.webp", variant=variant, file_path=relative_path
+            ))
+    storage.image_db.acquire_blob('a' * 64, 'uploads/kept.webp')  # Should be 2
+    storage.image_db.acquire_blob('b' * 64, 'uploads/leaked.webp')  # No complaint uses it
+    stray = _store(storage, 'uploads/stray.webp')
+
+    cleanup = CleanupService(upload_dir=tmp_path / "uploads", staging_dir=tmp_path / "staging",
+                             quarantine_dir=tmp_path / "quarantine", db_path=db_path)
+    result = cleanup.collect_garbage(grace_hours=0)
+
+    assert result['reconciled'] == 2
+    assert result['collected'] == 3
+    assert files[('kept', 'full')].exists() and files[('kept', 'thumb')].exists()
+    assert not files[('leaked', 'full')].exists() and not files[('leaked', 'thumb')].exists()
+    assert not stray.exists()
+    assert storage.image_db.get_blob('a' * 64).ref_count == 2
+    assert storage.image_db.get_blob('b' * 64) is None
+    assert storage.image_db.get_variants('uploads/leaked.webp') == {}
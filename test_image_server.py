@@ -0,0 +1,94 @@
+"""
+Image server responses
+Serves a stored file over a real socket and checks caching, ranges and
+that only URLs handed out by the app are answered
+"""
+import http.client
+
+import pytest
+
+from services.image_server import ImageServer
+from services.storage_service import StorageService
+
+DATA = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def server(tmp_path):
+    """An image server on a free localhost port with one stored file"""
+    storage = StorageService(upload_dir=tmp_path / "uploads", db_path=tmp_path / "images.db",
+                             staging_dir=tmp_path / "staging")
+    file_path = storage.get_image_path("uploads/photo.jpg")
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    file_path.write_bytes(DATA)
+
+    image_server = ImageServer(storage, host='127.0.0.1', port=0, base_url='')
+    assert image_server.start()
+    try:
+        yield image_server, image_server.url_for(file_path)
+    finally:
+        image_server.stop()
+
+
+def _get(image_server, path, headers=None, method='GET'):
+    conn = http.client.HTTPConnection('127.0.0.1', image_server._httpd.server_address[1], timeout=5)
+    try:
+        conn.request(method, path, headers=headers or {})
+        response = conn.getresponse()
+        return response, response.read()
+    finally:
+        conn.close()
+
+
+def test_etag_revalidation_returns_304(server):
+    """A browser that has the bytes gets 304 without a body"""
+    image_server, url = server
+    response, body = _get(image_server, url)
+    assert response.status == 200
+    assert body == DATA
+    assert 'immutable' in response.getheader('Cache-Control')
+
+    response, body = _get(image_server, url, {'If-None-Match': response.getheader('ETag')})
+    assert response.status == 304
+    assert body == b''
+
+
+def test_ranges(server):
+    """Satisfiable ranges get 206 and the slice; others get 416"""
+    image_server, url = server
+    response, body = _get(image_server, url, {'Range': 'bytes=10-19'})
+    assert response.status == 206
+    assert body == DATA[10:20]
+    assert response.getheader('Content-Range') == f"bytes 10-19/{len(DATA)}"
+
+    response, body = _get(image_server, url, {'Range': 'bytes=-5'})
+    assert response.status == 206
+    assert body == DATA[-5:]
+
+    response, _ = _get(image_server, url, {'Range': f"bytes={len(DATA)}-"})
+    assert response.status == 416
+    assert response.getheader('Content-Range') == f"bytes */{len(DATA)}"
+
+
+@pytest.mark.parametrize('path', [
+    '/i/0123456789abcdef/photo.jpg',  # Wrong token
+    '/i/0123456789abcdef/..',
+    '/i/0123456789abcdef/.',
+    '/i/0123456789abcdef/.hidden',
+    '/i/0123456789abcdef/missing.jpg',
+    '/i/0123456789abcdef/../images.db',
+])
+def test_bad_names_and_tokens_are_not_found(server, path):
+    """Anything but a URL the app built gets a plain 404"""
+    image_server, _ = server
+    response, _ = _get(image_server, path)
+    assert response.status == 404
+
+
+def test_directory_is_not_served(server, tmp_path):
+    """A name that resolves to a directory is a 404, not a server error"""
+    image_server, _ = server
+    directory = image_server.storage.get_image_path("uploads/folder")
+    directory.mkdir(parents=True)
+    response, _ = _get(image_server, '/i/0123456789abcdef/folder')
+    assert response.status == 404
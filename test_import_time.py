@@ -0,0 +1,96 @@
+"""
+Import-time budget for app.py
+Checks that the login page doesn't load map, chart, geocoding or image
+libraries, and that the project's own modules import within budget
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent
+
+# Self time of the project's own modules when importing app.py
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "300"))
+
+PROJECT_PACKAGES = ('app', 'config', 'database', 'services', 'ui', 'utils')
+
+# Only needed once a page that uses them is opened
+DEFERRED_MODULES = [
+    'folium',
+    'plotly',
+    'geopy',
+    'PIL',
+    'smtplib',
+    'pyarrow',
+    'openpyxl',
+    'utils.map_utils',
+    'utils.chart_utils',
+    'utils.location_utils',
+    'services.complaint_service',
+    'services.storage_service',
+    'ui.admin_components',
+]
+
+
+def _import_app_with_timings() -> dict:
+    """Import app.py in a fresh interpreter and return {module: (self_us, cumulative_us)}"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120
+    )
+    assert result.returncode == 0, f"import app failed:\n{result.stderr[-2000:]}"
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def _modules_loaded_by_app() -> set:
+    """Import app.py in a fresh interpreter and return the modules it adds beyond streamlit's own"""
+    # streamlit itself may pull in e.g. plotly and PIL; only app.py's additions count
+    script = (
+        "import sys, streamlit; before = set(sys.modules); import app; "
+        "print('\\n'.join(sorted(set(sys.modules) - before)))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', script],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120
+    )
+    assert result.returncode == 0, f"import app failed:\n{result.stderr[-2000:]}"
+    return set(result.stdout.split())
+
+
+def test_heavy_modules_are_deferred():
+    """Importing app.py must not load page-specific dependencies"""
+    pytest.importorskip("streamlit")
+    modules = _modules_loaded_by_app()
+
+    loaded = [module for module in DEFERRED_MODULES if module in modules]
+    assert not loaded, f"Imported at startup but only needed later: {loaded}"
+
+
+def test_project_import_time_budget():
+    """The project's own modules stay within the import-time budget"""
+    pytest.importorskip("streamlit")
+    timings = _import_app_with_timings()
+
+    own_us = sum(
+        self_us for name, (self_us, _) in timings.items()
+        if name.split('.')[0] in PROJECT_PACKAGES
+    )
+    print(f"Project modules: {own_us / 1000:.1f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    assert own_us / 1000 <= IMPORT_BUDGET_MS
@@ -0,0 +1,107 @@
+"""
+Background job queue
+Claims, retry backoff and reclaiming jobs whose worker died, against a
+queue with its own database and no worker threads
+"""
+import pytest
+
+from database import DatabaseManager
+from database.models import Complaint
+from services.job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(db_path=tmp_path / "jobs.db", workers=0, lease_seconds=60)
+
+
+def _expire_lease(queue, job_id):
+    """Pretend the worker holding a job died a while ago"""
+    with queue.db.get_connection() as conn:
+        conn.execute("UPDATE jobs SET locked_until = datetime('now', '-1 minute') WHERE id = ?", (job_id,))
+
+
+def _make_due(queue, job_id):
+    with queue.db.get_connection() as conn:
+        conn.execute("UPDATE jobs SET run_after = datetime('now', '-1 second') WHERE id = ?", (job_id,))
+
+
+def test_claim_takes_each_job_once(queue):
+    """A claimed job is leased to one worker and counts an attempt"""
+    queue.register('noop', lambda payload: None)
+    job_id = queue.enqueue('noop', {'n': 1})
+
+    job = queue.db.claim_next(['noop'], 60)
+    assert job.id == job_id
+    assert job.status == 'running'
+    assert job.attempts == 1
+    assert job.payload == {'n': 1}
+    assert queue.db.claim_next(['noop'], 60) is None
+
+
+def test_failures_back_off_then_give_up(queue):
+    """A failing job waits longer each time and runs at most max_attempts times"""
+    runs, given_up = [], []
+
+    def handler(payload):
+        runs.append(payload)
+        raise ValueError('boom')
+
+    queue.register('flaky', handler, on_give_up=lambda payload, error: given_up.append(error))
+    job_id = queue.enqueue('flaky', {}, max_attempts=3)
+
+    assert queue.run_pending() == 1
+    job = queue.db.get_job(job_id)
+    assert job.status == 'queued'
+    assert job.run_after > job.created_at  # Not due again straight away
+    assert queue.run_pending() == 0
+
+    for _ in range(2):
+        _make_due(queue, job_id)
+        assert queue.run_pending() == 1
+
+    assert len(runs) == 3
+    assert queue.db.get_job(job_id).status == 'failed'
+    assert given_up == ['ValueError: boom']
+
+
+def test_expired_lease_is_reclaimed(queue):
+    """A job whose worker died is run again by another worker"""
+    runs = []
+    queue.register('work', runs.append)
+    job_id = queue.enqueue('work', {'n': 1})
+    queue.db.claim_next(['work'], 60)  # This worker dies
+
+    assert queue.run_pending() == 0  # Lease still held
+    _expire_lease(queue, job_id)
+    assert queue.run_pending() == 1
+    assert runs == [{'n': 1}]
+    job = queue.db.get_job(job_id)
+    assert job.status == 'done'
+    assert job.attempts == 2
+
+
+def test_reclaim_after_lost_final_attempt_gives_up(queue):
+    """A job can't run more than max_attempts times by losing its lease"""
+    runs, given_up = [], []
+    queue.register('work', runs.append, on_give_up=lambda payload, error: given_up.append(payload))
+    job_id = queue.enqueue('work', {'n': 1}, max_attempts=1)
+    queue.db.claim_next(['work'], 60)  # The only attempt; its worker dies
+
+    _expire_lease(queue, job_id)
+    assert queue.run_pending() == 1
+    assert runs == []
+    assert given_up == [{'n': 1}]
+    assert queue.db.get_job(job_id).status == 'failed'
+
+
+def test_photo_is_appended_once(tmp_path):
+    """Recording the same photo on a complaint twice leaves one entry"""
+    db = DatabaseManager(tmp_path / "complaints.db")
+    complaint_id = db.create_complaint(Complaint(photo_path='', location='Main St'))
+
+    assert db.append_photo_path(complaint_id, 'uploads/a.webp')
+    assert not db.append_photo_path(complaint_id, 'uploads/a.webp')
+    assert db.append_photo_path(complaint_id, 'uploads/b.webp')
+    assert not db.append_photo_path(complaint_id + 1, 'uploads/a.webp')
+    assert db.get_complaint(complaint_id).photo_path == 'uploads/a.webp;uploads/b.webp'
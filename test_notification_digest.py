@@ -0,0 +1,70 @@
+"""
+Notification digest coalescing
+"""
+from database.notification_models import NotificationEvent
+from services.notification_service import NotificationService
+
+
+def _status(complaint_id, old_status, new_status, location='Main St'):
+    return NotificationEvent(event_type='status', complaint_id=complaint_id, location=location,
+                             old_status=old_status, new_status=new_status)
+
+
+def test_transitions_of_one_complaint_collapse():
+    """First old status and last new status survive; round trips vanish"""
+    events = [
+        _status(1, 'pending', 'in_progress'),
+        _status(2, 'pending', 'in_progress'),
+        _status(1, 'in_progress', 'resolved'),
+        _status(2, 'in_progress', 'pending'),
+    ]
+
+    status_changes, assignments = NotificationService.coalesce(events)
+
+    assert status_changes == [(1, 'Main St', 'pending', 'resolved')]
+    assert assignments == []
+
+
+def test_repeated_assignments_are_listed_once():
+    """Reassigning the same complaint twice gives one entry with the latest details"""
+    events = [
+        NotificationEvent(event_type='assignment', complaint_id=5, location='Ring Rd', description='old'),
+        NotificationEvent(event_type='assignment', complaint_id=6, location='Bridge', description='crack'),
+        NotificationEvent(event_type='assignment', complaint_id=5, location='Ring Rd', description='new'),
+    ]
+
+    _, assignments = NotificationService.coalesce(events)
+
+    assert assignments == [(5, 'Ring Rd', 'new'), (6, 'Bridge', 'crack')]
+
+
+class _FailingEmail:
+    enabled = True
+
+    def send_complaint_status_update(self, *args):
+        return False
+
+
+class _DisabledEmail:
+    enabled = False
+
+
+def test_failed_digests_are_dropped_after_max_attempts(tmp_path):
+    """A recipient whose digest keeps failing doesn't keep events forever"""
+    service = NotificationService(email=_FailingEmail(), db_path=tmp_path / "n.db",
+                                  window_seconds=900, max_attempts=2)
+    service.db.add_event(NotificationEvent(recipient_email='a@example.com', event_type='status',
+                                           complaint_id=1, old_status='pending', new_status='resolved'))
+
+    assert service.flush(force=True) == 0
+    assert service.get_pending_count() == 1
+    assert service.flush(force=True) == 0
+    assert service.get_pending_count() == 0
+
+
+def test_nothing_is_buffered_while_email_is_disabled(tmp_path):
+    """Without SMTP credentials events are not stored at all"""
+    service = NotificationService(email=_DisabledEmail(), db_path=tmp_path / "n.db", window_seconds=900)
+
+    assert not service.notify_status_change('a@example.com', 'A', 1, 'Main St', 'pending', 'resolved')
+    assert service.get_pending_count() == 0
@@ -0,0 +1,44 @@
+"""
+Password hashing pool and cost upgrades on login
+"""
+import pytest
+
+pytest.importorskip("bcrypt")
+
+from database.user_db_manager import UserDatabaseManager
+from utils import password_utils
+from utils.password_utils import PasswordHasher, get_hash_rounds
+
+
+@pytest.fixture
+def cheap_hasher(monkeypatch):
+    """Swap in a low-cost shared hasher so the tests stay fast"""
+    # One worker: work finishes in submission order
+    hasher = PasswordHasher(rounds=4, workers=1)
+    monkeypatch.setattr(password_utils, '_password_hasher', hasher)
+    return hasher
+
+
+def test_hash_uses_configured_cost(cheap_hasher):
+    password_hash = cheap_hasher.hash('secret')
+
+    assert get_hash_rounds(password_hash) == 4
+    assert cheap_hasher.verify('secret', password_hash)
+    assert not cheap_hasher.verify('wrong', password_hash)
+    assert not cheap_hasher.needs_rehash(password_hash)
+
+
+def test_login_upgrades_hash_when_cost_changes(tmp_path, cheap_hasher):
+    """A successful login re-hashes at the new cost; a failed one doesn't"""
+    user_db = UserDatabaseManager(tmp_path / 'users.db')
+    admin = user_db.get_user_by_username('admin')
+    assert get_hash_rounds(admin.password_hash) == 4
+
+    cheap_hasher.rounds = 5
+    assert user_db.authenticate_user('admin', 'wrong') is None
+    assert user_db.authenticate_user('admin', 'admin123')
+    cheap_hasher.submit(lambda: None).result()  # Wait for the background rehash
+
+    upgraded = user_db.get_user_by_username('admin').password_hash
+    assert get_hash_rounds(upgraded) == 5
+    assert user_db.authenticate_user('admin', 'admin123')
@@ -0,0 +1,69 @@
+"""
+Query result cache
+Checks that writes invalidate cached results and that callers can't
+change what is cached
+"""
+import sqlite3
+
+from database import DatabaseManager
+from database.models import Complaint
+from services.query_cache import QueryCache
+
+
+def test_write_bumps_version_and_invalidates(tmp_path):
+    """A write through the manager is seen at once, even with a reused version read"""
+    db = DatabaseManager(tmp_path / "complaints.db")
+    cache = QueryCache()
+
+    def lookup():
+        return cache.get_or_load(('all',), db.get_data_version(max_age=60), db.get_all_complaints)
+
+    assert lookup() == []
+    version = db.get_data_version()
+
+    db.create_complaint(Complaint(photo_path='', location='Main St'))
+
+    assert db.get_data_version(max_age=60) == version + 1
+    assert [complaint.location for complaint in lookup()] == ['Main St']
+    assert cache.get_stats()['stale'] == 1
+
+
+def test_cached_results_are_copies(tmp_path):
+    """Changing a returned complaint or list doesn't change the next hit"""
+    db = DatabaseManager(tmp_path / "complaints.db")
+    db.create_complaint(Complaint(photo_path='', location='Main St'))
+    cache = QueryCache()
+    version = db.get_data_version()
+
+    first = cache.get_or_load(('all',), version, db.get_all_complaints)
+    first[0].status = 'resolved'
+    first.append(Complaint())
+
+    second = cache.get_or_load(('all',), version, db.get_all_complaints)
+    assert len(second) == 1
+    assert second[0].status == 'pending'
+    assert cache.get_stats()['hits'] == 1
+
+
+def test_version_read_during_a_write_is_not_reused(tmp_path, monkeypatch):
+    """A version fetched before a write commits isn't cached after the write cleared it"""
+    db = DatabaseManager(tmp_path / "complaints.db")
+    writes = [lambda: db.create_complaint(Complaint(photo_path='', location='Main St'))]
+
+    class RacingConnection(sqlite3.Connection):
+        def __exit__(self, *exc):
+            result = super().__exit__(*exc)
+            if writes:  # Another thread writes right after the version was read
+                writes.pop()()
+            return result
+
+    def get_connection():
+        conn = RacingConnection(db.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    version = db.get_data_version()
+    monkeypatch.setattr(db, 'get_connection', get_connection)
+
+    assert db.get_data_version() == version
+    assert db.get_data_version(max_age=60) == version + 1
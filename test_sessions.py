@@ -0,0 +1,76 @@
+"""
+Login sessions: signed tokens, expiry and revocation
+"""
+import pytest
+
+pytest.importorskip("bcrypt")
+
+from database.user_db_manager import UserDatabaseManager
+from services.session_service import SessionService
+
+
+@pytest.fixture
+def user_db(tmp_path):
+    """A user database with only the default admin"""
+    return UserDatabaseManager(tmp_path / 'users.db')
+
+
+@pytest.fixture
+def sessions(user_db):
+    return SessionService(user_db=user_db, secret=b'test-secret', ttl_hours=1)
+
+
+def test_token_logs_in_without_password(user_db, sessions):
+    """A token from a real login gives back the same user"""
+    admin = user_db.get_user_by_username('admin')
+    token = sessions.create_session(admin)
+
+    assert sessions.validate(token).id == admin.id
+
+
+def test_forged_and_tampered_tokens_are_rejected(user_db, sessions):
+    """Tokens need a valid signature and a matching row"""
+    admin = user_db.get_user_by_username('admin')
+    token = sessions.create_session(admin)
+    random_part, _, signature = token.partition('.')
+
+    assert sessions.validate(f"{random_part}x.{signature}") is None
+    assert sessions.validate('not-a-token') is None
+    assert sessions.validate('abc.é') is None
+    other_key = SessionService(user_db=user_db, secret=b'other-secret')
+    assert other_key.validate(token) is None
+
+
+def test_sessions_are_revoked(user_db, sessions):
+    """Logout, password change and deactivation all end sessions"""
+    admin = user_db.get_user_by_username('admin')
+    logged_out = sessions.create_session(admin)
+    sessions.revoke(logged_out)
+    assert sessions.validate(logged_out) is None
+
+    before_password_change = sessions.create_session(admin)
+    user_db.update_password(admin.id, 'new-password')
+    assert sessions.validate(before_password_change) is None
+
+    before_deactivation = sessions.create_session(admin)
+    user_db.deactivate_user(admin.id)
+    assert sessions.validate(before_deactivation) is None
+
+
+def test_expired_session_is_rejected(user_db):
+    """A session past its lifetime no longer logs in"""
+    expired = SessionService(user_db=user_db, secret=b'test-secret', ttl_hours=-1)
+    token = expired.create_session(user_db.get_user_by_username('admin'))
+
+    assert expired.validate(token) is None
+    assert expired.purge_expired() == 1
+
+
+def test_login_purges_expired_sessions(user_db, sessions):
+    """Expired rows are cleaned up by the next login, without a separate job"""
+    admin = user_db.get_user_by_username('admin')
+    SessionService(user_db=user_db, secret=b'test-secret', ttl_hours=-1).create_session(admin)
+
+    sessions.create_session(admin)
+
+    assert sessions.purge_expired() == 0
@@ -0,0 +1,168 @@
+"""
+Photo storage
+Stores generated photos through StorageService and checks content
+deduplication and blob reference counting
+"""
+import io
+import hashlib
+
+import pytest
+from PIL import Image
+
+from services.storage_service import StorageService
+
+
+class Upload(io.BytesIO):
+    """Stands in for a Streamlit UploadedFile"""
+
+    def __init__(self, data: bytes, name: str = 'photo.jpg'):
+        super().__init__(data)
+        self.name = name
+
+
+def _jpeg(color=(200, 30, 30), size=(1600, 1200)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return StorageService(upload_dir=tmp_path / "uploads", db_path=tmp_path / "images.db",
+                          staging_dir=tmp_path / "staging")
+
+
+def _stored_files(storage):
+    return sorted(path for path in storage.upload_dir.rglob('*') if path.is_file())
+
+
+def test_identical_uploads_are_stored_once(storage):
+    """The same bytes uploaded twice share one set of files"""
+    data = _jpeg()
+    first = storage.save_image(Upload(data))
+    files = _stored_files(storage)
+
+    second = storage.save_image(Upload(data, name='copy.jpg'))
+
+    assert first == second
+    assert _stored_files(storage) == files
+    assert storage.image_db.get_blob(hashlib.sha256(data).hexdigest()).ref_count == 2
+
+    other = storage.save_image(Upload(_jpeg(color=(30, 30, 200))))
+    assert other != first
+
+
+def test_files_are_deleted_when_last_reference_is_released(storage):
+    """Deleting one of two uses keeps the files; deleting the last removes them"""
+    data = _jpeg()
+    path = storage.save_image(Upload(data))
+    storage.save_image(Upload(data))
+
+    assert storage.delete_image(path)
+    assert storage.get_image_path(path).exists()
+    assert storage.image_db.get_blob(hashlib.sha256(data).hexdigest()).ref_count == 1
+
+    assert storage.delete_image(path)
+    assert _stored_files(storage) == []
+    assert storage.image_db.get_blob(hashlib.sha256(data).hexdigest()) is None
+    assert storage.image_db.get_variants(path) == {}
+
+
+def test_lost_blob_file_starts_a_fresh_count(storage):
+    """A blob whose file vanished is written again with one reference, not stale+1"""
+    data = _jpeg()
+    path = storage.save_image(Upload(data))
+    storage.save_image(Upload(data))
+    storage.get_image_path(path).unlink()
+
+    assert storage.save_image(Upload(data)) == path
+    assert storage.get_image_path(path).exists()
+    assert storage.image_db.get_blob(hashlib.sha256(data).hexdigest()).ref_count == 1
+
+
+def test_corrupt_upload_leaves_nothing_behind(storage, monkeypatch):
+    """An upload that fails to decode writes no original, variants or registry rows"""
+    monkeypatch.setattr('services.storage_service.KEEP_ORIGINAL_UPLOADS', True)
+    data = _jpeg()
+    truncated = data[:len(data) // 3]
+
+    assert storage.save_image(Upload(truncated)) is None
+    assert _stored_files(storage) == []
+    assert storage.image_db.get_blob(hashlib.sha256(truncated).hexdigest()) is None
+
+    path = storage.save_image(Upload(data))
+    assert set(storage.image_db.get_variants(path)) >= {'full', 'original'}
+
+
+def test_variants_fit_their_boxes(storage):
+    """Each stored size fits its configured box and keeps the aspect ratio"""
+    path = storage.save_image(Upload(_jpeg(size=(1600, 1200))))
+    variants = storage.image_db.get_variants(path)
+
+    assert set(variants) == {'full', 'medium', 'thumb'}
+    expected = {'full': (1440, 1080), 'medium': (640, 480), 'thumb': (160, 120)}
+    for name, variant in variants.items():
+        with Image.open(storage.get_image_path(variant.file_path)) as image:
+            assert image.size == expected[name]
+        assert (variant.width, variant.height) == expected[name]
+        assert variant.size_bytes == storage.get_image_path(variant.file_path).stat().st_size
+
+    thumb, = storage.get_display_paths([path], 100)
+    assert thumb == storage.get_image_path(variants['thumb'].file_path)
+
+
+def test_small_upload_has_no_smaller_variants(storage):
+    """A photo already inside the thumbnail box is served as-is at every width"""
+    path = storage.save_image(Upload(_jpeg(size=(120, 90))))
+
+    assert set(storage.image_db.get_variants(path)) == {'full'}
+    assert storage.get_display_paths([path], 100) == [storage.get_image_path(path)]
+
+
+def _encoded(image_format, size):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (10, 120, 40)).save(buffer, format=image_format)
+    buffer.seek(0)
+    return buffer
+
+
+def test_jpeg_is_decoded_at_reduced_scale(storage):
+    """Draft mode decodes no more pixels than the target needs (but never less)"""
+    with storage._open_image(_encoded('JPEG', (1000, 800)), (200, 200)) as image:
+        image.load()
+        assert image.size == (250, 200)
+
+
+def test_other_formats_are_reduced_by_an_integer_factor(storage):
+    """Non-JPEG images keep at least twice the target size for the final resample"""
+    image = storage._open_image(_encoded('PNG', (1000, 800)), (200, 200))
+    assert image.size == (500, 400)
+
+
+def test_decompression_bomb_is_rejected_before_decoding(storage, monkeypatch):
+    monkeypatch.setattr('services.storage_service.MAX_IMAGE_PIXELS', 1000 * 799)
+    with pytest.raises(ValueError):
+        storage._open_image(_encoded('PNG', (1000, 800)))
+    assert storage.save_image(Upload(_jpeg(size=(1000, 800)))) is None
+
+
+def test_shard_migration_is_idempotent(storage):
+    """Flat files move into shards once; a dry run and a second run move nothing"""
+    storage.upload_dir.mkdir(parents=True, exist_ok=True)
+    names = [f"legacy_{index}.jpg" for index in range(5)]
+    for name in names:
+        (storage.upload_dir / name).write_bytes(_jpeg())
+    (storage.upload_dir / "upload.tmp").write_bytes(b"partial")
+
+    assert storage.migrate_to_shards(dry_run=True)['moved'] == 5
+    assert all((storage.upload_dir / name).exists() for name in names)
+
+    first = storage.migrate_to_shards(batch_size=2)
+    second = storage.migrate_to_shards(batch_size=2)
+
+    assert first['moved'] == 5
+    assert second['moved'] == 0 and second['conflicts'] == 0
+    for name in names:
+        assert not (storage.upload_dir / name).exists()
+        assert storage.get_image_path(f"uploads/{name}") == storage._shard_path(name)
+    assert (storage.upload_dir / "upload.tmp").exists()
@@ -3,9 +3,7 @@ Admin dashboard components
 """
 import streamlit as st
 import pandas as pd
-from database.user_db_manager import UserDatabaseManager
-from database.db_manager import DatabaseManager
-from services import ComplaintService
+from services import get_complaint_service, get_database_manager, get_user_db_manager
 
 
 def render_admin_dashboard():
@@ -31,7 +29,7 @@ def render_user_management():
     """Render user management interface"""
     st.subheader("👥 User Management")
     
-    user_db = UserDatabaseManager()
+    user_db = get_user_db_manager()
     users = user_db.get_all_users()
     
     if not users:
@@ -108,8 +106,7 @@ def render_system_stats():
     """Render system statistics"""
     st.subheader("📊 System Statistics")
     
-    user_db = UserDatabaseManager()
-    db = DatabaseManager()
+    user_db = get_user_db_manager()
     
     users = user_db.get_all_users()
     
@@ -131,8 +128,8 @@ def render_system_stats():
     st.markdown("---")
     
     # Complaint statistics
-    service = ComplaintService()
-    stats = db.get_statistics()
+    service = get_complaint_service()
+    stats = service.get_statistics()
     
     st.markdown("### 📋 Complaint Overview")
     
@@ -143,13 +140,63 @@ def render_system_stats():
     col3.metric("In Progress", stats['by_status'].get('in_progress', 0))
     col4.metric("Resolved", stats['by_status'].get('resolved', 0))
     
+    # Photo storage by variant and encoded format
+    storage_summary = service.storage.get_storage_summary()
+    if storage_summary:
+        st.markdown("---")
+        st.markdown("### 🖼️ Photo Storage")
+        
+        df_storage = pd.DataFrame([{
+            'Variant': row['variant'],
+            'Format': row['format'] or 'Unknown',
+            'Files': row['files'],
+            'Size (MB)': round((row['total_bytes'] or 0) / (1024 * 1024), 2)
+        } for row in storage_summary])
+        st.dataframe(df_storage, use_container_width=True, hide_index=True)
+    
+    # Query cache effectiveness, for tuning QUERY_CACHE_* settings
+    cache_stats = service.get_cache_stats()
+    st.markdown("---")
+    st.markdown("### ⚡ Query Cache")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+    col2.metric("Hits / Misses", f"{cache_stats['hits']} / {cache_stats['misses']}")
+    col3.metric("Cached Results", cache_stats['entries'])
+    col4.metric("Cached Rows", cache_stats['rows'])
+    st.caption(
+        f"Invalidated by writes: {cache_stats['stale']} · "
+        f"Expired: {cache_stats['expired']} · Evicted: {cache_stats['evictions']}"
+    )
+    
+    # Outbound email delivery; dead letters need an admin to look at them
+    from database.email_db_manager import EmailOutboxDatabaseManager
+    outbox = EmailOutboxDatabaseManager()
+    outbox_counts = outbox.count_by_status()
+    st.markdown("---")
+    st.markdown("### 📧 Email Outbox")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Queued", outbox_counts.get('queued', 0))
+    col2.metric("Sending", outbox_counts.get('sending', 0))
+    col3.metric("Sent", outbox_counts.get('sent', 0))
+    col4.metric("Dead Letters", outbox_counts.get('dead', 0))
+    
+    if outbox_counts.get('dead'):
+        with st.expander("Dead letters"):
+            for message in outbox.get_dead_letters():
+                st.write(f"#{message.id} → {message.to_email}: {message.subject}")
+                st.caption(f"{message.attempts} attempt(s) · {message.last_error}")
+        if st.button("🔁 Retry Dead Letters"):
+            st.success(f"Requeued {outbox.requeue_dead()} message(s)")
+    
     # User activity
     st.markdown("---")
     st.markdown("### 👤 User Activity")
     
     user_activity = []
     for user in users:
-        complaints = db.get_complaints_by_user(user.id)
+        complaints = service.get_complaints_by_user(user.id)
         user_activity.append({
             'Username': user.username,
             'Full Name': user.full_name,
@@ -169,7 +216,7 @@ def render_bulk_operations():
     
     st.warning("⚠️ These operations affect multiple records. Use with caution!")
     
-    db = DatabaseManager()
+    db = get_database_manager()
     
     col1, col2 = st.columns(2)
     
@@ -191,9 +238,11 @@ def render_bulk_operations():
         if st.button("🔄 Update All", use_container_width=True):
             # Get complaints with from_status
             complaints = db.get_complaints_by_status(from_status)
+            service = get_complaint_service()
             count = 0
+            # Owners get one digest email for the whole sweep, not one per complaint
             for complaint in complaints:
-                if db.update_status(complaint.id, to_status):
+                if service.update_status(complaint.id, to_status, updated_by_id=st.session_state.user.id):
                     count += 1
             
             st.success(f"✅ Updated {count} complaints from '{from_status}' to '{to_status}'")
@@ -217,7 +266,7 @@ def render_bulk_operations():
     # Assignment operations
     st.markdown("#### 👨‍💼 Bulk Assignment")
     
-    user_db = UserDatabaseManager()
+    user_db = get_user_db_manager()
     moderators = [u for u in user_db.get_all_users() if u.role in ['moderator', 'admin']]
     
     if moderators:
@@ -243,9 +292,10 @@ def render_bulk_operations():
                 all_complaints = db.get_all_complaints(limit=1000)
                 complaints = [c for c in all_complaints if not c.assigned_to]
             
+            service = get_complaint_service()
             count = 0
             for complaint in complaints:
-                if db.assign_complaint(complaint.id, assign_to, current_user.id):
+                if service.assign_complaint(complaint.id, assign_to, current_user.id):
                     count += 1
             
             st.success(f"✅ Assigned {count} complaints")
@@ -257,16 +307,16 @@ def render_moderator_panel():
     """Render moderator panel - simplified version of admin dashboard"""
     st.title("🛡️ Moderator Panel")
     
-    tabs = st.tabs(["📋 My Assigned Complaints", "✅ Quick Actions"])
+    tabs = st.tabs(["📋 My Assigned Complaints", "✅ Quick Actions", "🔁 Possible Duplicates"])
     
     current_user = st.session_state.user
-    db = DatabaseManager()
+    service = get_complaint_service()
     
     with tabs[0]:
         st.subheader("📋 Complaints Assigned to Me")
         
         # Get all complaints assigned to this moderator
-        all_complaints = db.get_all_complaints(limit=1000)
+        all_complaints = service.get_all_complaints(limit=1000)
         my_complaints = [c for c in all_complaints if c.assigned_to == current_user.id]
         
         if my_complaints:
@@ -284,7 +334,7 @@ def render_moderator_panel():
                     )
                     
                     if st.button(f"✅ Update Status for #{complaint.id}", key=f"update_{complaint.id}"):
-                        if db.update_status(complaint.id, new_status):
+                        if service.update_status(complaint.id, new_status, updated_by_id=current_user.id):
                             st.success(f"✅ Status updated to {new_status}")
                             st.rerun()
         else:
@@ -296,7 +346,7 @@ def render_moderator_panel():
         st.info("Quick access to common moderation tasks")
         
         # Recent pending complaints
-        pending = db.get_complaints_by_status("pending")
+        pending = service.get_complaints_by_status("pending")
         
         st.write(f"**{len(pending)} Pending Complaints**")
         
@@ -307,12 +357,45 @@ def render_moderator_panel():
                     st.write(f"#{complaint.id}: {complaint.location}")
                 with col2:
                     if st.button("✅ Accept", key=f"accept_{complaint.id}"):
-                        db.assign_complaint(complaint.id, current_user.id, current_user.id)
-                        db.update_status(complaint.id, "in_progress")
+                        service.assign_complaint(complaint.id, current_user.id, current_user.id)
+                        service.update_status(complaint.id, "in_progress", updated_by_id=current_user.id)
                         st.success("Accepted!")
                         st.rerun()
                 with col3:
                     if st.button("❌ Reject", key=f"reject_{complaint.id}"):
-                        db.update_status(complaint.id, "rejected")
+                        service.update_status(complaint.id, "rejected", updated_by_id=current_user.id)
                         st.success("Rejected!")
                         st.rerun()
+    
+    with tabs[2]:
+        st.subheader("🔁 Possible Duplicates")
+        
+        st.info("Pending complaints whose photos look like an earlier report")
+        
+        found = False
+        
+        for complaint in service.get_complaints_by_status("pending")[:20]:
+            # List each pair once, from the newer complaint
+            earlier = [
+                (other, distance)
+                for other, distance in service.find_duplicate_complaints(complaint.id)
+                if other.id < complaint.id
+            ]
+            if not earlier:
+                continue
+            
+            found = True
+            with st.expander(f"Complaint #{complaint.id} - {complaint.location}"):
+                for other, distance in earlier:
+                    col1, col2 = st.columns([3, 1])
+                    with col1:
+                        st.write(f"Looks like #{other.id}: {other.location} "
+                                 f"({other.status}, {64 - distance}/64 hash bits match)")
+                    with col2:
+                        if st.button("❌ Reject as duplicate", key=f"dup_{complaint.id}_{other.id}"):
+                            service.update_status(complaint.id, "rejected", updated_by_id=current_user.id)
+                            st.success(f"Rejected #{complaint.id}")
+                            st.rerun()
+        
+        if not found:
+            st.info("No likely duplicates among pending complaints")
@@ -2,8 +2,58 @@
 Authentication UI components
 """
 import streamlit as st
-from database.user_db_manager import UserDatabaseManager
+from datetime import datetime, timedelta
+from services import get_user_db_manager, get_session_service
 from database.user_models import User
+from config.settings import SESSION_COOKIE_NAME, SESSION_TTL_HOURS
+
+
+def restore_session():
+    """
+    Sync the login with the browser's session cookie (call once per run)
+    
+    A valid cookie logs the browser in without a password; a session that
+    was revoked (logout elsewhere, deactivation, password change) or has
+    expired logs it out on the next rerun.
+    """
+    import extra_streamlit_components as stx
+    
+    # The cookie component may only be rendered once per run; keep it for login/logout
+    cookies = stx.CookieManager(key="session_cookies")
+    st.session_state.cookie_manager = cookies
+    sessions = get_session_service()
+    
+    if st.session_state.get('session_cookie_pending'):
+        # Set on the run after login: a cookie set right before st.rerun() can get lost
+        cookies.set(
+            SESSION_COOKIE_NAME,
+            st.session_state.session_token,
+            key="set_session_cookie",
+            expires_at=datetime.now() + timedelta(hours=SESSION_TTL_HOURS)
+        )
+        st.session_state.session_cookie_pending = False
+    
+    token = st.session_state.get('session_token') or cookies.get(SESSION_COOKIE_NAME)
+    if not token:
+        return
+    
+    user = sessions.validate(token)
+    if user:
+        st.session_state.user = user
+        st.session_state.authenticated = True
+        st.session_state.session_token = token
+    else:
+        _clear_login()
+        if cookies.get(SESSION_COOKIE_NAME):
+            cookies.delete(SESSION_COOKIE_NAME, key="delete_session_cookie")
+
+
+def _clear_login():
+    """Forget the logged-in user in this browser session"""
+    st.session_state.user = None
+    st.session_state.authenticated = False
+    st.session_state.session_token = None
+    st.session_state.session_cookie_pending = False
 
 
 def render_login_page():
@@ -32,13 +82,15 @@ def render_login_page():
             
             if login_btn:
                 if username and password:
-                    user_db = UserDatabaseManager()
+                    user_db = get_user_db_manager()
                     user = user_db.authenticate_user(username, password)
                     
                     if user:
-                        # Store user in session
+                        # Store user in session; the cookie keeps them logged in across refreshes
                         st.session_state.user = user
                         st.session_state.authenticated = True
+                        st.session_state.session_token = get_session_service().create_session(user)
+                        st.session_state.session_cookie_pending = bool(st.session_state.session_token)
                         st.success(f"✅ Welcome back, {user.full_name}!")
                         st.rerun()
                     else:
@@ -98,7 +150,7 @@ def render_signup_page():
                 elif len(password) < 6:
                     st.error("❌ Password must be at least 6 characters")
                 else:
-                    user_db = UserDatabaseManager()
+                    user_db = get_user_db_manager()
                     
                     # Check if username exists
                     if user_db.get_user_by_username(username):
@@ -159,9 +211,12 @@ def render_user_profile():
         """, unsafe_allow_html=True)
         
         if st.sidebar.button("🚪 Logout", use_container_width=True):
-            # Clear session
-            st.session_state.user = None
-            st.session_state.authenticated = False
+            # Revoke the session so the cookie stops working, then clear it
+            get_session_service().revoke(st.session_state.get('session_token'))
+            cookies = st.session_state.get('cookie_manager')
+            if cookies and cookies.get(SESSION_COOKIE_NAME):
+                cookies.delete(SESSION_COOKIE_NAME, key="logout_session_cookie")
+            _clear_login()
             st.success("👋 Logged out successfully!")
             st.rerun()
 
@@ -2,11 +2,13 @@
 UI components for the application
 """
 import streamlit as st
-import pandas as pd
 from datetime import datetime, date
+from typing import Optional
 from database.models import Complaint
-from config.settings import DEFAULT_TAGS, APP_TITLE, APP_ICON
-from io import BytesIO
+from config.settings import (
+    DEFAULT_TAGS, APP_TITLE, APP_ICON, CARD_IMAGE_WIDTH, CARD_GRID_IMAGE_WIDTH, CARD_THUMB_WIDTH
+)
+import html
 
 
 def render_header():
@@ -188,8 +190,8 @@ def render_complaint_form(on_submit_callback):
             elif selected_coords:
                 final_lat, final_lon = selected_coords
             elif auto_gps and uploaded_files:
-                from services import ComplaintService
-                service = ComplaintService()
+                from services import get_complaint_service
+                service = get_complaint_service()
                 gps_coords = service.extract_gps_from_image(uploaded_files[0])
                 if gps_coords:
                     final_lat, final_lon = gps_coords
@@ -249,44 +251,38 @@ def render_complaint_card(complaint: Complaint, show_image: bool = True):
     """, unsafe_allow_html=True)
     
     # Show images if requested
-    if show_image:
+    if show_image and complaint.is_processing():
+        st.caption("⏳ Photos are still being processed...")
+    elif show_image and complaint.processing_status == 'failed':
+        st.caption("⚠️ Photos could not be processed")
+    elif show_image:
         try:
-            from services import ComplaintService
-            from pathlib import Path
-            service = ComplaintService()
-            photo_paths = complaint.get_photo_paths()
+            from services import get_complaint_service
+            service = get_complaint_service()
+            photo_paths = complaint.get_photo_paths()[:6]  # Max 6 images
+            
+            # Use the smallest stored variant that still fills the column
+            display_width = CARD_GRID_IMAGE_WIDTH if len(photo_paths) > 1 else CARD_IMAGE_WIDTH
+            # Cacheable image URLs; the browser loads them, not the websocket
+            image_sources = service.get_display_sources(photo_paths, display_width)
             
             # Display images in columns if multiple
             if len(photo_paths) > 1:
                 cols = st.columns(min(len(photo_paths), 3))
-                for idx, photo_path in enumerate(photo_paths[:6]):  # Max 6 images
+                for idx, image_source in enumerate(image_sources):
                     try:
-                        image_path = service.get_image_path(photo_path)
-                        if image_path.exists():
+                        if image_source:
                             with cols[idx % 3]:
-                                st.image(str(image_path), use_column_width=True)
-                        else:
-                            # Try alternative path
-                            from config.settings import DATABASE_DIR
-                            alt_path = DATABASE_DIR / photo_path
-                            if alt_path.exists():
-                                with cols[idx % 3]:
-                                    st.image(str(alt_path), use_column_width=True)
+                                st.image(image_source, use_column_width=True)
                     except Exception as e:
                         st.caption(f"⚠️ Image {idx+1} not found")
             elif len(photo_paths) == 1:
                 try:
-                    image_path = service.get_image_path(photo_paths[0])
-                    if image_path.exists():
-                        st.image(str(image_path), use_column_width=True)
+                    image_source = image_sources[0]
+                    if image_source:
+                        st.image(image_source, use_column_width=True)
                     else:
-                        # Try alternative path
-                        from config.settings import DATABASE_DIR
-                        alt_path = DATABASE_DIR / photo_paths[0]
-                        if alt_path.exists():
-                            st.image(str(alt_path), use_column_width=True)
-                        else:
-                            st.caption(f"⚠️ Image not found at: {photo_paths[0]}")
+                        st.caption(f"⚠️ Image not found at: {photo_paths[0]}")
                 except Exception as e:
                     st.caption(f"⚠️ Could not load image: {e}")
         except Exception as e:
@@ -304,6 +300,57 @@ def render_complaint_card(complaint: Complaint, show_image: bool = True):
     """, unsafe_allow_html=True)
 
 
+def render_photo_strip(complaint: Complaint):
+    """
+    Render a complaint's photos as thumbnails inside a collapsed expander
+    
+    Served photos are plain ``<img loading="lazy">`` tags, so the browser
+    only downloads thumbnails of cards that are expanded and on screen;
+    each links to the larger variant.
+    """
+    if complaint.is_processing():
+        st.caption("⏳ Photos are still being processed...")
+        return
+    if complaint.processing_status == 'failed':
+        st.caption("⚠️ Photos could not be processed")
+        return
+    
+    photo_paths = complaint.get_photo_paths()[:6]  # Max 6 images
+    if not photo_paths:
+        return
+    
+    with st.expander(f"📷 Show photos ({len(photo_paths)})"):
+        from services import get_complaint_service
+        service = get_complaint_service()
+        # One registry lookup for both sizes
+        sources = service.get_display_sources_by_width(photo_paths, (CARD_THUMB_WIDTH, CARD_IMAGE_WIDTH))
+        thumbs, larger = sources[CARD_THUMB_WIDTH], sources[CARD_IMAGE_WIDTH]
+        
+        if all(source is None or source.startswith('http') for source in thumbs):
+            tags = [
+                f'<a href="{html.escape(link, quote=True)}" target="_blank">'
+                f'<img src="{html.escape(thumb, quote=True)}" loading="lazy" decoding="async" '
+                f'width="{CARD_THUMB_WIDTH}" style="border-radius: 6px; object-fit: cover;" '
+                f'alt="Complaint #{complaint.id} photo {idx + 1}"></a>'
+                for idx, (thumb, link) in enumerate(zip(thumbs, larger)) if thumb
+            ]
+            st.markdown(
+                f'<div style="display: flex; flex-wrap: wrap; gap: 0.5rem;">{"".join(tags)}</div>',
+                unsafe_allow_html=True
+            )
+        else:
+            # Image server off: local files have to go through st.image
+            cols = st.columns(min(len(photo_paths), 3))
+            for idx, thumb in enumerate(thumbs):
+                if thumb:
+                    with cols[idx % 3]:
+                        st.image(thumb, width=CARD_THUMB_WIDTH)
+        
+        missing = sum(1 for thumb in thumbs if not thumb)
+        if missing:
+            st.caption(f"⚠️ {missing} image(s) not found")
+
+
 def render_statistics(stats: dict):
     """
     Render statistics dashboard with charts
@@ -432,38 +479,81 @@ def render_search_and_filters():
     return search_term
 
 
-def render_export_button(service):
-    """Render export to CSV/Excel button"""
-    col1, col2 = st.columns([1, 5])
+# Export format choices shown to users -> ExportService format
+EXPORT_FORMAT_OPTIONS = {
+    "CSV": "csv",
+    "Excel": "xlsx",
+    "Parquet": "parquet",
+    "GeoJSON (lines)": "geojsonl",
+    "GeoPackage": "gpkg"
+}
+
+
+def render_export_button(filters: Optional[dict] = None):
+    """
+    Render export controls backed by a background job
+    
+    The export runs on the job queue; this shows its progress and, once
+    done, a download button for the cached file. Admins asking for the
+    same export share one job and one file.
+    
+    Args:
+        filters: Filters of the current view, applied to the export
+    """
+    from services import get_export_job_service
+    from services.export_service import EXPORT_FORMATS
+    export_jobs = get_export_job_service()
+    
+    col1, col2, col3 = st.columns([1, 1, 4])
     
     with col1:
+        format_label = st.selectbox(
+            "Export format",
+            options=list(EXPORT_FORMAT_OPTIONS),
+            label_visibility="collapsed",
+            key="export_format"
+        )
+    
+    with col2:
         if st.button("📥 Export Data", use_container_width=True):
             try:
-                df = service.export_to_dataframe()
-                
-                # Convert to Excel
-                output = BytesIO()
-                with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                    df.to_excel(writer, index=False, sheet_name='Complaints')
-                
-                output.seek(0)
-                
-                st.download_button(
-                    label="📥 Download Excel",
-                    data=output,
-                    file_name=f"pathpatrol_complaints_{datetime.now().strftime('%Y%m%d')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    use_container_width=True
-                )
-                
-                # Also provide CSV option
-                csv = df.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download CSV",
-                    data=csv,
-                    file_name=f"pathpatrol_complaints_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
+                artifact = export_jobs.request_export(EXPORT_FORMAT_OPTIONS[format_label], filters)
+                st.session_state.export_artifact_id = artifact.id
             except Exception as e:
                 st.error(f"Export failed: {e}")
+    
+    artifact_id = st.session_state.get('export_artifact_id')
+    if not artifact_id:
+        return
+    
+    artifact = export_jobs.get_artifact(artifact_id)
+    if artifact is None:
+        # Cleaned up after the data changed; the next click builds a new one
+        del st.session_state.export_artifact_id
+        return
+    
+    if artifact.status in ('queued', 'running'):
+        with col3:
+            st.progress(
+                artifact.progress,
+                text=f"Preparing export… {artifact.rows_written:,} of {artifact.total_rows:,} rows"
+            )
+            if st.button("🔄 Refresh", key="export_refresh"):
+                st.rerun()
+    elif artifact.status == 'ready':
+        extension, mime = EXPORT_FORMATS[artifact.format]
+        try:
+            with open(artifact.file_path, 'rb') as export_file:
+                with col3:
+                    st.download_button(
+                        label=f"📥 Download {artifact.format.upper()} ({artifact.rows_written:,} rows)",
+                        data=export_file,
+                        file_name=f"pathpatrol_complaints_{datetime.now().strftime('%Y%m%d')}{extension}",
+                        mime=mime
+                    )
+        except OSError:
+            del st.session_state.export_artifact_id
+            st.warning("That export is no longer available. Click Export Data to build it again.")
+    else:
+        with col3:
+            st.error(f"Export failed: {artifact.error}")
@@ -1,23 +1,31 @@
 """
 Utils package initialization
+
+Submodules are imported on first attribute access: maps (folium), charts
+(plotly, pandas) and geocoding (geopy) are only loaded by the pages that
+use them, not by the login page.
 """
-from .map_utils import create_complaints_map, create_heatmap
-from .chart_utils import (
-    create_status_pie_chart, 
-    create_tag_bar_chart, 
-    create_timeline_chart,
-    create_resolution_time_chart
-)
-from .location_utils import location_service, LocationService
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    'create_complaints_map': 'map_utils',
+    'create_heatmap': 'map_utils',
+    'create_status_pie_chart': 'chart_utils',
+    'create_tag_bar_chart': 'chart_utils',
+    'create_timeline_chart': 'chart_utils',
+    'create_resolution_time_chart': 'chart_utils',
+    'location_service': 'location_utils',
+    'LocationService': 'location_utils'
+}
+
+__all__ = list(_EXPORTS)
 
-__all__ = [
-    'create_complaints_map',
-    'create_heatmap',
-    'create_status_pie_chart',
-    'create_tag_bar_chart',
-    'create_timeline_chart',
-    'create_resolution_time_chart',
-    'location_service',
-    'LocationService'
-]
 
+def __getattr__(name):
+    """Import the submodule that provides a name on first use"""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
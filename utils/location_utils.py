@@ -1,23 +1,35 @@
 """
 Location utilities for geocoding and location search
 """
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 from typing import List, Dict, Optional, Tuple
 import time
 
 
+def _geocoder_errors() -> tuple:
+    """Exceptions that mean the geocoding service didn't answer"""
+    from geopy.exc import GeocoderTimedOut, GeocoderServiceError
+    return (GeocoderTimedOut, GeocoderServiceError)
+
+
 class LocationService:
     """Service for location search and geocoding"""
     
     def __init__(self):
-        """Initialize the geocoder"""
-        self.geolocator = Nominatim(
-            user_agent="PathPatrol_PotholeReporter/1.0",
-            timeout=10
-        )
+        """Initialize the service (the geocoder is created on first use)"""
+        self._geolocator = None
         self._cache = {}
     
+    @property
+    def geolocator(self):
+        """Nominatim client; geopy is only imported when a lookup happens"""
+        if self._geolocator is None:
+            from geopy.geocoders import Nominatim
+            self._geolocator = Nominatim(
+                user_agent="PathPatrol_PotholeReporter/1.0",
+                timeout=10
+            )
+        return self._geolocator
+    
     def search_locations(self, query: str, limit: int = 10) -> List[Dict]:
         """
         Search for locations worldwide
@@ -68,7 +80,7 @@ class LocationService:
             
             return results
             
-        except (GeocoderTimedOut, GeocoderServiceError) as e:
+        except _geocoder_errors() as e:
             print(f"Geocoding error: {e}")
             return []
     
@@ -99,7 +111,7 @@ class LocationService:
                 }
             return None
             
-        except (GeocoderTimedOut, GeocoderServiceError) as e:
+        except _geocoder_errors() as e:
             print(f"Reverse geocoding error: {e}")
             return None
     
@@ -119,7 +131,7 @@ class LocationService:
                 return (location.latitude, location.longitude)
             return None
             
-        except (GeocoderTimedOut, GeocoderServiceError) as e:
+        except _geocoder_errors() as e:
             print(f"Geocoding error: {e}")
             return None
     
@@ -0,0 +1,81 @@
+"""
+Password hashing on a bounded thread pool
+bcrypt releases the GIL while it works, so running it on a few worker
+threads keeps a burst of logins from using every core, while the other
+sessions' script threads keep running
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+from config.settings import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS
+
+
+class PasswordHasher:
+    """
+    bcrypt with a configurable cost and a cap on concurrent hashes
+    
+    At most `workers` hashes or checks run at once; further requests wait
+    their turn in the pool's queue. Callers still block until their own
+    result is ready.
+    """
+    
+    def __init__(self, rounds: int = BCRYPT_ROUNDS, workers: int = PASSWORD_HASH_WORKERS):
+        """Initialize password hasher (threads start with the first request)"""
+        self.rounds = rounds
+        self.workers = max(workers, 1)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+    
+    def hash(self, password: str) -> str:
+        """Hash a password at the configured cost"""
+        return self._executor.submit(self._hash, password, self.rounds).result()
+    
+    def verify(self, password: str, password_hash: str) -> bool:
+        """Check a password against a stored hash"""
+        return self._executor.submit(self._verify, password, password_hash).result()
+    
+    def hash_inline(self, password: str) -> str:
+        """Hash on the calling thread (for work already running on the pool)"""
+        return self._hash(password, self.rounds)
+    
+    def submit(self, fn, *args) -> Future:
+        """Run other password work (e.g. a rehash) on the pool without waiting"""
+        return self._executor.submit(fn, *args)
+    
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Check if a hash was made with a different cost than the current policy"""
+        return get_hash_rounds(password_hash) != self.rounds
+    
+    @staticmethod
+    def _hash(password: str, rounds: int) -> str:
+        """Hash on the calling thread"""
+        import bcrypt
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+    
+    @staticmethod
+    def _verify(password: str, password_hash: str) -> bool:
+        """Check on the calling thread"""
+        import bcrypt
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def get_hash_rounds(password_hash: str) -> Optional[int]:
+    """Cost factor of a bcrypt hash ("$2b$12$..." -> 12), None if unreadable"""
+    parts = password_hash.split('$')
+    try:
+        return int(parts[2])
+    except (IndexError, ValueError):
+        return None
+
+
+_password_hasher: Optional[PasswordHasher] = None
+_password_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Get the shared password hasher, created on first use"""
+    global _password_hasher
+    if _password_hasher is None:
+        with _password_hasher_lock:
+            if _password_hasher is None:
+                _password_hasher = PasswordHasher()
+    return _password_hasher